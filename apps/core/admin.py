@@ -1,8 +1,17 @@
-from django.contrib import admin
+import codecs
+import io
+
+from django import forms
+from django.contrib import admin, messages
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import reverse
+from django.utils import timezone
 from unfold.admin import ModelAdmin
-from unfold.decorators import display
+from unfold.decorators import action, display
 from django.utils.html import format_html
-from .models import User, Category, Product, Cart, CartItem, Order, OrderItem, Payment
+from .models import User, Category, Product, Cart, CartItem, Order, OrderItem, Payment, Job
+from .services import bulk_update_inventory, detect_format, reconcile_settlement
 
 
 @admin.register(User)
@@ -89,13 +98,32 @@ class ProductAdmin(ModelAdmin):
             status = f"In Stock ({obj.stock})"
         return format_html('<span style="color: {}; font-weight: bold;">{}</span>', color, status)
     
+    def get_readonly_fields(self, request, obj=None):
+        # Stock is net of cart holds; change it with the actions or an inventory update.
+        return ('stock',) if obj else ()
+
+    def save_model(self, request, obj, form, change):
+        if change:
+            # Never write back a stock value read before holds moved it.
+            obj.save(update_fields=[f.name for f in obj._meta.concrete_fields if not f.primary_key and f.name != 'stock'])
+        else:
+            super().save_model(request, obj, form, change)
+
+    def set_physical_stock(self, request, queryset, stock):
+        ids = queryset.values_list('id', flat=True)
+        stats = bulk_update_inventory(enumerate({"product_id": product_id, "stock": stock} for product_id in ids))
+        message = f"{stats['updated']} products updated"
+        if stats['over_reserved']:
+            message += f"; cart holds dropped for {stats['over_reserved']}"
+        self.message_user(request, message)
+
     @admin.action(description="Mark as out of stock")
     def mark_as_out_of_stock(self, request, queryset):
-        queryset.update(stock=0)
+        self.set_physical_stock(request, queryset, 0)
     
     @admin.action(description="Mark as in stock")
     def mark_as_in_stock(self, request, queryset):
-        queryset.update(stock=100)
+        self.set_physical_stock(request, queryset, 100)
 
 
 class CartItemInline(admin.TabularInline):
@@ -210,6 +238,29 @@ class OrderItemAdmin(ModelAdmin):
         return format_html('<strong style="color: green;">${}</strong>', total)
 
 
+class SettlementUploadForm(forms.Form):
+    """Provider settlement file for payment reconciliation"""
+    settlement_file = forms.FileField(help_text="CSV with an order_id,amount,status header, or NDJSON")
+    dry_run = forms.BooleanField(required=False, help_text="Only report, do not update payments")
+
+    def clean_settlement_file(self):
+        upload = self.cleaned_data['settlement_file']
+        try:
+            detect_format(upload.name)
+        except ValueError as exc:
+            raise forms.ValidationError(str(exc))
+        # Check the encoding up front: chunks are applied as they are read.
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        try:
+            for chunk in upload.chunks():
+                decoder.decode(chunk)
+            decoder.decode(b'', final=True)
+        except UnicodeDecodeError as exc:
+            raise forms.ValidationError(f"Settlement file is not valid UTF-8 ({exc.reason})")
+        upload.seek(0)
+        return upload
+
+
 @admin.register(Payment)
 class PaymentAdmin(ModelAdmin):
     """Advanced Payment admin with status badges"""
@@ -219,6 +270,10 @@ class PaymentAdmin(ModelAdmin):
     list_filter = ('status', 'method')
     
     actions = ['mark_as_completed', 'mark_as_failed']
+    actions_list = ['reconcile_settlement_file']
+
+    # Mismatched lines listed after an upload; the counters cover all of them.
+    reconciliation_sample_size = 50
     
     @display(description="Amount", ordering="amount")
     def amount_display(self, obj):
@@ -252,10 +307,61 @@ class PaymentAdmin(ModelAdmin):
     
     @admin.action(description="Mark as completed")
     def mark_as_completed(self, request, queryset):
-        queryset.update(status='completed')
-        self.message_user(request, f"{queryset.count()} payments marked as completed")
+        updated = queryset.update(status='completed')
+        self.message_user(request, f"{updated} payments marked as completed")
     
     @admin.action(description="Mark as failed")
     def mark_as_failed(self, request, queryset):
-        queryset.update(status='failed')
-        self.message_user(request, f"{queryset.count()} payments marked as failed")
+        updated = queryset.update(status='failed')
+        self.message_user(request, f"{updated} payments marked as failed")
+
+    @action(description="Reconcile settlement file", url_path="reconcile", permissions=["change"])
+    def reconcile_settlement_file(self, request):
+        form = SettlementUploadForm(request.POST or None, request.FILES or None)
+        if request.method != 'POST' or not form.is_valid():
+            return TemplateResponse(request, 'admin/core/payment/reconcile.html', {
+                **self.admin_site.each_context(request),
+                'opts': self.model._meta,
+                'title': 'Reconcile settlement file',
+                'form': form,
+            })
+
+        upload = form.cleaned_data['settlement_file']
+        samples = []
+
+        def collect(mismatch):
+            if len(samples) < self.reconciliation_sample_size:
+                samples.append(mismatch)
+
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8', newline='')
+        stats = reconcile_settlement(
+            stream, detect_format(upload.name), dry_run=form.cleaned_data['dry_run'], on_mismatch=collect,
+        )
+        prefix = "Dry run: " if form.cleaned_data['dry_run'] else ""
+        self.message_user(
+            request,
+            f"{prefix}{stats['lines']} lines in {stats['seconds']}s ({stats['lines_per_second']} lines/s): "
+            f"{stats['updated']} updated, {stats['matched']} already matching",
+        )
+        for mismatch in samples:
+            details = ", ".join(f"{key}={value}" for key, value in mismatch.items() if key != 'kind')
+            self.message_user(request, f"{mismatch['kind']}: {details}", level=messages.WARNING)
+        return redirect(reverse('admin:core_payment_changelist'))
+
+
+@admin.register(Job)
+class JobAdmin(ModelAdmin):
+    """Background jobs; failed ones can be queued again"""
+
+    list_display = ('id', 'name', 'status', 'attempts', 'run_at', 'created_at')
+    list_filter = ('status', 'name')
+    readonly_fields = ('created_at', 'locked_by', 'locked_until', 'last_error')
+
+    actions = ['retry_jobs']
+
+    @admin.action(description="Retry now")
+    def retry_jobs(self, request, queryset):
+        updated = queryset.filter(status=Job.FAILED).update(
+            status=Job.QUEUED, run_at=timezone.now(), attempts=0, locked_until=None,
+        )
+        self.message_user(request, f"{updated} failed jobs queued again")
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+# Cache backends whose contents are private to one process (or dropped).
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+@register()
+def check_cart_storage(app_configs, **kwargs) -> list:
+    """
+    Refuse write-behind carts (CART_STORAGE = "cache") on a process-local cache.
+
+    The dirty-cart queue and the live carts must be visible to every worker
+    and to the scheduler that flushes them; with LocMem each process would
+    serve its own copy of a cart and changes would never reach the database.
+    """
+    if getattr(settings, "CART_STORAGE", "database") != "cache":
+        return []
+    backend = settings.CACHES.get("default", {}).get("BACKEND", "")
+    if backend in PROCESS_LOCAL_CACHES:
+        return [Error(
+            f'CART_STORAGE = "cache" needs a cache shared by all processes, not {backend}.',
+            hint='Point CACHES["default"] at Redis or Memcached, or set CART_STORAGE = "database".',
+            id="core.E001",
+        )]
+    return []
@@ -0,0 +1,154 @@
+"""
+Read-replica database routing with read-your-writes stickiness.
+
+Reads go to a replica only while ``replica_reads()`` is active - the
+``ReplicaReadMixin`` enables it for safe-method requests of catalog-style
+views. Everything else, writes, reads inside a transaction and reads after a
+write in the same request stay on the primary. After a user writes, the
+``ReplicaStickinessMiddleware`` pins that user to the primary for
+``REPLICA_STICKY_SECONDS`` so they always see their own changes.
+
+Replicas are health-checked (connectivity and replication lag) at most every
+``REPLICA_HEALTH_CHECK_INTERVAL`` seconds per process; unhealthy or lagging
+replicas are skipped, falling back to the primary.
+"""
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+_replica_reads: ContextVar[bool] = ContextVar("replica_reads", default=False)
+_wrote: ContextVar[bool] = ContextVar("wrote", default=False)
+
+PIN_KEY = "db:primary_pin:{user_id}"
+
+
+# ---------------------------------------------------------------------------
+# Request-scoped routing state
+# ---------------------------------------------------------------------------
+
+@contextmanager
+def replica_reads() -> Iterator[None]:
+    """Allow reads in this block to be served by a replica."""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def reset_write_tracking() -> None:
+    _wrote.set(False)
+
+
+def has_written() -> bool:
+    """True if the current request/context has routed a write to the primary."""
+    return _wrote.get()
+
+
+def pin_to_primary(user_id: int) -> None:
+    """Send ``user_id``'s reads to the primary for the stickiness window."""
+    cache.set(PIN_KEY.format(user_id=user_id), True, timeout=getattr(settings, "REPLICA_STICKY_SECONDS", 10))
+
+
+def is_pinned_to_primary(user_id: Optional[int]) -> bool:
+    return user_id is not None and bool(cache.get(PIN_KEY.format(user_id=user_id)))
+
+
+# ---------------------------------------------------------------------------
+# Replica health
+# ---------------------------------------------------------------------------
+
+class ReplicaHealth:
+    """Per-process cache of replica connectivity and lag checks."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._healthy: List[str] = []
+        self._checked_at: float = float("-inf")
+
+    def healthy_replicas(self) -> List[str]:
+        interval = getattr(settings, "REPLICA_HEALTH_CHECK_INTERVAL", 5)
+        if time.monotonic() - self._checked_at >= interval and self._lock.acquire(blocking=False):
+            try:
+                self._healthy = [alias for alias in _replica_aliases() if self.check(alias)]
+                self._checked_at = time.monotonic()
+            finally:
+                self._lock.release()
+        return self._healthy
+
+    def reset(self) -> None:
+        self._checked_at = float("-inf")
+
+    @staticmethod
+    def lag_seconds(alias: str) -> float:
+        """Replication lag of ``alias`` in seconds; 0 for backends without replication."""
+        connection = connections[alias]
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute(
+                    "SELECT CASE WHEN pg_is_in_recovery() "
+                    "THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) "
+                    "ELSE 0 END"
+                )
+                return float(cursor.fetchone()[0])
+            cursor.execute("SELECT 1")
+            return 0.0
+
+    def check(self, alias: str) -> bool:
+        max_lag = getattr(settings, "REPLICA_MAX_LAG", 5)
+        try:
+            lag = self.lag_seconds(alias)
+        except DatabaseError:
+            logger.warning("Replica %s is unreachable", alias, exc_info=True)
+            return False
+        if lag > max_lag:
+            logger.warning("Replica %s lags %.1fs behind (max %ss)", alias, lag, max_lag)
+            return False
+        return True
+
+    def status(self) -> Dict[str, bool]:
+        return {alias: self.check(alias) for alias in _replica_aliases()}
+
+
+def _replica_aliases() -> List[str]:
+    return list(getattr(settings, "REPLICA_DATABASES", []))
+
+
+replica_health = ReplicaHealth()
+
+
+# ---------------------------------------------------------------------------
+# Router
+# ---------------------------------------------------------------------------
+
+class ReplicaRouter:
+    """Route opted-in reads to healthy replicas; everything else to the primary."""
+
+    def db_for_read(self, model, **hints) -> str:
+        if not _replica_reads.get() or _wrote.get():
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        replicas = replica_health.healthy_replicas()
+        return random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints) -> str:
+        _wrote.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool:
+        # Replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints) -> Optional[bool]:
+        return None
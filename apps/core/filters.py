@@ -0,0 +1,32 @@
+import django_filters
+
+from apps.core.models import Product
+
+
+class NumberInFilter(django_filters.BaseInFilter, django_filters.NumberFilter):
+    """Comma-separated list of numbers: ?category=1,2,3"""
+
+
+class ProductFilter(django_filters.FilterSet):
+    """
+    Storefront product filters.
+
+    - ?category=1 or ?category=1,2 — one or more categories
+    - ?min_price=10&max_price=100 — inclusive price range
+    - ?in_stock=true — only products with stock left
+    - ?title_prefix=iph — case-insensitive title prefix
+    """
+    category = NumberInFilter(field_name="category_id", lookup_expr="in")
+    min_price = django_filters.NumberFilter(field_name="price", lookup_expr="gte")
+    max_price = django_filters.NumberFilter(field_name="price", lookup_expr="lte")
+    in_stock = django_filters.BooleanFilter(method="filter_in_stock")
+    title_prefix = django_filters.CharFilter(field_name="title", lookup_expr="istartswith")
+
+    class Meta:
+        model = Product
+        fields = ["category", "min_price", "max_price", "in_stock", "title_prefix"]
+
+    def filter_in_stock(self, queryset, name, value):
+        if value is None:
+            return queryset
+        return queryset.filter(stock__gt=0) if value else queryset.filter(stock=0)
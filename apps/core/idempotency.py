@@ -0,0 +1,77 @@
+from functools import wraps
+from typing import Callable
+
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from apps.core.services.idempotency_service import (
+    EXECUTE,
+    IN_PROGRESS,
+    MISMATCH,
+    abandon_idempotent_request,
+    begin_idempotent_request,
+    complete_idempotent_request,
+    request_fingerprint,
+)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+
+def idempotent(handler: Callable) -> Callable:
+    """
+    Make an APIView handler safe to retry with an ``Idempotency-Key`` header.
+
+    - First request: runs the handler and stores its response (5xx responses
+      and exceptions release the key instead).
+    - Retry with the same key and body: replays the stored response without
+      running the handler.
+    - Retry while the first is still running: 409 with ``Retry-After``.
+    - Same key with a different body: 422.
+
+    Requests without the header, or from anonymous users, run normally.
+    """
+    @wraps(handler)
+    def wrapper(self, request: Request, *args, **kwargs) -> Response:
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key or not request.user.is_authenticated:
+            return handler(self, request, *args, **kwargs)
+
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {"error": f"{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        request_hash = request_fingerprint(request.method, request.path, request.data)
+        outcome, record = begin_idempotent_request(request.user, key, request_hash)
+
+        if outcome == MISMATCH:
+            return Response(
+                {"error": f"{IDEMPOTENCY_HEADER} was already used with a different request"},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+        if outcome == IN_PROGRESS:
+            return Response(
+                {"error": "A request with this idempotency key is still being processed"},
+                status=status.HTTP_409_CONFLICT,
+                headers={"Retry-After": "1"}
+            )
+        if outcome != EXECUTE:
+            return Response(record.response_body, status=record.response_status, headers={REPLAYED_HEADER: "true"})
+
+        try:
+            response = handler(self, request, *args, **kwargs)
+        except Exception:
+            abandon_idempotent_request(record)
+            raise
+
+        if response.status_code >= 500:
+            abandon_idempotent_request(record)
+        else:
+            complete_idempotent_request(record, response.status_code, response.data)
+        return response
+
+    return wrapper
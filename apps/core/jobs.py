@@ -0,0 +1,33 @@
+"""
+Background job handlers, run by ``manage.py run_workers``.
+
+Work that can happen after a response is sent is queued with
+``services.enqueue`` instead of running inline in the request.
+"""
+import logging
+from typing import List
+
+from django.conf import settings
+
+from apps.core.models import Order, Product
+from apps.core.services.job_service import Payload, job_handler
+
+logger = logging.getLogger(__name__)
+
+
+@job_handler("order_placed", batch=True)
+def order_placed(payloads: List[Payload]) -> None:
+    """Post-order work for a batch of new orders: notifications and low-stock alerts."""
+    order_ids = [payload["order_id"] for payload in payloads]
+    for order_id, email, total_price in Order.objects.filter(id__in=order_ids).values_list(
+        "id", "user__email", "total_price"
+    ):
+        logger.info("Order #%d placed by %s, total %s", order_id, email, total_price)
+
+    low_stock = (
+        Product.objects.filter(orderitem__order_id__in=order_ids, stock__lt=getattr(settings, "LOW_STOCK_THRESHOLD", 5))
+        .distinct()
+        .values_list("id", "title", "stock")
+    )
+    for product_id, title, stock in low_stock:
+        logger.warning("Low stock: product #%d %s has %d left", product_id, title, stock)
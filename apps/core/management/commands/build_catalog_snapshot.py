@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from apps.core.services import build_catalog_snapshot
+
+
+class Command(BaseCommand):
+    """Management command to render the catalog snapshot files."""
+    help = 'Render the product and category catalog into precompressed snapshot files'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--if-stale',
+            action='store_true',
+            help='Only rebuild if the catalog changed or the snapshot reached CATALOG_SNAPSHOT_MAX_AGE',
+        )
+
+    def handle(self, *args, **options) -> None:
+        """Execute the command."""
+        self.stdout.write('Building catalog snapshot...')
+
+        stats = build_catalog_snapshot(force=not options['if_stale'])
+
+        if stats['published']:
+            self.stdout.write(self.style.SUCCESS(
+                f"✓ Snapshot version {stats['version']} published ({stats['bytes']} bytes)"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✓ Snapshot version {stats['version']} is up to date"))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.services.openapi_service import build_openapi_schema, check_openapi_schema
+
+
+class Command(BaseCommand):
+    """Management command to precompute the OpenAPI schema."""
+    help = 'Generate the OpenAPI schema and publish it as versioned files for the schema and docs views'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Publish nothing; exit with an error if the published schema is stale (run on every deploy)',
+        )
+
+    def handle(self, *args, **options) -> None:
+        """Execute the command."""
+        if options['check']:
+            versions = check_openapi_schema()
+            if versions['stored'] != versions['generated']:
+                raise CommandError(
+                    f"OpenAPI schema is stale (published {versions['stored'] or 'nothing'}, "
+                    f"code generates {versions['generated']}); run manage.py build_openapi_schema"
+                )
+            self.stdout.write(self.style.SUCCESS(f"✓ OpenAPI schema {versions['stored']} is up to date"))
+            return
+
+        self.stdout.write('Generating OpenAPI schema...')
+
+        stats = build_openapi_schema()
+
+        if stats['published']:
+            self.stdout.write(self.style.SUCCESS(
+                f"✓ OpenAPI schema {stats['version']} published ({stats['bytes']} bytes)"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✓ OpenAPI schema {stats['version']} is up to date"))
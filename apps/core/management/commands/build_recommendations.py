@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from apps.core.services import build_recommendations
+
+
+class Command(BaseCommand):
+    """Management command to rebuild the "frequently bought together" index."""
+    help = 'Build the product co-occurrence recommendation index'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Discard stored co-occurrence counts and rebuild from all orders',
+        )
+        parser.add_argument(
+            '--top-k',
+            type=int,
+            default=None,
+            help='Number of neighbours to keep per product (default: RECOMMENDATIONS_TOP_K)',
+        )
+
+    def handle(self, *args, **options) -> None:
+        """Execute the command."""
+        mode = 'full' if options['full'] else 'incremental'
+        self.stdout.write(f'Starting {mode} recommendation build...')
+
+        stats = build_recommendations(full=options['full'], top_k=options['top_k'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Index version {stats['version']} published: "
+            f"{stats['pairs']} new order lines, {stats['products']} products indexed"
+        ))
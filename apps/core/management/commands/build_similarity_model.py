@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from apps.core.services import build_similarity_model
+
+
+class Command(BaseCommand):
+    """Management command to fit and publish the similar-products model."""
+    help = 'Fit the TF-IDF similar-products model on the catalog and publish it'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--if-stale',
+            action='store_true',
+            help='Only rebuild if the catalog changed since the last build',
+        )
+
+    def handle(self, *args, **options) -> None:
+        """Execute the command."""
+        self.stdout.write('Building similarity model...')
+
+        stats = build_similarity_model(force=not options['if_stale'])
+
+        if stats['published']:
+            self.stdout.write(self.style.SUCCESS(
+                f"✓ Model version {stats['version']} published: "
+                f"{stats['products']} products, {stats['features']} terms"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✓ Model version {stats['version']} is up to date"))
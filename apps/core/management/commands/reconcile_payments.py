@@ -0,0 +1,64 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.services import detect_format, reconcile_settlement
+
+REPORT_FIELDS = ('kind', 'line', 'order_id', 'expected_amount', 'settled_amount')
+
+
+class Command(BaseCommand):
+    """Management command to reconcile payments against a provider settlement file."""
+    help = 'Apply payment statuses from a settlement file (CSV or NDJSON) and report mismatches'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('path', help='Settlement file (.csv, .ndjson or .jsonl)')
+        parser.add_argument('--format', choices=['csv', 'ndjson'], default=None, help='Override format detection')
+        parser.add_argument('--dry-run', action='store_true', help='Report without updating payments')
+        parser.add_argument('--report', default=None, help='Write every unapplied line to this CSV file')
+        parser.add_argument('--chunk-size', type=int, default=None, help='Lines per chunk (default: RECONCILIATION_CHUNK_SIZE)')
+
+    def handle(self, *args, **options) -> None:
+        """Execute the command."""
+        try:
+            fmt = options['format'] or detect_format(options['path'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        report_file = None
+        try:
+            writer = None
+            if options['report']:
+                report_file = open(options['report'], 'w', newline='')
+                writer = csv.DictWriter(report_file, REPORT_FIELDS)
+                writer.writeheader()
+            with open(options['path'], newline='', encoding='utf-8') as stream:
+                stats = reconcile_settlement(
+                    stream,
+                    fmt,
+                    dry_run=options['dry_run'],
+                    on_mismatch=writer.writerow if writer else None,
+                    chunk_size=options['chunk_size'],
+                )
+        except OSError as exc:
+            raise CommandError(str(exc))
+        except UnicodeDecodeError as exc:
+            raise CommandError(f"Settlement file is not valid UTF-8 ({exc.reason}); chunks before the error were applied")
+        finally:
+            if report_file:
+                report_file.close()
+
+        prefix = 'Dry run: ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {prefix}{stats['lines']} lines in {stats['seconds']}s ({stats['lines_per_second']} lines/s): "
+            f"{stats['updated']} updated, {stats['matched']} already matching"
+        ))
+        problems = {
+            kind: stats[kind]
+            for kind in ('amount_mismatch', 'unknown_order', 'no_payment', 'status_changed', 'duplicate', 'invalid')
+            if stats[kind]
+        }
+        if problems:
+            self.stdout.write(self.style.WARNING(
+                'Not applied: ' + ', '.join(f'{count} {kind}' for kind, count in problems.items())
+            ))
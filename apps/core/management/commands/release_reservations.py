@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from apps.core.services import release_expired_reservations
+
+
+class Command(BaseCommand):
+    """Management command to release expired cart stock reservations once."""
+    help = 'Release stock held by expired cart reservations'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('--batch-size', type=int, default=1000, help='Cart items per transaction')
+
+    def handle(self, *args, **options) -> None:
+        """Execute the command."""
+        released = release_expired_reservations(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'✓ Released {released} expired reservations'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from apps.core.scheduler import build_scheduler
+
+
+class Command(BaseCommand):
+    """Management command to run periodic maintenance jobs."""
+    help = 'Run the periodic job scheduler (reservation sweeper, ...) in the foreground'
+
+    def handle(self, *args, **options) -> None:
+        """Execute the command."""
+        scheduler = build_scheduler()
+        for job in scheduler.get_jobs():
+            self.stdout.write(f'Scheduled {job.id} every {job.trigger.interval}')
+
+        self.stdout.write(self.style.SUCCESS('✓ Scheduler started, press Ctrl+C to stop'))
+        try:
+            scheduler.start()
+        except (KeyboardInterrupt, SystemExit):
+            self.stdout.write(self.style.WARNING('⚠ Scheduler stopped'))
@@ -0,0 +1,66 @@
+import multiprocessing
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from apps.core.services import run_jobs
+from apps.core.services.job_service import worker_name
+from apps.core.workers import worker_process
+
+
+class Command(BaseCommand):
+    """Management command to run background job workers."""
+    help = 'Run background job workers (post-order work, ...) in a process pool'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('--processes', type=int, default=getattr(settings, 'JOB_WORKER_PROCESSES', 2),
+                            help='Worker processes')
+        parser.add_argument('--batch-size', type=int, default=getattr(settings, 'JOB_BATCH_SIZE', 50),
+                            help='Jobs claimed per round')
+        parser.add_argument('--once', action='store_true',
+                            help='Run due jobs in this process until none are left, then exit')
+
+    def handle(self, *args, **options) -> None:
+        """Execute the command."""
+        batch_size = options['batch_size']
+        if options['once']:
+            totals = {'claimed': 0, 'succeeded': 0, 'failed': 0}
+            while True:
+                stats = run_jobs(worker_name(), batch_size)
+                if not stats['claimed']:
+                    break
+                for key in totals:
+                    totals[key] += stats[key]
+            self.stdout.write(self.style.SUCCESS(
+                f"✓ Ran {totals['claimed']} jobs: {totals['succeeded']} succeeded, {totals['failed']} failed"
+            ))
+            return
+
+        # Forked children must not share the parent's database connections.
+        connections.close_all()
+        # None is the platform default (spawn on macOS and Windows, fork or forkserver on Linux).
+        context = multiprocessing.get_context(getattr(settings, 'JOB_WORKER_START_METHOD', None))
+        stop = context.Event()
+        poll_interval = getattr(settings, 'JOB_POLL_INTERVAL', 1.0)
+        processes = [
+            context.Process(target=worker_process, args=(stop, batch_size, poll_interval), daemon=True)
+            for _ in range(max(1, options['processes']))
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {len(processes)} workers started, press Ctrl+C to stop'
+        ))
+        signal.signal(signal.SIGTERM, lambda *args: stop.set())
+        try:
+            while not stop.is_set() and any(process.is_alive() for process in processes):
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            pass
+        stop.set()
+        for process in processes:
+            process.join()
+        self.stdout.write(self.style.WARNING('⚠ Workers stopped'))
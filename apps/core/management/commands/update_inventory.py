@@ -0,0 +1,61 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.services import bulk_update_inventory
+from apps.core.services.files import detect_record_format, iter_records
+
+REPORT_FIELDS = ('kind', 'row', 'product_id', 'stock', 'reserved')
+
+
+class Command(BaseCommand):
+    """Management command to apply a warehouse stock and price file."""
+    help = 'Apply product stock and prices from a warehouse file (CSV or NDJSON) in one transaction'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('path', help='File with product_id,stock,price records (.csv, .ndjson or .jsonl)')
+        parser.add_argument('--format', choices=['csv', 'ndjson'], default=None, help='Override format detection')
+        parser.add_argument('--dry-run', action='store_true', help='Report without updating products')
+        parser.add_argument('--report', default=None, help='Write every conflicting line to this CSV file')
+        parser.add_argument('--chunk-size', type=int, default=None, help='Products per UPDATE (default: INVENTORY_CHUNK_SIZE)')
+
+    def handle(self, *args, **options) -> None:
+        """Execute the command."""
+        try:
+            fmt = options['format'] or detect_record_format(options['path'], 'inventory file')
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        report_file = open(options['report'], 'w', newline='') if options['report'] else None
+        writer = csv.DictWriter(report_file, REPORT_FIELDS) if report_file else None
+        if writer:
+            writer.writeheader()
+
+        try:
+            with open(options['path'], newline='', encoding='utf-8') as stream:
+                stats = bulk_update_inventory(
+                    iter_records(stream, fmt),
+                    dry_run=options['dry_run'],
+                    on_conflict=writer.writerow if writer else None,
+                    chunk_size=options['chunk_size'],
+                )
+        except OSError as exc:
+            raise CommandError(str(exc))
+        finally:
+            if report_file:
+                report_file.close()
+
+        prefix = 'Dry run: ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {prefix}{stats['rows']} lines in {stats['seconds']}s: "
+            f"{stats['updated']} products updated, {stats['unchanged']} unchanged"
+        ))
+        conflicts = {
+            kind: stats[kind]
+            for kind in ('invalid', 'duplicate', 'unknown_product', 'over_reserved')
+            if stats[kind]
+        }
+        if conflicts:
+            self.stdout.write(self.style.WARNING(
+                'Conflicts: ' + ', '.join(f'{count} {kind}' for kind, count in conflicts.items())
+            ))
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.core.services import warm_caches
+
+
+class Command(BaseCommand):
+    """Management command to warm caches after a deploy."""
+    help = 'Request the top product pages, the category list and the first product list pages to fill caches'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('--products', type=int, default=getattr(settings, 'WARM_TOP_PRODUCTS', 200),
+                            help='Most ordered products whose detail pages are warmed')
+        parser.add_argument('--concurrency', type=int, default=getattr(settings, 'WARM_CONCURRENCY', 4),
+                            help='Requests in flight at once')
+
+    def handle(self, *args, **options) -> None:
+        """Execute the command."""
+        self.stdout.write('Warming caches...')
+
+        stats = warm_caches(top_products=options['products'], concurrency=options['concurrency'])
+
+        for group, counts in stats['groups'].items():
+            line = f"{counts['warmed']}/{counts['total']} {group}"
+            if group == 'product details':
+                line += f" ({stats['order_share']:.1%} of recently ordered units)"
+            style = self.style.SUCCESS if counts['warmed'] == counts['total'] else self.style.WARNING
+            self.stdout.write(style(f"{'✓' if style == self.style.SUCCESS else '⚠'} Warmed {line}"))
+        for path in stats['failed']:
+            self.stdout.write(self.style.WARNING(f'⚠ Failed: {path}'))
+        self.stdout.write(f"Done in {stats['seconds']}s")
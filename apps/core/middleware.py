@@ -0,0 +1,27 @@
+from typing import Callable
+
+from django.http import HttpRequest, HttpResponse
+
+from apps.core.db_router import has_written, pin_to_primary, reset_write_tracking
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Pin a user's reads to the primary database for a short window after they write.
+
+    Must run after authentication; DRF copies the JWT user onto the Django
+    request, so ``request.user`` is the authenticated user by the time the
+    response comes back.
+    """
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        reset_write_tracking()
+        response = self.get_response(request)
+
+        user = getattr(request, "user", None)
+        if has_written() and user is not None and user.is_authenticated:
+            pin_to_primary(user.pk)
+        return response
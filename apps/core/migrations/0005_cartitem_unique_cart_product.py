@@ -0,0 +1,38 @@
+from django.db import migrations, models
+from django.db.models import Count, F
+
+
+def merge_duplicate_items(apps, schema_editor):
+    """Fold duplicate (cart, product) rows into the oldest one, releasing their stock holds."""
+    CartItem = apps.get_model('core', 'CartItem')
+    Product = apps.get_model('core', 'Product')
+    duplicates = (
+        CartItem.objects.values('cart_id', 'product_id')
+        .annotate(rows=Count('id'))
+        .filter(rows__gt=1)
+    )
+    for pair in duplicates:
+        items = list(CartItem.objects.filter(**pair).order_by('id'))
+        held = sum(item.quantity for item in items if item.reserved_until is not None)
+        if held:
+            Product.objects.filter(id=pair['product_id']).update(stock=F('stock') + held)
+        keep = items[0]
+        keep.quantity = sum(item.quantity for item in items)
+        keep.reserved_until = None
+        keep.save(update_fields=['quantity', 'reserved_until'])
+        CartItem.objects.filter(id__in=[item.id for item in items[1:]]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_order_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(fields=('cart', 'product'), name='unique_cart_product'),
+        ),
+    ]
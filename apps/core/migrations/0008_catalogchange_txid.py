@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_catalogchange'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='catalogchange',
+            name='txid',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AddIndex(
+            model_name='catalogchange',
+            index=models.Index(fields=['txid', 'id'], name='catalog_change_txid_idx'),
+        ),
+    ]
@@ -1,5 +1,8 @@
-from django.db import models
+from typing import Iterable
+
+from django.db import connections, models, router, transaction
 from django.contrib.auth.models import AbstractUser
+from django.core.serializers.json import DjangoJSONEncoder
 from decimal import Decimal
 
 
@@ -14,10 +17,72 @@ class User(AbstractUser):
         return self.email
 
 
-class Category(models.Model):
+class CatalogQuerySet(models.QuerySet):
+    """
+    Catalog queryset that records bulk writes in the change log.
+
+    ``update()`` (and so ``bulk_update()``) and ``bulk_create()`` send no
+    signals; saves and deletes are recorded by ``apps.core.signals``. Each
+    write and its log entries commit in one transaction.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._log_changes = True
+
+    def _clone(self):
+        clone = super()._clone()
+        clone._log_changes = self._log_changes
+        return clone
+
+    def without_change_log(self) -> 'CatalogQuerySet':
+        """
+        Do not log this queryset's ``update()``.
+
+        For stock moved by cart holds and releases: it changes with every cart
+        update, and logging it would turn the feed into a stream of stock ticks.
+        """
+        clone = self._chain()
+        clone._log_changes = False
+        return clone
+
+    def update(self, **kwargs) -> int:
+        if not self._log_changes:
+            return super().update(**kwargs)
+        with transaction.atomic(using=self.db, savepoint=False):
+            ids = list(self.values_list('pk', flat=True))
+            rows = super().update(**kwargs)
+            if rows:
+                CatalogChange.record(self.model, ids, using=self.db)
+        return rows
+
+    update.alters_data = True
+
+    def bulk_create(self, objs, *args, **kwargs):
+        with transaction.atomic(using=self.db, savepoint=False):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            CatalogChange.record(self.model, [obj.pk for obj in objs if obj.pk is not None], using=self.db)
+        return objs
+
+
+class CatalogModel(models.Model):
+    """Base of the logged catalog models: a save and its change log entry commit together."""
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs) -> None:
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
+
+
+class Category(CatalogModel):
     """Product category model."""
     name = models.CharField(max_length=200)
 
+    objects = CatalogQuerySet.as_manager()
+
     class Meta:
         verbose_name_plural = "Categories"
 
@@ -25,7 +90,7 @@ class Category(models.Model):
         return self.name
 
 
-class Product(models.Model):
+class Product(CatalogModel):
     """Product model with category relationship."""
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='products')
     title = models.CharField(max_length=255)
@@ -33,6 +98,8 @@ class Product(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
     stock = models.PositiveIntegerField(default=0)
 
+    objects = CatalogQuerySet.as_manager()
+
     def __str__(self) -> str:
         return self.title
 
@@ -54,10 +121,22 @@ class Cart(models.Model):
 
 
 class CartItem(models.Model):
-    """Individual item in shopping cart."""
+    """
+    Individual item in shopping cart.
+
+    While ``reserved_until`` is set, ``quantity`` units are held back from
+    ``Product.stock``; expired holds are released by the reservation sweeper.
+    """
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
+    reserved_until = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            # Conflict target of the bulk upsert that merges anonymous carts on login.
+            models.UniqueConstraint(fields=['cart', 'product'], name='unique_cart_product'),
+        ]
 
     def __str__(self) -> str:
         return f"{self.product.title} x {self.quantity}"
@@ -73,6 +152,13 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     total_price = models.DecimalField(max_digits=10, decimal_places=2)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of a user's orders: WHERE user = ? AND (created_at, id) < (?, ?)
+            models.Index(fields=['user', 'created_at', 'id'], name='order_user_created_idx'),
+            models.Index(fields=['user', 'total_price', 'id'], name='order_user_total_idx'),
+        ]
+
     def __str__(self) -> str:
         return f"Order #{self.id}"
 
@@ -97,3 +183,114 @@ class Payment(models.Model):
 
     def __str__(self) -> str:
         return f"Payment for Order #{self.order.id}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Outcome of a POST sent with an ``Idempotency-Key`` header.
+
+    The row is inserted before the request runs, so the unique (user, key)
+    constraint doubles as a lock; ``response_status`` stays empty until the
+    first execution finishes.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    locked_at = models.DateTimeField()
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_idempotency_key_per_user'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.key} ({self.user_id})"
+
+
+class Job(models.Model):
+    """
+    Background job, run by ``manage.py run_workers``.
+
+    Workers claim due ``queued`` jobs by setting ``status`` to ``running``
+    and ``locked_until``; a running job whose lock expired (its worker died)
+    can be claimed again. Successful jobs are deleted, jobs out of attempts
+    are kept as ``failed``.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (FAILED, 'Failed')]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    run_at = models.DateTimeField()
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    locked_by = models.CharField(max_length=64, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Claim query: WHERE status = ? AND run_at <= now ORDER BY run_at, id
+            models.Index(fields=['status', 'run_at', 'id'], name='job_claim_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.name} #{self.id} ({self.status})"
+
+
+class CatalogChange(models.Model):
+    """
+    Append-only log of Product and Category writes, served by the catalog change feed.
+
+    ``id`` is the feed cursor. Only the latest entry per object matters, since
+    the feed returns current object state; compaction deletes older ones.
+
+    Entries are inserted in the transaction of the write they describe, so
+    they commit (or roll back) with it. Ids are therefore not visible in the
+    order they are allocated: the feed cursor is ``txid`` on PostgreSQL and
+    ``id`` elsewhere; see ``change_feed_service`` for how readers bound it.
+    """
+    PRODUCT = 'product'
+    CATEGORY = 'category'
+    KIND_CHOICES = [(PRODUCT, 'Product'), (CATEGORY, 'Category')]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # PostgreSQL transaction id of the write (pg_current_xact_id); NULL on other backends.
+    txid = models.BigIntegerField(null=True)
+
+    class Meta:
+        indexes = [
+            # Compaction: is there a newer entry for the same object?
+            models.Index(fields=['kind', 'object_id', 'id'], name='catalog_change_object_idx'),
+            # Feed reads on PostgreSQL: entries after a cursor, in transaction order.
+            models.Index(fields=['txid', 'id'], name='catalog_change_txid_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f"#{self.id} {self.kind} {self.object_id}{' deleted' if self.deleted else ''}"
+
+    @classmethod
+    def record(cls, model: type, ids: Iterable[int], deleted: bool = False, using: str = 'default') -> None:
+        """Append one entry per id of ``model`` (Product or Category) in the current transaction."""
+        kind = model._meta.model_name
+        entries = [cls(kind=kind, object_id=object_id, deleted=deleted) for object_id in ids]
+        if not entries:
+            return
+        connection = connections[using]
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_current_xact_id()::text::bigint")
+                txid = cursor.fetchone()[0]
+            for entry in entries:
+                entry.txid = txid
+        cls.objects.using(using).bulk_create(entries)
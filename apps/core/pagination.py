@@ -0,0 +1,121 @@
+"""
+Keyset ("seek") pagination.
+
+Pages are addressed by the sort key of the last row already returned, not by
+an offset, so every page costs one index range scan regardless of how deep
+the client has paged:
+
+    WHERE (created_at, id) < (:last_created_at, :last_id) ORDER BY created_at DESC, id DESC LIMIT :n
+
+The primary key is appended as a tie-breaker, which makes the key unique even
+when many rows share the sort value. The sort field follows the view's
+``OrderingFilter``.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q, QuerySet
+from rest_framework import filters
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Forward-only keyset pagination on (ordering field, pk)."""
+    cursor_query_param = "cursor"
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    invalid_cursor_message = "Invalid cursor"
+
+    def get_page_size(self, request: Request) -> int:
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_ordering(self, request: Request, queryset: QuerySet, view) -> str:
+        """The view's effective ordering field, e.g. "-created_at"."""
+        for backend in getattr(view, "filter_backends", []):
+            if issubclass(backend, filters.OrderingFilter):
+                ordering = backend().get_ordering(request, queryset, view)
+                if ordering:
+                    return ordering[0]
+        return "-pk"
+
+    @staticmethod
+    def encode_value(value: Any) -> Any:
+        # isoformat keeps microseconds, which the position must match exactly.
+        return value.isoformat() if isinstance(value, datetime) else str(value)
+
+    def encode_cursor(self, ordering: str, position: Tuple[Any, int]) -> str:
+        payload = json.dumps([ordering, self.encode_value(position[0]), position[1]], separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, request: Request, ordering: str) -> Optional[Tuple[Any, int]]:
+        raw = request.query_params.get(self.cursor_query_param)
+        if not raw:
+            return None
+        try:
+            cursor_ordering, value, pk = json.loads(base64.urlsafe_b64decode(raw + "=" * (-len(raw) % 4)))
+        except (binascii.Error, ValueError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+        # A cursor only makes sense for the ordering it was issued under.
+        if cursor_ordering != ordering or not isinstance(pk, int):
+            raise NotFound(self.invalid_cursor_message)
+        return value, pk
+
+    def paginate_queryset(self, queryset: QuerySet, request: Request, view=None) -> List:
+        ordering = self.get_ordering(request, queryset, view)
+        descending = ordering.startswith("-")
+        field = ordering.lstrip("-")
+        pk_ordering = "-pk" if descending else "pk"
+        queryset = queryset.order_by(ordering, pk_ordering)
+
+        position = self.decode_cursor(request, ordering)
+        if position is not None:
+            value, pk = position
+            lookup = "lt" if descending else "gt"
+            try:
+                queryset = queryset.filter(
+                    Q(**{f"{field}__{lookup}": value}) | Q(**{field: value, f"pk__{lookup}": pk})
+                )
+            except (ValidationError, ValueError, TypeError):
+                raise NotFound(self.invalid_cursor_message)
+
+        self.request = request
+        size = self.get_page_size(request)
+        rows = list(queryset[:size + 1])
+        self.has_next = len(rows) > size
+        rows = rows[:size]
+        self.next_cursor = None
+        if self.has_next:
+            last = rows[-1]
+            self.next_cursor = self.encode_cursor(ordering, (getattr(last, field), last.pk))
+        return rows
+
+    def get_next_link(self) -> Optional[str]:
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data) -> Response:
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema: dict) -> dict:
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
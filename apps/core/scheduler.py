@@ -0,0 +1,107 @@
+"""
+Periodic maintenance jobs, run in a dedicated process by ``manage.py run_scheduler``.
+
+Each entry in ``JOBS`` is (job, interval setting name, default interval in seconds).
+"""
+import logging
+from functools import wraps
+from typing import Callable, List, Tuple
+
+from apscheduler.schedulers.base import BaseScheduler
+from apscheduler.schedulers.blocking import BlockingScheduler
+from django.conf import settings
+from django.db import close_old_connections
+
+from apps.core.services import (
+    build_catalog_snapshot,
+    build_similarity_model,
+    compact_catalog_changes,
+    evict_expired_idempotency_keys,
+    flush_carts,
+    release_expired_reservations,
+    write_behind_enabled,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def sweep_expired_reservations() -> None:
+    """Return stock held by expired cart reservations."""
+    released = release_expired_reservations(
+        batch_size=getattr(settings, "RESERVATION_SWEEP_BATCH_SIZE", 1000)
+    )
+    if released:
+        logger.info("Released %d expired cart reservations", released)
+
+
+def evict_idempotency_keys() -> None:
+    """Delete idempotency keys past their TTL."""
+    deleted = evict_expired_idempotency_keys()
+    if deleted:
+        logger.info("Evicted %d expired idempotency keys", deleted)
+
+
+def refresh_catalog_snapshot() -> None:
+    """Rebuild the catalog snapshot if the catalog changed or it reached its max age."""
+    stats = build_catalog_snapshot(force=False)
+    if stats["published"]:
+        logger.info("Published catalog snapshot %s (%d bytes)", stats["version"], stats["bytes"])
+
+
+def refresh_similarity_model() -> None:
+    """Refit and publish the similar-products model if the catalog changed."""
+    stats = build_similarity_model(force=False)
+    if stats["published"]:
+        logger.info("Published similarity model %s (%d products)", stats["version"], stats["products"])
+
+
+def compact_change_log() -> None:
+    """Drop catalog change log entries superseded by newer ones."""
+    deleted = compact_catalog_changes()
+    if deleted:
+        logger.info("Compacted %d catalog change log entries", deleted)
+
+
+def flush_cart_writes() -> None:
+    """Write carts changed in the cache back to the database (CART_STORAGE = "cache")."""
+    if not write_behind_enabled():
+        return
+    flushed = flush_carts()
+    if flushed:
+        logger.info("Flushed %d cached carts", flushed)
+
+
+JOBS: List[Tuple[Callable[[], None], str, int]] = [
+    (sweep_expired_reservations, "RESERVATION_SWEEP_INTERVAL", 60),
+    (evict_idempotency_keys, "IDEMPOTENCY_EVICTION_INTERVAL", 60 * 60),
+    (refresh_catalog_snapshot, "CATALOG_SNAPSHOT_INTERVAL", 30),
+    (refresh_similarity_model, "SIMILARITY_BUILD_INTERVAL", 5 * 60),
+    (flush_cart_writes, "CART_WRITE_BEHIND_WINDOW", 5),
+    (compact_change_log, "CATALOG_CHANGES_COMPACTION_INTERVAL", 10 * 60),
+]
+
+
+def _with_connection_cleanup(job: Callable[[], None]) -> Callable[[], None]:
+    @wraps(job)
+    def run() -> None:
+        close_old_connections()
+        try:
+            job()
+        finally:
+            close_old_connections()
+    return run
+
+
+def build_scheduler(scheduler_class=BlockingScheduler) -> BaseScheduler:
+    """Create a scheduler with every job in ``JOBS`` registered."""
+    scheduler = scheduler_class(timezone="UTC")
+    for job, interval_setting, default_interval in JOBS:
+        scheduler.add_job(
+            _with_connection_cleanup(job),
+            "interval",
+            seconds=getattr(settings, interval_setting, default_interval),
+            id=job.__name__,
+            max_instances=1,
+            coalesce=True,
+        )
+    return scheduler
@@ -1,7 +1,15 @@
 from .auth_serializers import UserSerializer, RegisterSerializer, LoginSerializer
 from .product_serializers import CategorySerializer, ProductSerializer
-from .cart_serializers import CartSerializer, CartItemSerializer
-from .order_serializers import OrderSerializer, OrderItemSerializer, PaymentSerializer
+from .cart_serializers import CartSerializer, CartItemSerializer, SideloadedCartSerializer
+from .order_serializers import (
+    OrderSerializer,
+    OrderItemSerializer,
+    PaymentSerializer,
+    SideloadedOrderSerializer,
+    OrderSummarySerializer,
+    OrderDetailSerializer,
+    SideloadedOrderDetailSerializer,
+)
 
 __all__ = [
     'UserSerializer',
@@ -11,7 +19,12 @@ __all__ = [
     'ProductSerializer',
     'CartSerializer',
     'CartItemSerializer',
+    'SideloadedCartSerializer',
     'OrderSerializer',
     'OrderItemSerializer',
     'PaymentSerializer',
+    'SideloadedOrderSerializer',
+    'OrderSummarySerializer',
+    'OrderDetailSerializer',
+    'SideloadedOrderDetailSerializer',
 ]
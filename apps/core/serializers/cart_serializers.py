@@ -20,3 +20,16 @@ class CartSerializer(serializers.ModelSerializer):
     class Meta:
         model = Cart
         fields = "__all__"
+
+
+class SideloadedCartItemSerializer(serializers.ModelSerializer):
+    """Cart item referencing its product by id (products are sideloaded)."""
+
+    class Meta:
+        model = CartItem
+        fields = "__all__"
+
+
+class SideloadedCartSerializer(CartSerializer):
+    """Cart whose items reference products by id."""
+    items = SideloadedCartItemSerializer(many=True, read_only=True)
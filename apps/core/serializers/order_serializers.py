@@ -20,6 +20,44 @@ class OrderSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
         fields = "__all__"
+        read_only_fields = ("user",)
+
+
+class SideloadedOrderItemSerializer(serializers.ModelSerializer):
+    """Order item referencing its product by id (products are sideloaded)."""
+
+    class Meta:
+        model = OrderItem
+        fields = "__all__"
+
+
+class SideloadedOrderSerializer(OrderSerializer):
+    """Order whose items reference products by id."""
+    items = SideloadedOrderItemSerializer(many=True, read_only=True)
+
+
+class OrderDetailSerializer(OrderSerializer):
+    """Order with items and the ``payment_status`` annotation."""
+    payment_status = serializers.CharField(read_only=True, allow_null=True)
+
+
+class SideloadedOrderDetailSerializer(SideloadedOrderSerializer):
+    """Order detail whose items reference products by id."""
+    payment_status = serializers.CharField(read_only=True, allow_null=True)
+
+
+class OrderSummarySerializer(serializers.ModelSerializer):
+    """
+    Compact order representation for list pages.
+
+    ``item_count`` and ``payment_status`` are read from queryset annotations.
+    """
+    item_count = serializers.IntegerField(read_only=True)
+    payment_status = serializers.CharField(read_only=True, allow_null=True)
+
+    class Meta:
+        model = Order
+        fields = ("id", "created_at", "total_price", "item_count", "payment_status")
 
 
 class PaymentSerializer(serializers.ModelSerializer):
@@ -3,8 +3,42 @@ from .cart_service import (
     add_item_to_cart,
     remove_item_from_cart,
     update_item_quantity,
-    calculate_cart_total
+    calculate_cart_total,
+    release_expired_reservations,
+    checkout_cart,
+    InsufficientStock,
 )
+from .cart_cache_service import (
+    CartBusy,
+    add_live_item,
+    flush_cart,
+    flush_carts,
+    get_live_cart,
+    live_cart_checkout,
+    remove_live_item,
+    update_live_item,
+    write_behind_enabled,
+)
+from .anonymous_cart_service import (
+    anonymous_cart_max_items,
+    dump_anonymous_cart,
+    get_cart_products,
+    load_anonymous_cart,
+    merge_anonymous_cart,
+)
+from .analytics_service import get_sales_report
+from .idempotency_service import evict_expired_idempotency_keys
+from .facet_service import get_product_facets
+from .recommendation_service import build_recommendations, get_frequently_bought_together
+from .similarity_service import build_similarity_model, get_similar_products
+from .product_detail_service import get_product_detail
+from .order_service import get_order_detail, get_order_version, order_detail_etag
+from .change_feed_service import compact_catalog_changes, get_catalog_changes, latest_catalog_cursor
+from .inventory_service import bulk_update_inventory
+from .job_service import enqueue, job_handler, run_jobs
+from .reconciliation_service import detect_format, reconcile_settlement
+from .snapshot_service import build_catalog_snapshot, get_snapshot
+from .warming_service import warm_caches
 
 __all__ = [
     'get_or_create_cart',
@@ -12,4 +46,44 @@ __all__ = [
     'remove_item_from_cart',
     'update_item_quantity',
     'calculate_cart_total',
+    'release_expired_reservations',
+    'checkout_cart',
+    'InsufficientStock',
+    'CartBusy',
+    'add_live_item',
+    'flush_cart',
+    'flush_carts',
+    'get_live_cart',
+    'live_cart_checkout',
+    'remove_live_item',
+    'update_live_item',
+    'write_behind_enabled',
+    'anonymous_cart_max_items',
+    'dump_anonymous_cart',
+    'get_cart_products',
+    'load_anonymous_cart',
+    'merge_anonymous_cart',
+    'get_sales_report',
+    'evict_expired_idempotency_keys',
+    'get_product_facets',
+    'build_recommendations',
+    'get_frequently_bought_together',
+    'build_similarity_model',
+    'get_similar_products',
+    'get_product_detail',
+    'get_order_detail',
+    'get_order_version',
+    'order_detail_etag',
+    'compact_catalog_changes',
+    'get_catalog_changes',
+    'latest_catalog_cursor',
+    'bulk_update_inventory',
+    'enqueue',
+    'job_handler',
+    'run_jobs',
+    'detect_format',
+    'reconcile_settlement',
+    'build_catalog_snapshot',
+    'get_snapshot',
+    'warm_caches',
 ]
@@ -0,0 +1,216 @@
+"""
+Sales analytics computed with vectorized NumPy/pandas aggregation.
+
+Order lines are pulled from the database in primary-key ordered chunks via
+``values_list`` and reduced per chunk, so memory stays bounded no matter how
+many rows are scanned. Results are bucketed per UTC day; finished days never
+change, so their buckets are cached indefinitely and only new days are
+recomputed.
+"""
+from datetime import date, datetime, time, timedelta
+from datetime import timezone as dt_timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from apps.core.models import OrderItem
+
+ANALYTICS_CACHE_PREFIX = "analytics:sales:v1"
+PERCENTILES = (50, 90, 99)
+UNPAID_METHOD = "none"
+
+_COLUMNS = ("pk", "order_id", "created_at", "category_id", "method", "price", "quantity")
+
+
+def _chunk_size() -> int:
+    return getattr(settings, "ANALYTICS_CHUNK_SIZE", 50_000)
+
+
+def _bucket_key(day: date) -> str:
+    return f"{ANALYTICS_CACHE_PREFIX}:{day.isoformat()}"
+
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min, tzinfo=dt_timezone.utc)
+
+
+def iter_order_item_chunks(start: datetime, end: datetime, chunk_size: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    """
+    Yield order lines created in [start, end) as DataFrames of at most ``chunk_size`` rows.
+
+    Uses keyset pagination on the primary key so every chunk is an index range scan.
+    """
+    chunk_size = chunk_size or _chunk_size()
+    queryset = OrderItem.objects.filter(
+        order__created_at__gte=start,
+        order__created_at__lt=end,
+    ).order_by("pk")
+
+    last_pk = 0
+    while True:
+        rows = list(
+            queryset.filter(pk__gt=last_pk).values_list(
+                "pk",
+                "order_id",
+                "order__created_at",
+                "product__category_id",
+                "order__payment__method",
+                "price",
+                "quantity",
+            )[:chunk_size]
+        )
+        if not rows:
+            return
+        last_pk = rows[-1][0]
+        yield pd.DataFrame.from_records(rows, columns=_COLUMNS)
+
+
+def _reduce_chunk(frame: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """Collapse a chunk of order lines into per-order and per-category partial sums."""
+    frame = frame.assign(
+        day=pd.to_datetime(frame["created_at"], utc=True).dt.floor("D"),
+        method=frame["method"].fillna(UNPAID_METHOD),
+        quantity=frame["quantity"].to_numpy(dtype=np.int64),
+        revenue=frame["price"].to_numpy(dtype=np.float64) * frame["quantity"].to_numpy(dtype=np.int64),
+    )
+    values = ["revenue", "quantity"]
+    return {
+        "orders": frame.groupby(["day", "order_id", "method"])[values].sum(),
+        "categories": frame.groupby(["day", "category_id"])[values].sum(),
+    }
+
+
+def _empty_bucket(day: date) -> Dict[str, Any]:
+    return {
+        "date": day.isoformat(),
+        "revenue": 0.0,
+        "orders": 0,
+        "items": 0,
+        "by_category": {},
+        "by_payment_method": {},
+        "order_value_percentiles": {f"p{p}": 0.0 for p in PERCENTILES},
+    }
+
+
+def compute_daily_buckets(start: date, end: date, chunk_size: Optional[int] = None) -> Dict[date, Dict[str, Any]]:
+    """
+    Compute sales buckets for every day in [start, end] (inclusive).
+
+    Days without sales are returned as zero buckets so they can be cached too.
+    """
+    buckets = {start + timedelta(days=i): _empty_bucket(start + timedelta(days=i)) for i in range((end - start).days + 1)}
+
+    partial_orders: List[pd.DataFrame] = []
+    partial_categories: List[pd.DataFrame] = []
+    for chunk in iter_order_item_chunks(_day_start(start), _day_start(end + timedelta(days=1)), chunk_size):
+        reduced = _reduce_chunk(chunk)
+        partial_orders.append(reduced["orders"])
+        partial_categories.append(reduced["categories"])
+
+    if not partial_orders:
+        return buckets
+
+    # An order's lines may straddle chunk boundaries, so partials are summed once more.
+    orders = pd.concat(partial_orders).groupby(level=[0, 1, 2]).sum().reset_index()
+    categories = pd.concat(partial_categories).groupby(level=[0, 1]).sum().reset_index()
+
+    by_day = orders.groupby("day").agg(
+        revenue=("revenue", "sum"),
+        orders=("order_id", "nunique"),
+        items=("quantity", "sum"),
+    )
+    by_method = orders.groupby(["day", "method"]).agg(
+        revenue=("revenue", "sum"),
+        orders=("order_id", "nunique"),
+    )
+    quantiles = orders.groupby("day")["revenue"].quantile([p / 100 for p in PERCENTILES]).unstack()
+
+    for day, row in by_day.iterrows():
+        bucket = buckets[day.date()]
+        bucket["revenue"] = round(float(row["revenue"]), 2)
+        bucket["orders"] = int(row["orders"])
+        bucket["items"] = int(row["items"])
+        bucket["order_value_percentiles"] = {
+            f"p{p}": round(float(quantiles.loc[day].iloc[i]), 2) for i, p in enumerate(PERCENTILES)
+        }
+
+    for (day, method), row in by_method.iterrows():
+        buckets[day.date()]["by_payment_method"][method] = {
+            "revenue": round(float(row["revenue"]), 2),
+            "orders": int(row["orders"]),
+        }
+
+    for row in categories.itertuples(index=False):
+        buckets[row.day.date()]["by_category"][str(row.category_id)] = {
+            "revenue": round(float(row.revenue), 2),
+            "items": int(row.quantity),
+        }
+
+    return buckets
+
+
+def _ranges(days: List[date]) -> List[Tuple[date, date]]:
+    """Collapse sorted ``days`` into inclusive (first, last) runs of consecutive days."""
+    ranges: List[Tuple[date, date]] = []
+    for day in days:
+        if ranges and ranges[-1][1] + timedelta(days=1) == day:
+            ranges[-1] = (ranges[-1][0], day)
+        else:
+            ranges.append((day, day))
+    return ranges
+
+
+def get_sales_report(start: date, end: date) -> Dict[str, Any]:
+    """
+    Return per-day sales buckets for [start, end] plus range totals.
+
+    Closed days are served from the cache; only days missing from the cache
+    and the current (still open) day are recomputed, one scan per run of
+    consecutive missing days, so cached days in between are never re-read.
+    """
+    today = timezone.now().astimezone(dt_timezone.utc).date()
+    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+    closed_keys = {_bucket_key(day): day for day in days if day < today}
+    cached = cache.get_many(list(closed_keys))
+    buckets = {closed_keys[key]: bucket for key, bucket in cached.items()}
+
+    missing = [day for day in days if day not in buckets]
+    fresh: Dict[date, Dict[str, Any]] = {}
+    for first, last in _ranges(missing):
+        fresh.update(compute_daily_buckets(first, last))
+    if fresh:
+        buckets.update(fresh)
+        cache.set_many(
+            {_bucket_key(day): bucket for day, bucket in fresh.items() if day < today},
+            timeout=None,
+        )
+
+    ordered = [buckets[day] for day in days]
+    totals: Dict[str, Any] = {
+        "revenue": round(sum(b["revenue"] for b in ordered), 2),
+        "orders": sum(b["orders"] for b in ordered),
+        "items": sum(b["items"] for b in ordered),
+        "by_category": {},
+        "by_payment_method": {},
+    }
+    for bucket in ordered:
+        for category_id, stats in bucket["by_category"].items():
+            entry = totals["by_category"].setdefault(category_id, {"revenue": 0.0, "items": 0})
+            entry["revenue"] = round(entry["revenue"] + stats["revenue"], 2)
+            entry["items"] += stats["items"]
+        for method, stats in bucket["by_payment_method"].items():
+            entry = totals["by_payment_method"].setdefault(method, {"revenue": 0.0, "orders": 0})
+            entry["revenue"] = round(entry["revenue"] + stats["revenue"], 2)
+            entry["orders"] += stats["orders"]
+
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "totals": totals,
+        "days": ordered,
+    }
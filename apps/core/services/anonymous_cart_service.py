@@ -0,0 +1,128 @@
+"""
+Anonymous carts, kept client-side.
+
+A shopper who is not logged in carries their cart in a signed token, sent
+back either as the ``ANONYMOUS_CART_COOKIE`` cookie or the ``X-Cart-Token``
+header. Nothing is stored server-side: the token is a compressed, signed
+list of ``[product_id, quantity]`` pairs, and every read validates and prices
+it with one ``IN`` query on ``Product``.
+
+Anonymous carts do not hold stock. On login the cart is merged into the
+user's ``Cart`` with one bulk upsert on (cart, product).
+"""
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import transaction
+
+from apps.core.models import Cart, CartItem, Product, User
+from apps.core.services.cart_cache_service import CART_KEY, flush_cart, write_behind_enabled
+from apps.core.services.cart_service import release_stock_bulk
+
+ANONYMOUS_CART_SALT = "apps.core.anonymous_cart"
+
+Items = Dict[int, int]
+
+
+def anonymous_cart_max_items() -> int:
+    """Products an anonymous cart may hold, which bounds the cookie size."""
+    return getattr(settings, "ANONYMOUS_CART_MAX_ITEMS", 50)
+
+
+def load_anonymous_cart(token: Optional[str]) -> Items:
+    """
+    Decode an anonymous cart token.
+
+    Returns:
+        {product_id: quantity}; empty if the token is missing, tampered with,
+        expired or malformed.
+    """
+    if not token:
+        return {}
+    try:
+        pairs = signing.loads(
+            token,
+            salt=ANONYMOUS_CART_SALT,
+            max_age=getattr(settings, "ANONYMOUS_CART_MAX_AGE", 30 * 24 * 60 * 60),
+        )
+    except signing.BadSignature:  # includes SignatureExpired
+        return {}
+    items: Items = {}
+    if not isinstance(pairs, list):
+        return items
+    for pair in pairs[:anonymous_cart_max_items()]:
+        if (
+            isinstance(pair, list) and len(pair) == 2
+            and all(isinstance(value, int) and not isinstance(value, bool) and value > 0 for value in pair)
+        ):
+            items[pair[0]] = pair[1]
+    return items
+
+
+def dump_anonymous_cart(items: Items) -> str:
+    """Encode ``items`` as a signed, compressed token."""
+    return signing.dumps(
+        [[product_id, quantity] for product_id, quantity in sorted(items.items())],
+        salt=ANONYMOUS_CART_SALT,
+        compress=True,
+    )
+
+
+def get_cart_products(items: Items) -> Dict[int, Product]:
+    """Products of ``items`` that still exist, with one ``IN`` query."""
+    if not items:
+        return {}
+    return Product.objects.in_bulk(list(items))
+
+
+def merge_anonymous_cart(user: User, items: Items) -> int:
+    """
+    Merge an anonymous cart into ``user``'s cart.
+
+    Quantities are added to what the cart already holds and capped at the
+    product's stock. Merged items hold no stock (as after an expired
+    reservation): holds of items already in the cart are released, and the
+    next quantity update reserves the full amount again.
+
+    Returns:
+        Number of products merged.
+    """
+    products = get_cart_products(items)
+    if not products:
+        return 0
+    if write_behind_enabled():
+        flush_cart(user)  # merge into the written-back state, then reload the cache from it
+
+    cart, _ = Cart.objects.get_or_create(user=user)
+    with transaction.atomic():
+        existing = {
+            product_id: (quantity, reserved_until)
+            for product_id, quantity, reserved_until in CartItem.objects.select_for_update()
+            .filter(cart=cart, product_id__in=list(products))
+            .values_list("product_id", "quantity", "reserved_until")
+        }
+        held = {
+            product_id: quantity
+            for product_id, (quantity, reserved_until) in existing.items()
+            if reserved_until is not None
+        }
+        merged = []
+        for product_id, product in products.items():
+            current = existing.get(product_id, (0, None))[0]
+            available = product.stock + held.get(product_id, 0)
+            quantity = min(current + items[product_id], available)
+            if quantity > 0:
+                merged.append(CartItem(cart=cart, product_id=product_id, quantity=quantity, reserved_until=None))
+        CartItem.objects.bulk_create(
+            merged,
+            update_conflicts=True,
+            unique_fields=["cart", "product"],
+            update_fields=["quantity", "reserved_until"],
+        )
+        release_stock_bulk(held)
+
+    if write_behind_enabled():
+        cache.delete(CART_KEY.format(user_id=user.pk))
+    return len(merged)
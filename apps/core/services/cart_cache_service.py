@@ -0,0 +1,427 @@
+"""
+Write-behind cart storage (``CART_STORAGE = "cache"``).
+
+The live cart of each user is kept in the Django cache and served from there;
+apart from creating a user's cart row on first use, cart endpoints only read
+from the database. Changes are written back to
+``Cart``/``CartItem`` in batches by the scheduler (``flush_cart_writes``)
+every ``CART_WRITE_BEHIND_WINDOW`` seconds, and a cart is flushed
+synchronously at checkout.
+
+Durability:
+
+- a cart that turns dirty is appended to a queue in the cache (an ``incr``
+  sequence plus one slot key per entry), so whichever process flushes finds
+  it, even if the process that wrote it died;
+- dirty carts are stored without expiry and clean ones with
+  ``CART_CACHE_TTL``, so a cache that only evicts expiring keys (Redis
+  ``volatile-lru``) never drops unflushed changes;
+- the queue pointer only advances after the database transaction commits,
+  and a flush writes the full cart state, so a crashed flush is simply
+  repeated;
+- at most ``CART_WRITE_BEHIND_WINDOW`` seconds of changes are lost if the
+  cache itself is lost. If the scheduler falls behind, the next change to a
+  cart that has been dirty longer than the window flushes it inline.
+
+Requires a cache shared by every process (Redis, Memcached): the live carts
+and the dirty-cart queue must be visible to all workers and to the scheduler.
+With the default per-process LocMem cache each worker would keep its own copy
+of a cart, so ``manage.py check`` rejects that combination (``core.E001``).
+
+Stock is checked against ``Product.stock`` on every change but only
+reserved when the cart is written back: a reservation is a synchronous
+database write per change, which is what this mode avoids. Written items
+hold their stock for ``CART_RESERVATION_TTL`` like database cart items, and
+checkout reserves whatever the last flush could not.
+
+Every write-back of a cart, scheduled or at checkout, runs under the cart's
+lock, so two flushes of one cart never insert the same items.
+"""
+import time
+import uuid
+from contextlib import ExitStack, contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from apps.core.models import Cart, CartItem, Product, User
+from apps.core.services.cart_service import InsufficientStock, hold_stock, release_stock_bulk, reservation_expiry
+
+CART_KEY = "cart:live:v1:{user_id}"
+LOCK_KEY = "cart:live:v1:{user_id}:lock"
+QUEUE_SEQ_KEY = "cart:dirty:seq"
+QUEUE_SLOT_KEY = "cart:dirty:{slot}"
+QUEUE_DONE_KEY = "cart:dirty:done"
+QUEUE_SEEN_KEY = "cart:dirty:seen"
+FLUSH_LOCK_KEY = "cart:flush:lock"
+
+LOCK_TIMEOUT = 5
+LOCK_WAIT = 2.0
+FLUSH_LOCK_TIMEOUT = 5 * 60
+
+Entry = Dict[str, Any]
+
+
+class CartBusy(Exception):
+    """The cart lock could not be taken within ``LOCK_WAIT`` seconds."""
+
+
+def write_behind_enabled() -> bool:
+    return getattr(settings, "CART_STORAGE", "database") == "cache"
+
+
+def _window() -> float:
+    return getattr(settings, "CART_WRITE_BEHIND_WINDOW", 5)
+
+
+@contextmanager
+def _lock(key: str, wait: float = LOCK_WAIT, timeout: int = LOCK_TIMEOUT) -> Iterator[None]:
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + wait
+    while not cache.add(key, token, timeout=timeout):
+        if time.monotonic() >= deadline:
+            raise CartBusy(key)
+        time.sleep(0.005)
+    try:
+        yield
+    finally:
+        if cache.get(key) == token:
+            cache.delete(key)
+
+
+# ---------------------------------------------------------------------------
+# Live cart entries
+# ---------------------------------------------------------------------------
+
+def _load_entry(user: User) -> Entry:
+    """Cached cart entry, read from the database on a miss."""
+    entry = cache.get(CART_KEY.format(user_id=user.pk))
+    if entry is not None:
+        return entry
+    cart, _ = Cart.objects.get_or_create(user=user)
+    rows = CartItem.objects.filter(cart=cart).values_list("id", "product_id", "quantity")
+    entry = {
+        "cart_id": cart.id,
+        "items": {product_id: quantity for _, product_id, quantity in rows},
+        "item_ids": {product_id: item_id for item_id, product_id, _ in rows},
+        "rev": 0,
+        "dirty_at": None,
+    }
+    cache.set(CART_KEY.format(user_id=user.pk), entry, timeout=getattr(settings, "CART_CACHE_TTL", 24 * 60 * 60))
+    return entry
+
+
+def _enqueue(user_id: int) -> None:
+    cache.add(QUEUE_SEQ_KEY, 0, timeout=None)
+    slot = cache.incr(QUEUE_SEQ_KEY)
+    cache.set(QUEUE_SLOT_KEY.format(slot=slot), user_id, timeout=None)
+
+
+def _save_dirty(user: User, entry: Entry) -> bool:
+    """
+    Store a changed entry, queueing the cart if it just turned dirty.
+
+    Returns:
+        True if the cart has been dirty for longer than the durability window
+        (the scheduler is behind), so the caller should flush it.
+    """
+    now = time.time()
+    entry["rev"] += 1
+    was_clean = entry["dirty_at"] is None
+    if was_clean:
+        entry["dirty_at"] = now
+    cache.set(CART_KEY.format(user_id=user.pk), entry, timeout=None)
+    if was_clean:
+        _enqueue(user.pk)
+    return now - entry["dirty_at"] > _window()
+
+
+def _available_stock(product_id: int) -> Optional[int]:
+    return Product.objects.filter(pk=product_id).values_list("stock", flat=True).first()
+
+
+def _product_key(product_id) -> Optional[int]:
+    """Request values may be strings; entries are keyed by int."""
+    try:
+        return int(product_id)
+    except (TypeError, ValueError):
+        return None
+
+
+def add_live_item(user: User, product: Product, quantity: int) -> None:
+    """
+    Add ``quantity`` of ``product`` to the cached cart.
+
+    Raises:
+        InsufficientStock: if the product's stock cannot cover the new quantity.
+    """
+    with _lock(LOCK_KEY.format(user_id=user.pk)):
+        entry = _load_entry(user)
+        new_quantity = entry["items"].get(product.pk, 0) + quantity
+        if product.stock < new_quantity:
+            raise InsufficientStock(product.pk)
+        entry["items"][product.pk] = new_quantity
+        stale = _save_dirty(user, entry)
+    if stale:
+        flush_cart(user)
+
+
+def update_live_item(user: User, product_id: int, quantity: int) -> bool:
+    """
+    Set the quantity of a product already in the cached cart.
+
+    Returns:
+        True if updated, False if the product is not in the cart.
+
+    Raises:
+        InsufficientStock: if the product's stock cannot cover ``quantity``.
+    """
+    product_id = _product_key(product_id)
+    with _lock(LOCK_KEY.format(user_id=user.pk)):
+        entry = _load_entry(user)
+        if product_id not in entry["items"]:
+            return False
+        if (_available_stock(product_id) or 0) < quantity:
+            raise InsufficientStock(product_id)
+        entry["items"][product_id] = quantity
+        stale = _save_dirty(user, entry)
+    if stale:
+        flush_cart(user)
+    return True
+
+
+def remove_live_item(user: User, product_id: int) -> bool:
+    """
+    Remove a product from the cached cart.
+
+    Returns:
+        True if removed, False if the product is not in the cart.
+    """
+    product_id = _product_key(product_id)
+    with _lock(LOCK_KEY.format(user_id=user.pk)):
+        entry = _load_entry(user)
+        if entry["items"].pop(product_id, None) is None:
+            return False
+        stale = _save_dirty(user, entry)
+    if stale:
+        flush_cart(user)
+    return True
+
+
+def get_live_cart(user: User) -> Cart:
+    """
+    A ``Cart`` built from the cache entry, with ``items`` prefetched.
+
+    Products are loaded with one ``IN`` query; the result serializes exactly
+    like a database cart (items not flushed yet have no id).
+    """
+    entry = _load_entry(user)
+    products = Product.objects.in_bulk(list(entry["items"]))
+    cart = Cart(id=entry["cart_id"], user=user)
+    cart._prefetched_objects_cache = {
+        "items": [
+            CartItem(
+                id=entry["item_ids"].get(product_id),
+                cart=cart,
+                product=products[product_id],
+                quantity=quantity,
+            )
+            for product_id, quantity in sorted(entry["items"].items())
+            if product_id in products
+        ],
+    }
+    return cart
+
+
+# ---------------------------------------------------------------------------
+# Write-back
+# ---------------------------------------------------------------------------
+
+def _write_carts(entries: Dict[int, Entry]) -> Dict[int, Dict[int, int]]:
+    """
+    Make the database carts of ``entries`` ({user_id: entry}) match them, in one transaction.
+
+    Written items hold their stock like database cart items, with a fresh
+    ``CART_RESERVATION_TTL``: only the difference to what an item already
+    holds is taken or returned. An item whose stock ran out meanwhile is
+    written without a hold (as after an expired reservation); checkout
+    takes its stock again or refuses the order. Callers hold the carts' locks.
+
+    Returns:
+        Item ids per user after the write: {user_id: {product_id: item_id}}.
+    """
+    by_cart = {entry["cart_id"]: (user_id, entry) for user_id, entry in entries.items()}
+    reserved_until = reservation_expiry()
+
+    with transaction.atomic():
+        existing: Dict[int, Dict[int, CartItem]] = {cart_id: {} for cart_id in by_cart}
+        # Locked, so the sweeper cannot release a hold between this read and the update.
+        for item in CartItem.objects.select_for_update().filter(cart_id__in=list(by_cart)).order_by("id"):
+            existing[item.cart_id][item.product_id] = item
+
+        to_create: List[CartItem] = []
+        to_update: List[CartItem] = []
+        to_delete: List[int] = []
+        released: Dict[int, int] = {}
+        for cart_id, (_, entry) in by_cart.items():
+            stored = existing[cart_id]
+            for product_id, quantity in entry["items"].items():
+                item = stored.get(product_id)
+                if item is None:
+                    item = CartItem(cart_id=cart_id, product_id=product_id, quantity=0)
+                    to_create.append(item)
+                else:
+                    to_update.append(item)
+                held = item.quantity if item.reserved_until is not None else 0
+                if quantity < held:
+                    released[product_id] = released.get(product_id, 0) + held - quantity
+                elif quantity > held and not hold_stock(product_id, quantity - held):
+                    released[product_id] = released.get(product_id, 0) + held
+                    item.quantity, item.reserved_until = quantity, None
+                    continue
+                item.quantity, item.reserved_until = quantity, reserved_until
+            to_delete += [item.id for product_id, item in stored.items() if product_id not in entry["items"]]
+
+        if to_delete:
+            CartItem.objects.filter(id__in=to_delete).delete()  # pre_delete releases held stock
+        if to_update:
+            CartItem.objects.bulk_update(to_update, ["quantity", "reserved_until"])
+        if to_create:
+            CartItem.objects.bulk_create(to_create)
+        release_stock_bulk(released)
+
+    item_ids: Dict[int, Dict[int, int]] = {user_id: {} for user_id in entries}
+    for item_id, cart_id, product_id in CartItem.objects.filter(cart_id__in=list(by_cart)).values_list(
+        "id", "cart_id", "product_id"
+    ):
+        item_ids[by_cart[cart_id][0]][product_id] = item_id
+    return item_ids
+
+
+def _mark_clean(user_id: int, written: Entry, item_ids: Dict[int, int]) -> None:
+    """
+    Record a successful write; the caller holds the cart's lock.
+
+    Changes are still compared by revision in case the lock expired during a
+    long write: changes made meanwhile stay dirty and are queued again.
+    """
+    key = CART_KEY.format(user_id=user_id)
+    entry = cache.get(key)
+    if entry is None:
+        return
+    entry["item_ids"] = item_ids
+    if entry["rev"] == written["rev"]:
+        entry["dirty_at"] = None
+        cache.set(key, entry, timeout=getattr(settings, "CART_CACHE_TTL", 24 * 60 * 60))
+    else:
+        cache.set(key, entry, timeout=None)
+        _enqueue(user_id)
+
+
+def _flush_locked(user_ids: Iterable[int]) -> int:
+    """Write back the dirty carts of ``user_ids``, whose locks the caller holds."""
+    keys = {CART_KEY.format(user_id=user_id): user_id for user_id in set(user_ids)}
+    entries = {
+        keys[key]: entry
+        for key, entry in cache.get_many(list(keys)).items()
+        if entry["dirty_at"] is not None
+    }
+    if not entries:
+        return 0
+    item_ids = _write_carts(entries)
+    for user_id, entry in entries.items():
+        _mark_clean(user_id, entry, item_ids[user_id])
+    return len(entries)
+
+
+def _flush_users(user_ids: Iterable[int]) -> int:
+    """
+    Write back the dirty carts of ``user_ids``, each under its cart lock.
+
+    The entries are read after the locks are taken, so a checkout flushing
+    the same cart cannot interleave with this write. A cart whose lock is
+    busy is queued again instead of waited for.
+    """
+    with ExitStack() as locks:
+        locked = []
+        for user_id in sorted(set(user_ids)):
+            try:
+                locks.enter_context(_lock(LOCK_KEY.format(user_id=user_id), wait=0))
+            except CartBusy:
+                _enqueue(user_id)
+                continue
+            locked.append(user_id)
+        return _flush_locked(locked)
+
+
+def flush_cart(user: User) -> None:
+    """
+    Write ``user``'s cached cart to the database now.
+
+    Raises:
+        CartBusy: if the cart stays locked for longer than ``LOCK_WAIT``.
+    """
+    with _lock(LOCK_KEY.format(user_id=user.pk)):
+        _flush_locked([user.pk])
+
+
+@contextmanager
+def live_cart_checkout(user: User) -> Iterator[None]:
+    """
+    Flush ``user``'s cached cart and keep it locked while the block checks it out.
+
+    The block must commit its own transaction. It empties the database cart,
+    so the cached one is dropped afterwards; if the block raises, the cache
+    keeps the cart as written back.
+
+    Raises:
+        CartBusy: if the cart stays locked for longer than ``LOCK_WAIT``.
+    """
+    with _lock(LOCK_KEY.format(user_id=user.pk)):
+        _flush_locked([user.pk])
+        yield
+        cache.delete(CART_KEY.format(user_id=user.pk))
+
+
+def flush_carts(batch_size: Optional[int] = None) -> int:
+    """
+    Write every queued dirty cart back to the database, ``batch_size`` carts per transaction.
+
+    A queue slot that is allocated but still empty was taken by a writer a
+    moment ago; it is waited for until the next run and skipped after that
+    (its writer died between ``incr`` and ``set``).
+
+    Returns:
+        Number of carts written.
+    """
+    batch_size = batch_size or getattr(settings, "CART_FLUSH_BATCH_SIZE", 500)
+    try:
+        with _lock(FLUSH_LOCK_KEY, wait=0, timeout=FLUSH_LOCK_TIMEOUT):
+            done = cache.get(QUEUE_DONE_KEY, 0)
+            seq = cache.get(QUEUE_SEQ_KEY, 0)
+            seen = cache.get(QUEUE_SEEN_KEY, 0)
+            flushed = 0
+            for start in range(done + 1, seq + 1, batch_size):
+                slots = range(start, min(start + batch_size, seq + 1))
+                values = cache.get_many([QUEUE_SLOT_KEY.format(slot=slot) for slot in slots])
+                user_ids = []
+                last = None
+                for slot in slots:
+                    user_id = values.get(QUEUE_SLOT_KEY.format(slot=slot))
+                    if user_id is None and slot > seen:
+                        break
+                    if user_id is not None:
+                        user_ids.append(user_id)
+                    last = slot
+                flushed += _flush_users(user_ids)
+                if last is not None:
+                    cache.set(QUEUE_DONE_KEY, last, timeout=None)
+                    cache.delete_many([QUEUE_SLOT_KEY.format(slot=slot) for slot in range(start, last + 1)])
+                if last != slots[-1]:
+                    break
+            cache.set(QUEUE_SEEN_KEY, seq, timeout=None)
+            return flushed
+    except CartBusy:
+        return 0  # another process is flushing
@@ -1,7 +1,71 @@
-from typing import Tuple
+from typing import Dict, List, Tuple
+from datetime import datetime, timedelta
 from decimal import Decimal
 
-from apps.core.models import Cart, CartItem, Product, User
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from apps.core.models import Cart, CartItem, Order, OrderItem, Product, User
+
+
+class InsufficientStock(Exception):
+    """Raised when a product does not have enough unreserved stock."""
+
+
+class _ReservationConflict(Exception):
+    """A swept batch changed concurrently; roll it back and retry."""
+
+
+def reservation_expiry() -> datetime:
+    return timezone.now() + timedelta(seconds=getattr(settings, "CART_RESERVATION_TTL", 15 * 60))
+
+
+def hold_stock(product_id: int, quantity: int) -> bool:
+    """
+    Atomically take ``quantity`` units out of available stock.
+
+    Runs a single conditional ``UPDATE ... WHERE stock >= quantity``, so only
+    the product row is touched and concurrent holds can never oversell.
+
+    Returns:
+        True if the stock was held, False if not enough stock is available.
+    """
+    return Product.objects.without_change_log().filter(id=product_id, stock__gte=quantity).update(
+        stock=F("stock") - quantity
+    ) == 1
+
+
+def release_stock(product_id: int, quantity: int) -> None:
+    """Return ``quantity`` held units to available stock."""
+    Product.objects.without_change_log().filter(id=product_id).update(stock=F("stock") + quantity)
+
+
+def release_stock_bulk(quantities: Dict[int, int]) -> None:
+    """Return held units for many products with a single ``UPDATE ... CASE``."""
+    if not quantities:
+        return
+    Product.objects.without_change_log().filter(id__in=quantities).update(
+        stock=F("stock") + Case(
+            *[When(id=product_id, then=Value(quantity)) for product_id, quantity in quantities.items()],
+            default=Value(0),
+        )
+    )
+
+
+def _set_item_quantity(item: CartItem, quantity: int) -> None:
+    """Adjust the stock hold to match ``quantity`` and refresh its expiry."""
+    held = item.quantity if item.reserved_until else 0
+    delta = quantity - held
+    if delta > 0 and not hold_stock(item.product_id, delta):
+        raise InsufficientStock(item.product_id)
+    if delta < 0:
+        release_stock(item.product_id, -delta)
+
+    item.quantity = quantity
+    item.reserved_until = reservation_expiry()
+    item.save(update_fields=["quantity", "reserved_until"])
 
 
 def get_or_create_cart(user: User) -> Cart:
@@ -12,63 +76,156 @@ def get_or_create_cart(user: User) -> Cart:
 
 def add_item_to_cart(user: User, product: Product, quantity: int) -> Tuple[CartItem, bool]:
     """
-    Add item to cart or update quantity.
-    
+    Add item to cart or update quantity, holding the added stock.
+
     Returns:
         Tuple of (CartItem, created: bool)
+
+    Raises:
+        InsufficientStock: if the product cannot cover the new quantity.
     """
     cart = get_or_create_cart(user)
-    
-    item, created = CartItem.objects.get_or_create(
-        cart=cart,
-        product=product,
-        defaults={"quantity": quantity}
-    )
-    
-    if not created:
-        item.quantity += quantity
-        item.save()
-    
+
+    with transaction.atomic():
+        item, created = CartItem.objects.select_for_update().get_or_create(
+            cart=cart,
+            product=product,
+            defaults={"quantity": 0}
+        )
+        _set_item_quantity(item, item.quantity + quantity)
+
     return item, created
 
 
+def release_hold(item: CartItem) -> None:
+    """
+    Release ``item``'s stock hold unless the sweeper (or anything else) already has.
+
+    Guarded like the sweeper's own ``UPDATE``: stock is credited only by
+    whoever clears ``reserved_until``, with the quantity read under the row
+    lock, so it is never credited twice or from a stale instance.
+    """
+    with transaction.atomic():
+        quantity = (
+            CartItem.objects.select_for_update()
+            .filter(id=item.id, reserved_until__isnull=False)
+            .values_list("quantity", flat=True)
+            .first()
+        )
+        if quantity is not None:
+            CartItem.objects.filter(id=item.id).update(reserved_until=None)
+            release_stock(item.product_id, quantity)
+    item.reserved_until = None
+
+
 def remove_item_from_cart(user: User, product_id: int) -> bool:
     """
-    Remove item from cart.
-    
+    Remove item from cart, releasing its stock hold.
+
     Returns:
         True if item was removed, False if not found.
     """
     try:
-        cart = Cart.objects.get(user=user)
-        item = CartItem.objects.get(cart=cart, product_id=product_id)
-        item.delete()
+        with transaction.atomic():
+            item = CartItem.objects.select_for_update().get(cart__user=user, product_id=product_id)
+            item.delete()  # pre_delete releases the hold
         return True
-    except (Cart.DoesNotExist, CartItem.DoesNotExist):
+    except CartItem.DoesNotExist:
         return False
 
 
 def update_item_quantity(user: User, product_id: int, quantity: int) -> bool:
     """
-    Update item quantity in cart.
-    
+    Update item quantity in cart, adjusting its stock hold.
+
     Returns:
         True if updated, False if not found.
+
+    Raises:
+        InsufficientStock: if the product cannot cover the new quantity.
     """
     try:
-        cart = Cart.objects.get(user=user)
-        item = CartItem.objects.get(cart=cart, product_id=product_id)
-        item.quantity = quantity
-        item.save()
+        with transaction.atomic():
+            item = CartItem.objects.select_for_update().get(cart__user=user, product_id=product_id)
+            _set_item_quantity(item, quantity)
         return True
-    except (Cart.DoesNotExist, CartItem.DoesNotExist):
+    except CartItem.DoesNotExist:
         return False
 
 
+def checkout_cart(user: User, order: Order) -> List[OrderItem]:
+    """
+    Turn the user's cart into ``order``'s items, consuming their stock holds.
+
+    Must run in the order's transaction. The items are locked, so the sweeper
+    cannot release a hold in between; held units become sold (their
+    ``reserved_until`` is cleared, so deleting the items credits nothing) and
+    items whose hold was already released take their stock again.
+
+    Raises:
+        InsufficientStock: if an unheld item cannot be covered; roll the order back.
+    """
+    items = list(CartItem.objects.select_for_update().filter(cart__user=user).select_related("product").order_by("id"))
+    for item in items:
+        if item.reserved_until is None and not hold_stock(item.product_id, item.quantity):
+            raise InsufficientStock(item.product_id)
+
+    ids = [item.id for item in items]
+    CartItem.objects.filter(id__in=ids).update(reserved_until=None)
+    CartItem.objects.filter(id__in=ids).delete()
+    return OrderItem.objects.bulk_create([
+        OrderItem(order=order, product=item.product, quantity=item.quantity, price=item.product.price)
+        for item in items
+    ])
+
+
+def release_expired_reservations(batch_size: int = 1000) -> int:
+    """
+    Release stock held by expired cart reservations, one batch per transaction.
+
+    Each batch clears ``reserved_until`` with a guarded ``UPDATE`` and credits
+    stock back with one ``UPDATE ... CASE``. If a cart mutation refreshed or
+    deleted a row between the read and the update, the batch is rolled back
+    and re-read, so stock is never credited twice.
+
+    Returns:
+        Number of cart items whose reservation was released.
+    """
+    released = 0
+    while True:
+        now = timezone.now()
+        try:
+            with transaction.atomic():
+                rows = list(
+                    CartItem.objects.select_for_update(skip_locked=True)
+                    .filter(reserved_until__lte=now)
+                    .order_by("reserved_until")
+                    .values_list("id", "product_id", "quantity")[:batch_size]
+                )
+                if not rows:
+                    return released
+
+                ids = [item_id for item_id, _, _ in rows]
+                updated = CartItem.objects.filter(id__in=ids, reserved_until__lte=now).update(reserved_until=None)
+                if updated != len(rows):
+                    raise _ReservationConflict()
+
+                quantities: Dict[int, int] = {}
+                for _, product_id, quantity in rows:
+                    quantities[product_id] = quantities.get(product_id, 0) + quantity
+                release_stock_bulk(quantities)
+        except _ReservationConflict:
+            continue
+
+        released += len(rows)
+        if len(rows) < batch_size:
+            return released
+
+
 def calculate_cart_total(cart: Cart) -> Decimal:
     """Calculate total price of cart."""
     total = sum(
-        item.product.price * item.quantity 
+        item.product.price * item.quantity
         for item in cart.items.all()
     )
     return Decimal(str(total))
@@ -0,0 +1,21 @@
+"""
+Catalog version token shared by every cache derived from products and categories.
+
+Product and Category saves and deletes replace the token (see
+``apps.core.signals``), so caches keyed on it are invalidated without
+tracking individual entries.
+"""
+import uuid
+
+from django.core.cache import cache
+
+CATALOG_VERSION_KEY = "catalog:version"
+
+
+def get_catalog_version() -> str:
+    return cache.get_or_set(CATALOG_VERSION_KEY, lambda: uuid.uuid4().hex, timeout=None)
+
+
+def bump_catalog_version() -> None:
+    """Invalidate every catalog-derived cache entry."""
+    cache.set(CATALOG_VERSION_KEY, uuid.uuid4().hex, timeout=None)
@@ -0,0 +1,134 @@
+"""
+Catalog change feed for incremental sync.
+
+Every Product and Category write appends a ``CatalogChange`` entry: saves
+and deletes through signals, ``update()``/``bulk_update()``/``bulk_create()``
+through ``CatalogQuerySet``. Clients keep the cursor (the position of the
+last entry they have seen) and ask for what changed after it:
+
+    GET /api/catalog/changes/?since=<cursor>
+
+The feed returns the current state of every object changed since the cursor
+(or a tombstone), so several changes to one object cost one delta, and older
+entries per object can be compacted away without affecting any cursor. Sync
+cost follows the number of changed objects, never the catalog size.
+
+Stock moved by cart holds and releases is not logged (it changes with every
+cart update); stock set by inventory updates and staff is.
+
+A cursor must never move past an entry that is still uncommitted, or the
+entry is skipped for good once it commits. Log entries are inserted in the
+transaction of the write they describe, so they can commit in any order;
+readers order them by a key whose uncommitted values are known to lie above
+a bound, and only serve entries below it:
+
+- PostgreSQL: the key is the writing transaction's id (``txid``) and the
+  bound the oldest transaction still running (``pg_snapshot_xmin``); every
+  transaction below it has finished, and every later one gets a higher id.
+  Entries of one transaction share a key, so a page always ends on a
+  transaction boundary;
+- SQLite: the key is ``id`` and every entry is served, as writers are
+  serialized and commit in id order;
+- other backends: the key is ``id`` and only entries older than
+  ``CATALOG_CHANGES_SETTLE_SECONDS`` are served, which has to cover the
+  longest catalog write transaction.
+"""
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Exists, Max, OuterRef, Q, QuerySet
+from django.utils import timezone
+
+from apps.core.models import CatalogChange, Category, Product
+from apps.core.serializers import CategorySerializer, ProductSerializer
+
+KINDS = {
+    CatalogChange.PRODUCT: (Product, ProductSerializer, "products"),
+    CatalogChange.CATEGORY: (Category, CategorySerializer, "categories"),
+}
+
+
+def _cursor_field(entries: QuerySet) -> str:
+    """The field that orders log entries and that cursors refer to."""
+    return "txid" if connections[entries.db].vendor == "postgresql" else "id"
+
+
+def _committed() -> Tuple[QuerySet, str]:
+    """Log entries that no uncommitted entry can precede, and their cursor field."""
+    entries = CatalogChange.objects.all()
+    connection = connections[entries.db]
+    if _cursor_field(entries) == "txid":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+            bound = cursor.fetchone()[0]
+        return entries.filter(txid__lt=bound), "txid"
+    if connection.vendor == "sqlite":
+        return entries, "id"
+    settle = getattr(settings, "CATALOG_CHANGES_SETTLE_SECONDS", 2)
+    return entries.filter(created_at__lte=timezone.now() - timedelta(seconds=settle)), "id"
+
+
+def latest_catalog_cursor() -> int:
+    """Cursor to start syncing from before loading the full catalog."""
+    entries, key = _committed()
+    return entries.aggregate(cursor=Max(key))["cursor"] or 0
+
+
+def get_catalog_changes(since: int, limit: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Changes after cursor ``since``, at most ``limit`` log entries.
+
+    Returns:
+        {"cursor", "has_more", "products", "categories", "deleted": {"products", "categories"}}
+        where products and categories hold the current representation of
+        every changed object.
+    """
+    limit = limit or getattr(settings, "CATALOG_CHANGES_PAGE_SIZE", 1000)
+    committed, key = _committed()
+    after = committed.filter(**{f"{key}__gt": since}).order_by(key, "id")
+    entries = list(after.values_list(key, "kind", "object_id")[:limit + 1])
+    has_more = len(entries) > limit
+    if has_more:
+        # Never split the entries of one cursor value (one transaction on PostgreSQL) across pages.
+        cut = entries[limit][0]
+        entries = [entry for entry in entries[:limit] if entry[0] != cut]
+        if not entries:  # a single transaction larger than a page is served whole
+            entries = list(after.filter(**{key: cut}).values_list(key, "kind", "object_id"))
+
+    changed: Dict[str, List[int]] = {kind: [] for kind in KINDS}
+    for _, kind, object_id in entries:
+        changed[kind].append(object_id)
+
+    result: Dict[str, Any] = {
+        "cursor": entries[-1][0] if entries else since,
+        "has_more": has_more,
+        "deleted": {},
+    }
+    for kind, (model, serializer_class, key) in KINDS.items():
+        ids = sorted(set(changed[kind]))
+        objects = model.objects.in_bulk(ids) if ids else {}
+        result[key] = serializer_class([objects[object_id] for object_id in ids if object_id in objects], many=True).data
+        # The log says whether an object was deleted, but its current absence is what counts.
+        result["deleted"][key] = [object_id for object_id in ids if object_id not in objects]
+    return result
+
+
+def compact_catalog_changes() -> int:
+    """
+    Delete log entries superseded by a newer entry for the same object.
+
+    The feed returns current state, so only the newest entry per object is
+    needed, whatever cursor a client holds.
+
+    Returns:
+        Number of entries deleted.
+    """
+    entries = CatalogChange.objects.all()
+    key = _cursor_field(entries)
+    newer = entries.filter(kind=OuterRef("kind"), object_id=OuterRef("object_id")).filter(
+        Q(**{f"{key}__gt": OuterRef(key)}) | Q(**{key: OuterRef(key), "id__gt": OuterRef("id")})
+    )
+    deleted, _ = entries.filter(Exists(newer)).delete()
+    return deleted
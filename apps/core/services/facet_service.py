@@ -0,0 +1,73 @@
+"""
+Product facet counts computed with two aggregate queries.
+
+Products per category come from a single ``GROUP BY category_id`` query, so
+its cost does not grow with the number of categories; the price histogram
+buckets and the in-stock count come from one ``SELECT COUNT(*) FILTER (...)``-
+style aggregate over the fixed set of buckets. Results are cached per
+normalised filter key and catalog version.
+"""
+import hashlib
+import json
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Q, QuerySet
+
+from apps.core.services.catalog_service import get_catalog_version
+
+FACETS_CACHE_PREFIX = "facets:products"
+DEFAULT_PRICE_BUCKETS = (0, 25, 50, 100, 250, 500, 1000)
+
+
+def _price_buckets() -> Sequence[int]:
+    return getattr(settings, "PRODUCT_PRICE_BUCKETS", DEFAULT_PRICE_BUCKETS)
+
+
+def facet_cache_key(filters: Dict[str, Any], version: str) -> str:
+    """Stable cache key for normalised filter values."""
+    normalised = json.dumps(filters, sort_keys=True, cls=DjangoJSONEncoder)
+    digest = hashlib.sha256(normalised.encode()).hexdigest()
+    return f"{FACETS_CACHE_PREFIX}:{version}:{digest}"
+
+
+def compute_product_facets(queryset: QuerySet) -> Dict[str, Any]:
+    """Compute every facet of ``queryset``: one GROUP BY for categories, one aggregate for the rest."""
+    bounds: List[Optional[int]] = list(_price_buckets()) + [None]
+    aggregates = {"total": Count("id"), "in_stock": Count("id", filter=Q(stock__gt=0))}
+    for i, low in enumerate(bounds[:-1]):
+        high = bounds[i + 1]
+        condition = Q(price__gte=Decimal(low))
+        if high is not None:
+            condition &= Q(price__lt=Decimal(high))
+        aggregates[f"price_{i}"] = Count("id", filter=condition)
+
+    counts = queryset.order_by().aggregate(**aggregates)
+    per_category = queryset.order_by().values("category").annotate(count=Count("id"))
+
+    return {
+        "total": counts["total"],
+        "in_stock": counts["in_stock"],
+        "categories": {
+            str(row["category"]): row["count"]
+            for row in sorted(per_category, key=lambda row: row["category"])
+        },
+        "price": [
+            {"min": low, "max": bounds[i + 1], "count": counts[f"price_{i}"]}
+            for i, low in enumerate(bounds[:-1])
+        ],
+    }
+
+
+def get_product_facets(queryset: QuerySet, filters: Dict[str, Any]) -> Dict[str, Any]:
+    """Return facets for ``queryset`` (already filtered by ``filters``), cached per filter key."""
+    version = get_catalog_version()
+    key = facet_cache_key(filters, version)
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_product_facets(queryset)
+        cache.set(key, facets, timeout=getattr(settings, "PRODUCT_FACETS_CACHE_TTL", 60))
+    return facets
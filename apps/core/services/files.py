@@ -0,0 +1,41 @@
+import csv
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, TextIO, Tuple
+
+RECORD_FORMATS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+
+
+def atomic_write(path: Path, data: bytes) -> None:
+    """Write ``data`` to ``path`` so readers only ever see the old or the new content."""
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def detect_record_format(filename: str, description: str = "file") -> str:
+    """Record file format ("csv" or "ndjson") from its extension."""
+    for extension, fmt in RECORD_FORMATS.items():
+        if filename.lower().endswith(extension):
+            return fmt
+    raise ValueError(f"Unsupported {description} type: {filename} (expected .csv, .ndjson or .jsonl)")
+
+
+def iter_records(stream: TextIO, fmt: str) -> Iterator[Tuple[int, Optional[Dict[str, Any]]]]:
+    """
+    Stream the records of a CSV (with header row) or NDJSON file.
+
+    Yields (line number, record) pairs; records that cannot be decoded are None.
+    """
+    if fmt == "csv":
+        yield from enumerate(csv.DictReader(stream), start=2)
+        return
+    for line, text in enumerate(stream, start=1):
+        if not text.strip():
+            continue
+        try:
+            row = json.loads(text)
+        except ValueError:
+            row = None
+        yield line, row if isinstance(row, dict) else None
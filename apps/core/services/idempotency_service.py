@@ -0,0 +1,123 @@
+"""
+Storage for ``Idempotency-Key`` request deduplication.
+
+The first request with a given (user, key) inserts a row that acts as a lock
+while the business logic runs; its response is then stored on the row and
+replayed for every retry carrying the same key and request body.
+"""
+import hashlib
+import json
+from datetime import timedelta
+from typing import Any, Optional, Tuple
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from apps.core.models import IdempotencyKey, User
+
+# begin_idempotent_request outcomes
+EXECUTE = "execute"
+REPLAY = "replay"
+IN_PROGRESS = "in_progress"
+MISMATCH = "mismatch"
+
+
+def _ttl() -> timedelta:
+    return timedelta(seconds=getattr(settings, "IDEMPOTENCY_KEY_TTL", 24 * 60 * 60))
+
+
+def _lock_timeout() -> timedelta:
+    return timedelta(seconds=getattr(settings, "IDEMPOTENCY_LOCK_TIMEOUT", 60))
+
+
+def request_fingerprint(method: str, path: str, data: Any) -> str:
+    """Hash of the request line and canonicalised body."""
+    if hasattr(data, "lists"):  # QueryDict from form posts
+        data = {key: values for key, values in data.lists()}
+    body = json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder, default=str)
+    return hashlib.sha256(f"{method} {path}\n{body}".encode()).hexdigest()
+
+
+def begin_idempotent_request(user: User, key: str, request_hash: str) -> Tuple[str, Optional[IdempotencyKey]]:
+    """
+    Claim ``key`` for this request or find its stored outcome.
+
+    Returns:
+        Tuple of (outcome, record) where outcome is one of:
+        - EXECUTE: the caller holds the lock and must run the request
+        - REPLAY: ``record`` holds the stored response to return
+        - IN_PROGRESS: another request with this key is still running
+        - MISMATCH: the key was already used with a different request
+    """
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            record = IdempotencyKey.objects.create(
+                user=user,
+                key=key,
+                request_hash=request_hash,
+                locked_at=now,
+                expires_at=now + _ttl(),
+            )
+        return EXECUTE, record
+    except IntegrityError:
+        pass
+
+    record = IdempotencyKey.objects.filter(user=user, key=key).first()
+    if record is None:
+        # Evicted between the insert and the lookup; try once more.
+        return begin_idempotent_request(user, key, request_hash)
+    if record.expires_at <= now:
+        # Expired but not evicted yet: the key is free again. The guarded delete
+        # lets exactly one of several concurrent requests reuse it first.
+        IdempotencyKey.objects.filter(pk=record.pk, expires_at__lte=now).delete()
+        return begin_idempotent_request(user, key, request_hash)
+    if record.request_hash != request_hash:
+        return MISMATCH, record
+    if record.response_status is not None:
+        return REPLAY, record
+
+    # A worker that died mid-request leaves a stale lock; take it over atomically.
+    stolen = IdempotencyKey.objects.filter(
+        pk=record.pk,
+        response_status__isnull=True,
+        locked_at__lte=now - _lock_timeout(),
+    ).update(locked_at=now)
+    if stolen:
+        return EXECUTE, record
+    return IN_PROGRESS, record
+
+
+def complete_idempotent_request(record: IdempotencyKey, status_code: int, body: Any) -> None:
+    """Store the response of an executed request so retries can replay it."""
+    IdempotencyKey.objects.filter(pk=record.pk).update(
+        response_status=status_code,
+        response_body=body,
+    )
+
+
+def abandon_idempotent_request(record: IdempotencyKey) -> None:
+    """Release the key after a failure so the client can retry for real."""
+    IdempotencyKey.objects.filter(pk=record.pk, response_status__isnull=True).delete()
+
+
+def evict_expired_idempotency_keys(batch_size: int = 5000) -> int:
+    """
+    Delete expired keys in batches of ``batch_size`` rows.
+
+    Returns:
+        Number of deleted keys.
+    """
+    deleted = 0
+    now = timezone.now()
+    while True:
+        ids = list(
+            IdempotencyKey.objects.filter(expires_at__lte=now).values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        deleted += IdempotencyKey.objects.filter(id__in=ids).delete()[0]
+        if len(ids) < batch_size:
+            return deleted
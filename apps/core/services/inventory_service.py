@@ -0,0 +1,201 @@
+"""
+Bulk stock and price updates from warehouse systems.
+
+Each record is ``{"product_id", "stock", "price"}``; ``stock`` and ``price``
+are each optional, but one of them is required. Records are applied in
+chunks of ``INVENTORY_CHUNK_SIZE``, all inside one transaction: per chunk,
+one read of the products (locked) and of their cart holds, then one
+``UPDATE ... SET stock = CASE id WHEN ... END, price = CASE ...`` for the
+products that actually change.
+
+``stock`` is the warehouse's physical count. ``Product.stock`` is what is
+left after cart reservations, so the units currently held in carts are
+subtracted from it. When carts hold more than the new count, their holds are
+dropped without returning stock (the units no longer exist), so an expiring
+hold cannot put them back on sale.
+
+Rows that cannot be applied are reported, one by one, and skipped:
+
+- ``invalid``          the record cannot be parsed (or has neither stock nor price)
+- ``duplicate``        the product appeared earlier in the same input
+- ``unknown_product``  no such product
+- ``over_reserved``    carts hold more than the new stock; their holds are dropped
+
+Dependent caches (facets, similarity model, catalog snapshot) are keyed on
+the catalog version, which is bumped once after the transaction commits.
+"""
+import time
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Dict, Iterable, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, Sum, Value, When
+
+from apps.core.models import CartItem, Product
+from apps.core.services.catalog_service import bump_catalog_version
+
+MAX_PRICE = Decimal("1e8")  # Product.price has max_digits=10, decimal_places=2
+
+Conflict = Dict[str, Any]
+
+
+class InventoryRecord(NamedTuple):
+    row: int
+    product_id: int
+    stock: Optional[int]
+    price: Optional[Decimal]
+
+
+def _integer(value: Any) -> int:
+    if isinstance(value, bool):
+        raise TypeError(value)
+    return value if isinstance(value, int) else int(str(value).strip())
+
+
+def _parse(row: int, data: Optional[Dict[str, Any]]) -> Optional[InventoryRecord]:
+    if data is None:
+        return None
+    stock, price = data.get("stock"), data.get("price")
+    try:
+        record = InventoryRecord(
+            row=row,
+            product_id=_integer(data["product_id"]),
+            stock=None if stock in (None, "") else _integer(stock),
+            price=None if price in (None, "") else Decimal(str(price).strip()),
+        )
+    except (KeyError, TypeError, ValueError, InvalidOperation):
+        return None
+    if record.stock is None and record.price is None:
+        return None
+    if record.stock is not None and record.stock < 0:
+        return None
+    if record.price is not None and not (
+        record.price.is_finite() and 0 <= record.price < MAX_PRICE and record.price.as_tuple().exponent >= -2
+    ):
+        return None
+    return record
+
+
+def _apply_chunk(
+    records: Dict[int, InventoryRecord],
+    stats: Dict[str, int],
+    report: Callable[[Conflict], None],
+    dry_run: bool,
+) -> None:
+    ids = sorted(records)
+    current = {
+        product_id: (stock, price)
+        for product_id, stock, price in Product.objects.select_for_update()
+        .filter(id__in=ids)
+        .order_by("id")
+        .values_list("id", "stock", "price")
+    }
+    held = dict(
+        CartItem.objects.filter(product_id__in=ids, reserved_until__isnull=False)
+        .values("product_id")
+        .annotate(quantity=Sum("quantity"))
+        .values_list("product_id", "quantity")
+    )
+
+    stock_updates: Dict[int, int] = {}
+    price_updates: Dict[int, Decimal] = {}
+    dropped_holds = []
+    for product_id in ids:
+        record = records[product_id]
+        if product_id not in current:
+            report({"kind": "unknown_product", "row": record.row, "product_id": product_id})
+            continue
+        stock, price = current[product_id]
+        if record.stock is not None:
+            available = record.stock - held.get(product_id, 0)
+            if available < 0:
+                report({
+                    "kind": "over_reserved",
+                    "row": record.row,
+                    "product_id": product_id,
+                    "stock": record.stock,
+                    "reserved": held[product_id],
+                })
+                dropped_holds.append(product_id)
+                available = record.stock
+            if available != stock:
+                stock_updates[product_id] = available
+        if record.price is not None and record.price != price:
+            price_updates[product_id] = record.price
+
+    changed = sorted(stock_updates.keys() | price_updates.keys())
+    stats["updated"] += len(changed)
+    stats["unchanged"] += len(current) - len(changed)
+    if dry_run:
+        return
+    if dropped_holds:
+        CartItem.objects.filter(product_id__in=dropped_holds, reserved_until__isnull=False).update(reserved_until=None)
+    if not changed:
+        return
+    fields = {}
+    if stock_updates:
+        fields["stock"] = Case(
+            *[When(id=product_id, then=Value(stock)) for product_id, stock in stock_updates.items()],
+            default=F("stock"),
+            output_field=Product._meta.get_field("stock"),
+        )
+    if price_updates:
+        fields["price"] = Case(
+            *[When(id=product_id, then=Value(price)) for product_id, price in price_updates.items()],
+            default=F("price"),
+            output_field=Product._meta.get_field("price"),
+        )
+    Product.objects.filter(id__in=changed).update(**fields)
+
+
+def bulk_update_inventory(
+    rows: Iterable[Tuple[int, Optional[Dict[str, Any]]]],
+    dry_run: bool = False,
+    on_conflict: Optional[Callable[[Conflict], None]] = None,
+    chunk_size: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Apply stock and price records, given as (row number, record) pairs.
+
+    ``on_conflict`` receives every row that was skipped or clamped. With
+    ``dry_run`` nothing is written.
+
+    Returns:
+        Counters per outcome, and elapsed seconds.
+    """
+    chunk_size = chunk_size or getattr(settings, "INVENTORY_CHUNK_SIZE", 500)
+    stats = dict.fromkeys(
+        ("rows", "updated", "unchanged", "invalid", "duplicate", "unknown_product", "over_reserved"), 0
+    )
+
+    def report(conflict: Conflict) -> None:
+        stats[conflict["kind"]] += 1
+        if on_conflict is not None:
+            on_conflict(conflict)
+
+    started = time.perf_counter()
+    seen = set()
+    chunk: Dict[int, InventoryRecord] = {}
+    with transaction.atomic():
+        for row, data in rows:
+            stats["rows"] += 1
+            record = _parse(row, data)
+            if record is None:
+                report({"kind": "invalid", "row": row})
+                continue
+            if record.product_id in seen:
+                report({"kind": "duplicate", "row": row, "product_id": record.product_id})
+                continue
+            seen.add(record.product_id)
+            chunk[record.product_id] = record
+            if len(chunk) >= chunk_size:
+                _apply_chunk(chunk, stats, report, dry_run)
+                chunk = {}
+        if chunk:
+            _apply_chunk(chunk, stats, report, dry_run)
+        if stats["updated"] and not dry_run:
+            transaction.on_commit(bump_catalog_version)
+
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    return stats
@@ -0,0 +1,178 @@
+"""
+Database-backed background job queue.
+
+Jobs are ``Job`` rows. Enqueued inside the transaction that produces the
+work (e.g. order creation), a job commits or rolls back together with it, and
+no worker can pick it up before its data is visible. Workers
+(``manage.py run_workers``) claim due jobs in batches:
+
+- where the database supports it (PostgreSQL) the candidates are read with
+  ``SELECT ... FOR UPDATE SKIP LOCKED``, so concurrent workers never wait on
+  each other's rows;
+- every claim is a conditional ``UPDATE ... WHERE status = 'queued'`` that
+  stamps a claim token, which on SQLite (one writer at a time) alone makes
+  every job go to exactly one worker.
+
+Handlers are registered by job name with ``@job_handler``. A batched handler
+receives the payloads of all claimed jobs of its name in one call. A handler
+runs in a transaction; if it raises, its jobs are retried with exponential
+backoff until ``max_attempts``, then kept as ``failed``. A job whose worker
+died is claimed again once its lock expires, or marked ``failed`` if that
+was its last attempt.
+"""
+import logging
+import os
+import socket
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from apps.core.models import Job
+
+logger = logging.getLogger(__name__)
+
+Payload = Dict[str, Any]
+
+# name -> (handler, batched)
+HANDLERS: Dict[str, Tuple[Callable[..., None], bool]] = {}
+
+
+def job_handler(name: str, batch: bool = False) -> Callable:
+    """
+    Register the decorated function as the handler of jobs called ``name``.
+
+    A plain handler is called with one payload per job; with ``batch`` it is
+    called once per claimed batch with the list of payloads.
+    """
+    def register(func: Callable[..., None]) -> Callable[..., None]:
+        HANDLERS[name] = (func, batch)
+        return func
+    return register
+
+
+def enqueue(name: str, payload: Optional[Payload] = None, delay: float = 0, max_attempts: Optional[int] = None) -> Job:
+    """Queue a ``name`` job to run after ``delay`` seconds."""
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        run_at=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts or getattr(settings, "JOB_MAX_ATTEMPTS", 5),
+    )
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _claimable(now) -> Q:
+    # Running jobs whose lock expired belong to a worker that died.
+    return Q(status=Job.QUEUED, run_at__lte=now) | Q(
+        status=Job.RUNNING, locked_until__lt=now, attempts__lt=F("max_attempts")
+    )
+
+
+def _fail_abandoned(db: str, now) -> None:
+    """Mark running jobs whose worker died on their last attempt as failed."""
+    failed = Job.objects.using(db).filter(
+        status=Job.RUNNING, locked_until__lt=now, attempts__gte=F("max_attempts")
+    ).update(status=Job.FAILED, locked_until=None, last_error="Worker lock expired on the last attempt")
+    if failed:
+        logger.error("%d jobs failed: their worker died on the last attempt", failed)
+
+
+def claim_jobs(worker: str, limit: int) -> List[Job]:
+    """
+    Claim up to ``limit`` due jobs, oldest first, for ``worker``.
+
+    Returns:
+        The claimed jobs, with ``attempts`` already counting this run.
+    """
+    now = timezone.now()
+    token = f"{worker}:{uuid.uuid4().hex[:8]}"
+    lock_timeout = getattr(settings, "JOB_LOCK_TIMEOUT", 5 * 60)
+    db = router.db_for_write(Job)
+    with transaction.atomic(using=db):
+        _fail_abandoned(db, now)
+        candidates = Job.objects.using(db).filter(_claimable(now)).order_by("run_at", "id")
+        if connections[db].features.has_select_for_update_skip_locked:
+            candidates = candidates.select_for_update(skip_locked=True)
+        ids = list(candidates.values_list("id", flat=True)[:limit])
+        if not ids:
+            return []
+        Job.objects.using(db).filter(_claimable(now), id__in=ids).update(
+            status=Job.RUNNING,
+            locked_by=token,
+            locked_until=now + timedelta(seconds=lock_timeout),
+            attempts=F("attempts") + 1,
+        )
+    return list(Job.objects.using(db).filter(locked_by=token, status=Job.RUNNING).order_by("run_at", "id"))
+
+
+def _backoff(attempts: int) -> float:
+    base = getattr(settings, "JOB_RETRY_BACKOFF", 10)
+    return min(base * 2 ** (attempts - 1), getattr(settings, "JOB_RETRY_BACKOFF_MAX", 60 * 60))
+
+
+def _fail(jobs: List[Job], error: str, retry: bool = True) -> None:
+    now = timezone.now()
+    for job in jobs:
+        job.last_error = error
+        job.locked_until = None
+        if retry and job.attempts < job.max_attempts:
+            job.status = Job.QUEUED
+            job.run_at = now + timedelta(seconds=_backoff(job.attempts))
+        else:
+            job.status = Job.FAILED
+        # Guarded by the claim token, like the delete in _run.
+        updated = Job.objects.filter(id=job.id, locked_by=job.locked_by).update(
+            status=job.status, run_at=job.run_at, locked_until=None, last_error=error
+        )
+        if updated and job.status == Job.FAILED:
+            logger.error("Job %s #%d failed after %d attempts: %s", job.name, job.id, job.attempts, error)
+
+
+def _run(jobs: List[Job], call: Callable[[], None]) -> bool:
+    try:
+        with transaction.atomic():
+            call()
+    except Exception as exc:
+        logger.warning("Job %s %s raised", jobs[0].name, [job.id for job in jobs], exc_info=True)
+        _fail(jobs, f"{type(exc).__name__}: {exc}")
+        return False
+    # Guarded by the claim token: a job whose lock expired may have been claimed again.
+    Job.objects.filter(id__in=[job.id for job in jobs], locked_by=jobs[0].locked_by).delete()
+    return True
+
+
+def run_jobs(worker: Optional[str] = None, batch_size: Optional[int] = None) -> Dict[str, int]:
+    """
+    Claim one batch of due jobs and run it.
+
+    Returns:
+        Counters: claimed, succeeded and failed (including those to be retried).
+    """
+    jobs = claim_jobs(worker or worker_name(), batch_size or getattr(settings, "JOB_BATCH_SIZE", 50))
+    stats = {"claimed": len(jobs), "succeeded": 0, "failed": 0}
+    by_name: Dict[str, List[Job]] = defaultdict(list)
+    for job in jobs:
+        by_name[job.name].append(job)
+
+    for name, group in by_name.items():
+        handler, batched = HANDLERS.get(name, (None, False))
+        if handler is None:
+            _fail(group, f"No handler registered for {name!r}", retry=False)
+            stats["failed"] += len(group)
+        elif batched:
+            ok = _run(group, lambda: handler([job.payload for job in group]))
+            stats["succeeded" if ok else "failed"] += len(group)
+        else:
+            for job in group:
+                ok = _run([job], lambda: handler(job.payload))
+                stats["succeeded" if ok else "failed"] += 1
+    return stats
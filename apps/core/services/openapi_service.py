@@ -0,0 +1,183 @@
+"""
+Precomputed OpenAPI schema.
+
+drf-spectacular builds the schema by introspecting every view and serializer,
+which takes hundreds of milliseconds. ``build_openapi_schema`` (run by
+``manage.py build_openapi_schema`` at deploy time) generates it once and
+writes it into ``OPENAPI_SCHEMA_DIR`` as versioned files:
+
+- ``<version>.yaml`` and ``<version>.json`` - the schema in both formats
+- ``CURRENT``                               - the published version
+
+The version is a hash of the schema, so it doubles as a strong ETag. Each
+process reads the current files into memory on its first schema request and
+serves them as bytes from then on. Requests never write: if nothing has been
+published (or under ``DEBUG``, so runserver's reloads pick up code changes),
+the process generates the schema in memory and logs a warning outside
+``DEBUG``, which also works on a read-only deploy.
+
+A published schema left over from an earlier release would be served as is,
+so ``manage.py build_openapi_schema --check`` is a required deploy step: it
+fails when the published schema no longer matches what the code generates.
+With ``OPENAPI_SCHEMA_VERIFY`` (off by default, meant for development), each
+process also regenerates the schema once in a background thread after loading
+it, and on a mismatch logs an error and serves the regenerated one.
+
+Kept out of ``apps.core.services`` so API-only workers (``settings.api``)
+never import drf-spectacular.
+"""
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+
+from django.conf import settings
+from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+from drf_spectacular.settings import spectacular_settings
+
+from apps.core.services.files import atomic_write
+
+logger = logging.getLogger(__name__)
+
+CURRENT_FILE = "CURRENT"
+FORMATS = ("yaml", "json")
+KEEP_VERSIONS = 2
+
+
+class OpenApiSchema(NamedTuple):
+    """A published schema version, loaded into memory."""
+    directory: Path
+    version: str
+    content: Dict[str, bytes]  # format -> rendered schema
+
+
+def _schema_dir() -> Path:
+    return Path(getattr(settings, "OPENAPI_SCHEMA_DIR", settings.BASE_DIR / "var" / "openapi"))
+
+
+def generate_openapi_schema() -> Dict[str, bytes]:
+    """Introspect the API and render its schema in every format."""
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    schema = generator.get_schema(request=None, public=spectacular_settings.SERVE_PUBLIC)
+    return {
+        "yaml": OpenApiYamlRenderer().render(schema),
+        "json": OpenApiJsonRenderer().render(schema),
+    }
+
+
+def schema_version(content: Dict[str, bytes]) -> str:
+    return hashlib.sha256(content["json"]).hexdigest()[:32]
+
+
+def stored_openapi_version() -> Optional[str]:
+    """Version of the published schema, or None if none has been built."""
+    try:
+        return (_schema_dir() / CURRENT_FILE).read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def build_openapi_schema(content: Optional[Dict[str, bytes]] = None) -> Dict[str, object]:
+    """
+    Generate (unless ``content`` is given) and publish the schema.
+
+    Returns:
+        Build statistics: version, whether it was newly published, JSON size.
+    """
+    content = content or generate_openapi_schema()
+    version = schema_version(content)
+    directory = _schema_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+
+    published = stored_openapi_version() != version
+    for fmt in FORMATS:
+        path = directory / f"{version}.{fmt}"
+        if not path.exists():
+            atomic_write(path, content[fmt])
+    atomic_write(directory / CURRENT_FILE, version.encode())
+
+    # Keep the previous version for workers that have not restarted yet.
+    versions = sorted(
+        (p for p in directory.glob("*.json") if p.stem != version),
+        key=lambda p: p.stat().st_mtime,
+    )
+    for stale in versions[:-(KEEP_VERSIONS - 1)]:
+        for fmt in FORMATS:
+            stale.with_suffix(f".{fmt}").unlink(missing_ok=True)
+
+    return {"version": version, "published": published, "bytes": len(content["json"])}
+
+
+def check_openapi_schema() -> Dict[str, Optional[str]]:
+    """
+    Compare the published schema with what the code generates now.
+
+    Returns:
+        {"stored": version or None, "generated": version}; stale when they differ.
+    """
+    return {"stored": stored_openapi_version(), "generated": schema_version(generate_openapi_schema())}
+
+
+# ---------------------------------------------------------------------------
+# Serve
+# ---------------------------------------------------------------------------
+
+_schema_lock = threading.Lock()
+_schema: Optional[OpenApiSchema] = None
+
+
+def _load_schema(directory: Path, version: str) -> Optional[OpenApiSchema]:
+    try:
+        content = {fmt: (directory / f"{version}.{fmt}").read_bytes() for fmt in FORMATS}
+    except FileNotFoundError:
+        return None
+    return OpenApiSchema(directory, version, content)
+
+
+def _generated_schema(directory: Path) -> OpenApiSchema:
+    content = generate_openapi_schema()
+    return OpenApiSchema(directory, schema_version(content), content)
+
+
+def _verify(published: OpenApiSchema) -> None:
+    """Regenerate the schema; serve the result instead of ``published`` if they differ."""
+    global _schema
+
+    try:
+        generated = _generated_schema(published.directory)
+    except Exception:
+        logger.exception("Could not verify the published OpenAPI schema")
+        return
+    if generated.version == published.version:
+        return
+    logger.error(
+        "Published OpenAPI schema %s is stale (code generates %s); serving the generated one. "
+        "Run manage.py build_openapi_schema.",
+        published.version, generated.version,
+    )
+    with _schema_lock:
+        if _schema is published:
+            _schema = generated
+
+
+def get_openapi_schema() -> OpenApiSchema:
+    """Return this process's schema, loading (or generating in memory) it on the first call."""
+    global _schema
+
+    directory = _schema_dir()
+    schema = _schema
+    if schema is not None and schema.directory == directory:
+        return schema
+
+    with _schema_lock:
+        if _schema is None or _schema.directory != directory:
+            version = None if settings.DEBUG else stored_openapi_version()
+            _schema = _load_schema(directory, version) if version else None
+            if _schema is None:
+                if not settings.DEBUG:
+                    logger.warning("No OpenAPI schema published in %s; generating it in memory", directory)
+                _schema = _generated_schema(directory)
+            elif getattr(settings, "OPENAPI_SCHEMA_VERIFY", False):
+                threading.Thread(target=_verify, args=(_schema,), name="openapi-verify", daemon=True).start()
+        return _schema
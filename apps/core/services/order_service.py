@@ -0,0 +1,68 @@
+"""
+Cached order detail payloads.
+
+An order and its item price snapshots never change after checkout; only the
+payment status moves. The payload also embeds the current representation of
+each ordered product, which does change. Rendered payloads are therefore
+cached per order id, a version derived from the payment status and the
+catalog version, and the requested representation (sparse fieldsets,
+sideloading). A payment status change or catalog write yields a new key, so
+nothing has to be invalidated, and every entry expires after
+``ORDER_DETAIL_CACHE_TTL`` seconds: that bounds how stale embedded product
+data (stock holds do not bump the catalog version) can get, and how long the
+entries of arbitrary ``fields``/``exclude`` combinations are kept.
+
+Payloads are stored rendered, so a hit skips serialization and JSON encoding.
+"""
+import hashlib
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.core.models import Order
+from apps.core.services.catalog_service import get_catalog_version
+
+ORDER_DETAIL_CACHE_PREFIX = "orders:detail:v2"
+
+
+def get_order_version(order_id: int, user_id: int) -> Optional[str]:
+    """
+    Version token of an order's detail payload.
+
+    Changes with the payment status and the catalog version (for the embedded
+    products). Also the ownership check: reads only the payment status of the
+    order through the (id, user) filter, never the order or its items.
+
+    Returns:
+        The version, or None if ``user_id`` has no order ``order_id``.
+    """
+    row = Order.objects.filter(pk=order_id, user_id=user_id).values_list("payment__status").first()
+    if row is None:
+        return None
+    status = "\0" if row[0] is None else row[0]  # an unpaid order differs from an empty status
+    return hashlib.sha256(f"{status}\0{get_catalog_version()}".encode()).hexdigest()[:16]
+
+
+def _variant_digest(variant: str) -> str:
+    return hashlib.sha256(variant.encode()).hexdigest()[:16]
+
+
+def order_detail_cache_key(order_id: int, version: str, variant: str = "") -> str:
+    """Cache key of one representation (``variant``) of an order detail payload."""
+    return f"{ORDER_DETAIL_CACHE_PREFIX}:{order_id}:{version}:{_variant_digest(variant)}"
+
+
+def order_detail_etag(order_id: int, version: str, variant: str = "") -> str:
+    """Strong ETag of one representation of an order detail payload."""
+    return f'"{order_id}-{version}-{_variant_digest(variant)}"'
+
+
+def get_order_detail(order_id: int, version: str, variant: str, render: Callable[[], bytes]) -> bytes:
+    """Return the rendered detail payload, calling ``render`` only on a cache miss."""
+    key = order_detail_cache_key(order_id, version, variant)
+    payload = cache.get(key)
+    if payload is None:
+        payload = render()
+        cache.set(key, payload, timeout=getattr(settings, "ORDER_DETAIL_CACHE_TTL", 60))
+    return payload
@@ -0,0 +1,38 @@
+"""
+Cached product detail payloads.
+
+Product pages are the hottest reads in the catalog. Serialized payloads are
+cached per product and representation (sparse fieldsets) for
+``PRODUCT_DETAIL_CACHE_TTL`` seconds, and tagged with the catalog version so
+any product or category write marks them outdated. Recomputation goes
+through ``single_flight``: when a popular product's entry expires, one
+request reloads it while the others are served the previous payload (or, on
+a cold miss, wait for that one request instead of querying the database
+themselves).
+"""
+import hashlib
+from typing import Any, Callable, Dict
+
+from django.conf import settings
+
+from apps.core.services.catalog_service import get_catalog_version
+from apps.core.services.single_flight import get_or_compute
+
+PRODUCT_DETAIL_CACHE_PREFIX = "products:detail:v1"
+
+
+def product_detail_cache_key(product_id: int, variant: str = "") -> str:
+    """Cache key of one representation (``variant``) of a product detail payload."""
+    digest = hashlib.sha256(variant.encode()).hexdigest()[:16]
+    return f"{PRODUCT_DETAIL_CACHE_PREFIX}:{product_id}:{digest}"
+
+
+def get_product_detail(product_id: int, variant: str, load: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+    """Return the serialized product, calling ``load`` only when no fresh payload is cached."""
+    return get_or_compute(
+        product_detail_cache_key(product_id, variant),
+        load,
+        timeout=getattr(settings, "PRODUCT_DETAIL_CACHE_TTL", 30),
+        stale=getattr(settings, "PRODUCT_DETAIL_STALE_TTL", 5 * 60),
+        version=get_catalog_version(),
+    )
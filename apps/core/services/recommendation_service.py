@@ -0,0 +1,248 @@
+"""
+"Frequently bought together" recommendations from an order co-occurrence index.
+
+The index is built offline by ``manage.py build_recommendations``:
+
+- order lines are turned into a sparse order x product incidence matrix and
+  multiplied into a product x product co-occurrence matrix;
+- co-occurrence counts are cosine-normalised and reduced to a fixed top-K
+  neighbour array per product;
+- arrays are written as ``.npy`` files into a new versioned directory and
+  published by atomically replacing the ``CURRENT`` pointer file.
+
+Raw counts are persisted next to the index together with the last processed
+order id, so a rebuild only folds in orders placed since the previous build
+(orders are immutable once created). Workers memory-map the published arrays
+and look neighbours up with a binary search, so requests never hit the
+database.
+"""
+import itertools
+import json
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+from django.conf import settings
+from scipy import sparse
+
+from apps.core.models import OrderItem
+from apps.core.services.files import atomic_write
+
+CURRENT_FILE = "CURRENT"
+STATE_DIR = "state"
+KEEP_VERSIONS = 2
+
+
+class NeighborIndex(NamedTuple):
+    """Memory-mapped top-K neighbour arrays of one published index version."""
+    directory: Path
+    version: str
+    product_ids: np.ndarray  # sorted product ids, shape (n,)
+    neighbors: np.ndarray  # neighbour product ids, shape (n, k), -1 padded
+    scores: np.ndarray  # neighbour scores, shape (n, k)
+
+
+def _index_dir() -> Path:
+    return Path(getattr(settings, "RECOMMENDATIONS_DIR", settings.BASE_DIR / "var" / "recommendations"))
+
+
+def _top_k() -> int:
+    return getattr(settings, "RECOMMENDATIONS_TOP_K", 10)
+
+
+# ---------------------------------------------------------------------------
+# Offline build
+# ---------------------------------------------------------------------------
+
+def _load_state(directory: Path) -> Dict:
+    state_dir = directory / STATE_DIR
+    meta_path = state_dir / "meta.json"
+    if not meta_path.exists():
+        return {"last_order_id": 0, "counts": sparse.csr_matrix((0, 0), dtype=np.int64)}
+    meta = json.loads(meta_path.read_text())
+    counts = sparse.load_npz(state_dir / meta["counts_file"]).tocsr()
+    return {"last_order_id": meta["last_order_id"], "counts": counts}
+
+
+def _save_state(directory: Path, last_order_id: int, counts: sparse.csr_matrix, version: str) -> None:
+    state_dir = directory / STATE_DIR
+    state_dir.mkdir(parents=True, exist_ok=True)
+    counts_file = f"counts-{version}.npz"
+    sparse.save_npz(state_dir / counts_file, counts)
+    atomic_write(
+        state_dir / "meta.json",
+        json.dumps({"last_order_id": last_order_id, "counts_file": counts_file}).encode(),
+    )
+    for stale in state_dir.glob("counts-*.npz"):
+        if stale.name != counts_file:
+            stale.unlink(missing_ok=True)
+
+
+def _load_pairs(after_order_id: int, up_to_order_id: int) -> np.ndarray:
+    """Return distinct (order_id, product_id) pairs for orders in (after, up_to] as an (n, 2) array."""
+    rows = (
+        OrderItem.objects.filter(order_id__gt=after_order_id, order_id__lte=up_to_order_id)
+        .values_list("order_id", "product_id")
+        .distinct()
+        .iterator(chunk_size=50_000)
+    )
+    flat = np.fromiter(itertools.chain.from_iterable(rows), dtype=np.int64)
+    return flat.reshape(-1, 2)
+
+
+def _cooccurrence(pairs: np.ndarray, size: int) -> sparse.csr_matrix:
+    """Product x product co-occurrence counts; the diagonal holds per-product order counts."""
+    if not len(pairs):
+        return sparse.csr_matrix((size, size), dtype=np.int64)
+    _, order_rows = np.unique(pairs[:, 0], return_inverse=True)
+    incidence = sparse.csr_matrix(
+        (np.ones(len(pairs), dtype=np.int64), (order_rows, pairs[:, 1])),
+        shape=(order_rows.max() + 1, size),
+    )
+    return (incidence.T @ incidence).tocsr()
+
+
+def _top_neighbors(counts: sparse.csr_matrix, k: int) -> Dict[str, np.ndarray]:
+    """Cosine-normalise co-occurrence counts and keep the k best neighbours per product."""
+    occurrences = counts.diagonal().astype(np.float64)
+    inv_norm = np.divide(1.0, np.sqrt(occurrences), out=np.zeros_like(occurrences), where=occurrences > 0)
+    scaling = sparse.diags(inv_norm)
+    similarity = (scaling @ counts.astype(np.float64) @ scaling).tocsr()
+    similarity.setdiag(0)
+    similarity.eliminate_zeros()
+
+    product_ids = np.flatnonzero(np.diff(similarity.indptr)).astype(np.int64)
+    neighbors = np.full((len(product_ids), k), -1, dtype=np.int64)
+    scores = np.zeros((len(product_ids), k), dtype=np.float32)
+
+    for row, product_id in enumerate(product_ids):
+        begin, end = similarity.indptr[product_id], similarity.indptr[product_id + 1]
+        cols = similarity.indices[begin:end]
+        vals = similarity.data[begin:end]
+        if len(vals) > k:
+            keep = np.argpartition(-vals, k - 1)[:k]
+            cols, vals = cols[keep], vals[keep]
+        # Highest score first, ties broken by product id for stable output.
+        order = np.lexsort((cols, -vals))
+        neighbors[row, :len(order)] = cols[order]
+        scores[row, :len(order)] = vals[order]
+
+    return {"product_ids": product_ids, "neighbors": neighbors, "scores": scores}
+
+
+def _publish(directory: Path, arrays: Dict[str, np.ndarray]) -> str:
+    version = f"{time.time_ns()}"
+    version_dir = directory / version
+    version_dir.mkdir(parents=True)
+    for name, array in arrays.items():
+        np.save(version_dir / f"{name}.npy", array)
+    atomic_write(directory / CURRENT_FILE, version.encode())
+
+    # Keep the previous version around for workers that have not reloaded yet.
+    versions = sorted(p for p in directory.iterdir() if p.is_dir() and p.name.isdigit())
+    for stale in versions[:-KEEP_VERSIONS]:
+        shutil.rmtree(stale, ignore_errors=True)
+    return version
+
+
+def build_recommendations(full: bool = False, top_k: Optional[int] = None) -> Dict[str, int]:
+    """
+    Fold new orders into the co-occurrence counts and publish a fresh top-K index.
+
+    Pass ``full=True`` to discard the stored counts and rebuild from every order.
+
+    Returns:
+        Build statistics: processed order lines, indexed products and version.
+    """
+    directory = _index_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    k = top_k or _top_k()
+
+    state = {"last_order_id": 0, "counts": sparse.csr_matrix((0, 0), dtype=np.int64)}
+    if not full:
+        state = _load_state(directory)
+
+    up_to_order_id = OrderItem.objects.order_by("-order_id").values_list("order_id", flat=True).first() or 0
+    pairs = _load_pairs(state["last_order_id"], up_to_order_id)
+
+    counts = state["counts"]
+    size = max(counts.shape[0], int(pairs[:, 1].max()) + 1 if len(pairs) else 0)
+    counts.resize((size, size))
+    counts = (counts + _cooccurrence(pairs, size)).tocsr()
+
+    arrays = _top_neighbors(counts, k)
+    version = _publish(directory, arrays)
+    _save_state(directory, max(up_to_order_id, state["last_order_id"]), counts, version)
+
+    return {
+        "pairs": len(pairs),
+        "products": len(arrays["product_ids"]),
+        "version": int(version),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Online lookup
+# ---------------------------------------------------------------------------
+
+_index_lock = threading.Lock()
+_index: Optional[NeighborIndex] = None
+_checked_at = 0.0
+
+
+def _load_index(directory: Path) -> Optional[NeighborIndex]:
+    try:
+        version = (directory / CURRENT_FILE).read_text().strip()
+        version_dir = directory / version
+        return NeighborIndex(
+            directory=directory,
+            version=version,
+            product_ids=np.load(version_dir / "product_ids.npy", mmap_mode="r"),
+            neighbors=np.load(version_dir / "neighbors.npy", mmap_mode="r"),
+            scores=np.load(version_dir / "scores.npy", mmap_mode="r"),
+        )
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def get_index() -> Optional[NeighborIndex]:
+    """
+    Return the currently published index, memory-mapped.
+
+    The ``CURRENT`` pointer is re-read at most every ``RECOMMENDATIONS_RELOAD_INTERVAL``
+    seconds, so a rebuild is picked up by every worker without a restart.
+    """
+    global _index, _checked_at
+
+    directory = _index_dir()
+    interval = getattr(settings, "RECOMMENDATIONS_RELOAD_INTERVAL", 30)
+    now = time.monotonic()
+    index = _index
+    if index is not None and index.directory == directory and now - _checked_at < interval:
+        return index
+
+    with _index_lock:
+        _checked_at = now
+        try:
+            version = (directory / CURRENT_FILE).read_text().strip()
+        except FileNotFoundError:
+            _index = None
+            return None
+        if _index is None or _index.directory != directory or _index.version != version:
+            _index = _load_index(directory)
+        return _index
+
+
+def get_frequently_bought_together(product_id: int, limit: Optional[int] = None) -> List[int]:
+    """Return ids of products most often bought together with ``product_id``, best first."""
+    index = get_index()
+    if index is None:
+        return []
+    row = int(np.searchsorted(index.product_ids, product_id))
+    if row >= len(index.product_ids) or index.product_ids[row] != product_id:
+        return []
+    neighbors = index.neighbors[row]
+    return [int(n) for n in neighbors[:limit] if n >= 0]
@@ -0,0 +1,221 @@
+"""
+Payment reconciliation against provider settlement files.
+
+A settlement file lists one settled payment per line, as CSV with a header
+row or as NDJSON:
+
+    order_id,amount,status
+    1042,99.90,completed
+
+    {"order_id": 1042, "amount": "99.90", "status": "completed"}
+
+The file is streamed and processed in chunks of ``RECONCILIATION_CHUNK_SIZE``
+lines, so memory stays bounded however long it is. Each chunk is hash-joined
+against orders and their payments, fetched with one query in order id order:
+
+- the settled amount differs from ``Payment.amount``  -> ``amount_mismatch`` (not applied)
+- the order does not exist                           -> ``unknown_order``
+- the order has no payment                           -> ``no_payment``
+- the status differs                                 -> status updated
+- a later line for an order already seen             -> ``duplicate`` (not applied)
+- the status changed since the chunk was read        -> ``status_changed`` (not applied)
+
+Every chunk is applied in its own transaction. Status has only a handful of
+values, so changes are grouped per (current, target) status and written as
+``UPDATE ... SET status = %s WHERE id IN (...) AND status = %s`` in id order,
+rather than through ``bulk_update``, whose per-row ``CASE WHEN`` expressions
+cost more to build in Python than the database needs to apply them. The
+status filter keeps a concurrent change (a webhook, another reconciliation)
+from being overwritten with what the file saw.
+
+Besides the current chunk, only a bitmap of the order ids seen so far is
+kept, to catch duplicates across chunks: one bit per order id up to the
+highest existing one, however many lines the file has. Ids above it belong
+to no order and are reported as ``unknown_order`` on every line.
+"""
+import time
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+
+from apps.core.models import Order, Payment
+from apps.core.services.files import detect_record_format, iter_records
+
+PAYMENT_STATUSES = ("pending", "completed", "failed")
+
+Mismatch = Dict[str, Any]
+
+
+class SettlementRecord(NamedTuple):
+    line: int
+    order_id: int
+    amount: Decimal
+    status: str
+
+
+def detect_format(filename: str) -> str:
+    """Settlement file format ("csv" or "ndjson") from its extension."""
+    return detect_record_format(filename, "settlement file")
+
+
+def _parse(line: int, row: Optional[Dict[str, Any]]) -> Optional[SettlementRecord]:
+    if row is None:
+        return None
+    try:
+        record = SettlementRecord(
+            line=line,
+            order_id=int(row["order_id"]),
+            amount=Decimal(str(row["amount"]).strip()),
+            status=str(row["status"]).strip().lower(),
+        )
+    except (KeyError, TypeError, ValueError, InvalidOperation):
+        return None
+    return record if record.status in PAYMENT_STATUSES and record.amount.is_finite() else None
+
+
+class _SeenOrders:
+    """Bitmap of the order ids seen so far, sized to the highest existing order id."""
+
+    def __init__(self) -> None:
+        self._bits = bytearray()
+        self._max_id = 0
+        self._checked = False
+
+    def next_chunk(self) -> None:
+        """Allow the highest order id to be read again (orders may have been created)."""
+        self._checked = False
+
+    def add(self, order_id: int) -> bool:
+        """Mark ``order_id`` seen; False if it already was. Ids of no order are not tracked."""
+        if order_id > self._max_id and not self._checked:
+            # At most one query per chunk, and only when an id is above the known range.
+            self._checked = True
+            self._max_id = Order.objects.aggregate(max_id=Max("id"))["max_id"] or 0
+            self._bits.extend(bytes((self._max_id >> 3) + 1 - len(self._bits)))
+        if not 0 < order_id <= self._max_id:
+            return True
+        byte, bit = order_id >> 3, 1 << (order_id & 7)
+        if self._bits[byte] & bit:
+            return False
+        self._bits[byte] |= bit
+        return True
+
+
+def _chunk_size() -> int:
+    return getattr(settings, "RECONCILIATION_CHUNK_SIZE", 5000)
+
+
+def _reconcile_chunk(
+    records: Dict[int, SettlementRecord],
+    stats: Dict[str, int],
+    report: Callable[[Mismatch], None],
+    dry_run: bool,
+) -> None:
+    order_ids = sorted(records)
+    rows = Order.objects.filter(id__in=order_ids).order_by("id").values_list(
+        "id", "payment__id", "payment__amount", "payment__status"
+    )
+    # (current status, settled status) -> payment ids
+    changed: Dict[Tuple[str, str], List[int]] = {}
+    lines: Dict[int, SettlementRecord] = {}
+    found = set()
+    for order_id, payment_id, amount, status in rows:
+        found.add(order_id)
+        record = records[order_id]
+        if payment_id is None:
+            report({"kind": "no_payment", "line": record.line, "order_id": order_id})
+        elif amount != record.amount:
+            report({
+                "kind": "amount_mismatch",
+                "line": record.line,
+                "order_id": order_id,
+                "expected_amount": amount,
+                "settled_amount": record.amount,
+            })
+        elif status != record.status:
+            changed.setdefault((status, record.status), []).append(payment_id)
+            lines[payment_id] = record
+        else:
+            stats["matched"] += 1
+
+    for order_id in order_ids:
+        if order_id not in found:
+            report({"kind": "unknown_order", "line": records[order_id].line, "order_id": order_id})
+
+    if dry_run:
+        stats["updated"] += sum(len(payment_ids) for payment_ids in changed.values())
+        return
+
+    batch_size = getattr(settings, "RECONCILIATION_BATCH_SIZE", 1000)
+    with transaction.atomic():
+        for (current, status), payment_ids in sorted(changed.items()):
+            payment_ids.sort()
+            for start in range(0, len(payment_ids), batch_size):
+                batch = payment_ids[start:start + batch_size]
+                updated = Payment.objects.filter(id__in=batch, status=current).update(status=status)
+                stats["updated"] += updated
+                if updated != len(batch):
+                    moved = Payment.objects.filter(id__in=batch).exclude(status=status).values_list("id", flat=True)
+                    for payment_id in sorted(moved):
+                        record = lines[payment_id]
+                        report({"kind": "status_changed", "line": record.line, "order_id": record.order_id})
+
+
+def reconcile_settlement(
+    stream: Iterable[str],
+    fmt: str,
+    dry_run: bool = False,
+    on_mismatch: Optional[Callable[[Mismatch], None]] = None,
+    chunk_size: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Reconcile payments against a settlement file ``stream`` (text, "csv" or "ndjson").
+
+    ``on_mismatch`` receives every line that could not be applied; only counters,
+    the current chunk and a bitmap of the order ids seen are kept in memory.
+    With ``dry_run`` nothing is written.
+
+    Returns:
+        Counters per outcome, elapsed seconds and throughput in lines per second.
+    """
+    chunk_size = chunk_size or _chunk_size()
+    stats = dict.fromkeys(
+        (
+            "lines", "matched", "updated", "amount_mismatch", "unknown_order", "no_payment", "status_changed",
+            "duplicate", "invalid",
+        ),
+        0,
+    )
+
+    def report(mismatch: Mismatch) -> None:
+        stats[mismatch["kind"]] += 1
+        if on_mismatch is not None:
+            on_mismatch(mismatch)
+
+    started = time.perf_counter()
+    chunk: Dict[int, SettlementRecord] = {}
+    seen = _SeenOrders()
+    for line, row in iter_records(stream, fmt):
+        stats["lines"] += 1
+        record = _parse(line, row)
+        if record is None:
+            report({"kind": "invalid", "line": line})
+            continue
+        if record.order_id in chunk or not seen.add(record.order_id):
+            report({"kind": "duplicate", "line": line, "order_id": record.order_id})
+            continue
+        chunk[record.order_id] = record
+        if len(chunk) >= chunk_size:
+            _reconcile_chunk(chunk, stats, report, dry_run)
+            chunk = {}
+            seen.next_chunk()
+    if chunk:
+        _reconcile_chunk(chunk, stats, report, dry_run)
+
+    elapsed = time.perf_counter() - started
+    stats["seconds"] = round(elapsed, 3)
+    stats["lines_per_second"] = int(stats["lines"] / elapsed) if elapsed else stats["lines"]
+    return stats
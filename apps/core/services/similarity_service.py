@@ -0,0 +1,217 @@
+"""
+Content-based "similar products" using TF-IDF over product titles and descriptions.
+
+The model is an L2-normalised sparse TF-IDF matrix (one row per product), so
+cosine similarity is a single sparse matrix-vector product followed by an
+``argpartition`` - there are no per-product Python loops at query time. A
+column-major copy of the matrix is kept so a query only touches the postings
+of its own terms.
+
+The model is fitted offline by ``manage.py build_similarity_model`` (and the
+scheduler's ``refresh_similarity_model`` job whenever the catalog version
+changed) and published like the recommendation index: the fitted vectorizer
+and the matrix are written into a new version directory and the ``CURRENT``
+pointer file is replaced atomically. Workers only load the published model,
+re-reading the pointer at most every ``SIMILARITY_RELOAD_INTERVAL`` seconds;
+products created since the last build are vectorised at query time.
+"""
+import json
+import pickle
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from django.conf import settings
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from apps.core.models import Product
+from apps.core.services.catalog_service import get_catalog_version
+from apps.core.services.files import atomic_write
+
+CURRENT_FILE = "CURRENT"
+STATE_FILE = "state.json"
+KEEP_VERSIONS = 2
+
+
+class SimilarityModel(NamedTuple):
+    """A fitted TF-IDF model and the product ids of its rows."""
+    version: str  # published version, "" if fitted in memory
+    vectorizer: TfidfVectorizer
+    product_ids: np.ndarray  # sorted, shape (n,)
+    matrix: sparse.csr_matrix  # L2-normalised rows, shape (n, features)
+    columns: sparse.csc_matrix  # same matrix, column-major for scoring
+
+
+def _document(title: str, description: str) -> str:
+    # Titles are short and precise, so they are counted twice.
+    return f"{title} {title} {description}"
+
+
+def fit_model(products: Iterable[Tuple[int, str, str]], version: str = "") -> SimilarityModel:
+    """Fit TF-IDF on (id, title, description) rows."""
+    ids: List[int] = []
+    documents: List[str] = []
+    for product_id, title, description in products:
+        ids.append(product_id)
+        documents.append(_document(title, description))
+
+    product_ids = np.asarray(ids, dtype=np.int64)
+    order = np.argsort(product_ids, kind="stable")
+    vectorizer = TfidfVectorizer(
+        sublinear_tf=True,
+        stop_words="english",
+        max_features=getattr(settings, "SIMILARITY_MAX_FEATURES", 50_000),
+        dtype=np.float32,
+    )
+    if documents:
+        try:
+            matrix = vectorizer.fit_transform([documents[i] for i in order]).tocsr()
+        except ValueError:  # every document is empty or stop words only
+            matrix = sparse.csr_matrix((len(documents), 0), dtype=np.float32)
+            vectorizer = None
+    else:
+        matrix = sparse.csr_matrix((0, 0), dtype=np.float32)
+        vectorizer = None
+    return SimilarityModel(version, vectorizer, product_ids[order], matrix, matrix.tocsc())
+
+
+def top_k_similar(model: SimilarityModel, vector: sparse.csr_matrix, k: int, exclude: Optional[int] = None) -> List[int]:
+    """Return ids of the k rows with the highest cosine similarity to ``vector``."""
+    if not len(model.product_ids) or vector.nnz == 0:
+        return []
+    scores = model.columns[:, vector.indices] @ vector.data
+    if exclude is not None:
+        row = int(np.searchsorted(model.product_ids, exclude))
+        if row < len(model.product_ids) and model.product_ids[row] == exclude:
+            scores[row] = 0.0
+
+    k = min(k, len(scores))
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    candidates = candidates[scores[candidates] > 0]
+    ranked = candidates[np.lexsort((model.product_ids[candidates], -scores[candidates]))]
+    return [int(i) for i in model.product_ids[ranked]]
+
+
+def _model_dir() -> Path:
+    return Path(getattr(settings, "SIMILARITY_DIR", settings.BASE_DIR / "var" / "similarity"))
+
+
+# ---------------------------------------------------------------------------
+# Offline build
+# ---------------------------------------------------------------------------
+
+def _read_state(directory: Path) -> Dict:
+    try:
+        return json.loads((directory / STATE_FILE).read_text())
+    except FileNotFoundError:
+        return {}
+
+
+def build_similarity_model(force: bool = True) -> Dict[str, object]:
+    """
+    Fit the model on the whole catalog and publish it.
+
+    With ``force=False`` nothing is fitted unless the catalog version changed
+    since the last build.
+
+    Returns:
+        Build statistics: version, whether it was published, products and terms.
+    """
+    directory = _model_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    state = _read_state(directory)
+    catalog_version = get_catalog_version()
+    if not force and state.get("catalog_version") == catalog_version and (directory / CURRENT_FILE).exists():
+        return {"version": state.get("version"), "published": False, "products": 0, "features": 0}
+
+    rows = Product.objects.values_list("id", "title", "description").iterator(chunk_size=10_000)
+    model = fit_model(rows)
+
+    version = f"{time.time_ns()}"
+    staging = directory / f".{version}.tmp"
+    staging.mkdir()
+    (staging / "vectorizer.pickle").write_bytes(pickle.dumps(model.vectorizer, protocol=pickle.HIGHEST_PROTOCOL))
+    np.save(staging / "product_ids.npy", model.product_ids)
+    sparse.save_npz(staging / "matrix.npz", model.matrix, compressed=False)
+    staging.rename(directory / version)
+
+    atomic_write(directory / CURRENT_FILE, version.encode())
+    atomic_write(directory / STATE_FILE, json.dumps({"version": version, "catalog_version": catalog_version}).encode())
+
+    # Keep the previous version around for workers that have not reloaded yet.
+    versions = sorted(p for p in directory.iterdir() if p.is_dir() and p.name.isdigit())
+    for stale in versions[:-KEEP_VERSIONS]:
+        shutil.rmtree(stale, ignore_errors=True)
+
+    return {
+        "version": version,
+        "published": True,
+        "products": len(model.product_ids),
+        "features": model.matrix.shape[1],
+    }
+
+
+# ---------------------------------------------------------------------------
+# Online lookup
+# ---------------------------------------------------------------------------
+
+_model_lock = threading.Lock()
+_model: Optional[SimilarityModel] = None
+_model_dir_loaded: Optional[Path] = None
+_checked_at = 0.0
+
+
+def _load_model(directory: Path, version: str) -> Optional[SimilarityModel]:
+    version_dir = directory / version
+    try:
+        vectorizer = pickle.loads((version_dir / "vectorizer.pickle").read_bytes())
+        product_ids = np.load(version_dir / "product_ids.npy")
+        matrix = sparse.load_npz(version_dir / "matrix.npz").tocsr()
+    except (FileNotFoundError, ValueError):
+        return None
+    return SimilarityModel(version, vectorizer, product_ids, matrix, matrix.tocsc())
+
+
+def get_similarity_model() -> Optional[SimilarityModel]:
+    """
+    Return the published model, or None before the first build.
+
+    The ``CURRENT`` pointer is re-read at most every ``SIMILARITY_RELOAD_INTERVAL``
+    seconds, so a rebuild is picked up by every worker without a restart.
+    """
+    global _model, _model_dir_loaded, _checked_at
+
+    directory = _model_dir()
+    interval = getattr(settings, "SIMILARITY_RELOAD_INTERVAL", 30)
+    now = time.monotonic()
+    if _model_dir_loaded == directory and now - _checked_at < interval:
+        return _model
+
+    with _model_lock:
+        _checked_at = now
+        try:
+            version = (directory / CURRENT_FILE).read_text().strip()
+        except FileNotFoundError:
+            _model, _model_dir_loaded = None, directory
+            return None
+        if _model is None or _model_dir_loaded != directory or _model.version != version:
+            _model, _model_dir_loaded = _load_model(directory, version), directory
+        return _model
+
+
+def get_similar_products(product: Product, limit: int = 10) -> Sequence[int]:
+    """Return ids of products whose text is most similar to ``product``, best first."""
+    model = get_similarity_model()
+    if model is None or model.vectorizer is None:
+        return []
+    row = int(np.searchsorted(model.product_ids, product.id))
+    if row < len(model.product_ids) and model.product_ids[row] == product.id:
+        vector = model.matrix[row]
+    else:
+        # Not in the model yet (created since the last build): vectorise on the fly.
+        vector = model.vectorizer.transform([_document(product.title, product.description)]).tocsr()
+    return top_k_similar(model, vector, limit, exclude=product.id)
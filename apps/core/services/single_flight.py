@@ -0,0 +1,142 @@
+"""
+Single-flight cache recomputation with stale-while-revalidate.
+
+When a hot cache entry expires, every concurrent request would miss and
+recompute it at once. ``get_or_compute`` lets one caller per key, the
+leader, recompute it:
+
+- within a process, the first thread to miss registers a flight for the key;
+  the other threads wait for it and reuse its result (or its exception);
+- across processes, the leader also takes a short-lived lock in the cache
+  (``cache.add``). Callers that lose it poll the cache for the winner's value
+  until the lock is released or expires, then compute it themselves.
+
+Entries carry a freshness deadline and a version token and are kept ``stale``
+seconds past their deadline. While a stale (expired or outdated) entry is
+being refreshed, every caller other than the leader gets the stale value at
+once, so a hot key never queues behind its recomputation.
+"""
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+POLL_INTERVAL = 0.01  # seconds between cache reads while another process recomputes
+
+Entry = Tuple[Any, float, Optional[str]]  # (value, fresh until, version)
+
+
+class _Flight:
+    """An in-process recomputation that other threads can wait for."""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+_flights_lock = threading.Lock()
+_flights: Dict[str, _Flight] = {}
+
+
+def _lock_timeout() -> float:
+    return getattr(settings, "SINGLE_FLIGHT_LOCK_TIMEOUT", 5)
+
+
+def _store(key: str, value: Any, timeout: int, stale: int, version: Optional[str]) -> None:
+    cache.set(key, (value, time.time() + timeout, version), timeout=timeout + stale)
+
+
+def _wait_for_other_process(key: str, lock_key: str) -> Optional[Entry]:
+    """Poll for the entry another process is computing; None if it gave up or timed out."""
+    deadline = time.monotonic() + _lock_timeout()
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+        if cache.get(lock_key) is None:
+            return None
+    return None
+
+
+def _recompute(
+    key: str,
+    compute: Callable[[], Any],
+    timeout: int,
+    stale: int,
+    version: Optional[str],
+    entry: Optional[Entry],
+) -> Any:
+    lock_key = f"{key}:lock"
+    token = uuid.uuid4().hex
+    if not cache.add(lock_key, token, timeout=_lock_timeout()):
+        if entry is not None:
+            return entry[0]
+        entry = _wait_for_other_process(key, lock_key)
+        if entry is not None:
+            return entry[0]
+        # The other process failed or is too slow: compute without the lock.
+        value = compute()
+        _store(key, value, timeout, stale, version)
+        return value
+    try:
+        value = compute()
+        _store(key, value, timeout, stale, version)
+        return value
+    finally:
+        if cache.get(lock_key) == token:
+            cache.delete(lock_key)
+
+
+def get_or_compute(
+    key: str,
+    compute: Callable[[], Any],
+    timeout: int,
+    stale: int = 0,
+    version: Optional[str] = None,
+) -> Any:
+    """
+    Cached value of ``key``, recomputed by at most one caller at a time.
+
+    An entry is fresh for ``timeout`` seconds and only while it was stored
+    under the current ``version``; after that it may still be served for
+    ``stale`` seconds while one caller refreshes it. Exceptions from
+    ``compute`` reach every caller waiting on the same flight and are not
+    cached.
+
+    Returns:
+        The cached, reused or freshly computed value.
+    """
+    entry: Optional[Entry] = cache.get(key)
+    if entry is not None and entry[1] > time.time() and entry[2] == version:
+        return entry[0]
+
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+
+    if not leader:
+        if entry is not None:
+            return entry[0]
+        if not flight.done.wait(_lock_timeout()):
+            return compute()
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    try:
+        flight.value = _recompute(key, compute, timeout, stale, version, entry)
+        return flight.value
+    except BaseException as exc:
+        flight.error = exc
+        raise
+    finally:
+        with _flights_lock:
+            del _flights[key]
+        flight.done.set()
@@ -0,0 +1,206 @@
+"""
+Prebuilt catalog snapshot served as immutable files.
+
+``build_catalog_snapshot`` renders the catalog once into a content-addressed
+version directory:
+
+- ``products.json``   - exactly what an unfiltered ``GET /api/products/`` returns
+- ``categories.json`` - exactly what ``GET /api/categories/`` returns
+- ``catalog.json``    - both together: {"categories": [...], "products": [...]}
+
+Each file also gets precompressed ``.gz`` and ``.br`` variants (Brotli is in
+requirements.txt; where it is missing, only gzip is built). The version is a
+hash of the content, so it doubles as a strong ETag, and a new version is only
+published (by atomically replacing the ``CURRENT`` pointer) when the content
+changed.
+
+A scheduler job rebuilds the snapshot when the catalog version changes or the
+snapshot is older than ``CATALOG_SNAPSHOT_MAX_AGE`` (stock moves with cart
+reservations without bumping the catalog version).
+"""
+import gzip
+import hashlib
+import json
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+
+from apps.core.models import Category, Product
+from apps.core.serializers import CategorySerializer, ProductSerializer
+from apps.core.services.catalog_service import get_catalog_version
+from apps.core.services.files import atomic_write
+
+try:
+    import brotli
+except ImportError:  # not installed: only gzip variants are built
+    brotli = None
+
+CURRENT_FILE = "CURRENT"
+STATE_FILE = "state.json"
+KEEP_VERSIONS = 2
+
+# Content-Encoding -> file suffix, in order of preference.
+ENCODINGS: List[Tuple[str, str]] = [("br", ".br"), ("gzip", ".gz")]
+
+
+class Snapshot(NamedTuple):
+    """A published snapshot version."""
+    directory: Path
+    version: str
+    encodings: frozenset  # available Content-Encodings besides identity
+
+    def path(self, artifact: str, encoding: Optional[str] = None) -> Path:
+        suffix = dict(ENCODINGS)[encoding] if encoding else ""
+        return self.directory / f"{artifact}.json{suffix}"
+
+
+def _snapshot_dir() -> Path:
+    return Path(getattr(settings, "CATALOG_SNAPSHOT_DIR", settings.BASE_DIR / "var" / "catalog"))
+
+
+# ---------------------------------------------------------------------------
+# Build
+# ---------------------------------------------------------------------------
+
+def _render_list(serializer_class, queryset, chunk_size: int = 2000) -> bytes:
+    """Render ``queryset`` like a list endpoint would, one chunk at a time."""
+    renderer = JSONRenderer()
+    parts: List[bytes] = []
+    chunk = []
+    for obj in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(obj)
+        if len(chunk) == chunk_size:
+            parts.append(renderer.render(serializer_class(chunk, many=True).data)[1:-1])
+            chunk = []
+    if chunk:
+        parts.append(renderer.render(serializer_class(chunk, many=True).data)[1:-1])
+    return b"[" + b",".join(parts) + b"]"
+
+
+def render_catalog() -> Dict[str, bytes]:
+    """Render every snapshot artifact as uncompressed JSON bytes."""
+    # Same ordering as ProductListView's default (-id).
+    products = _render_list(ProductSerializer, Product.objects.order_by("-id"))
+    categories = _render_list(CategorySerializer, Category.objects.order_by("id"))
+    return {
+        "products": products,
+        "categories": categories,
+        "catalog": b'{"categories":' + categories + b',"products":' + products + b"}",
+    }
+
+
+def _read_state(directory: Path) -> Dict:
+    try:
+        return json.loads((directory / STATE_FILE).read_text())
+    except FileNotFoundError:
+        return {}
+
+
+def build_catalog_snapshot(force: bool = True) -> Dict[str, object]:
+    """
+    Render and publish the catalog snapshot.
+
+    With ``force=False`` nothing is rendered unless the catalog version changed
+    or the last build is older than ``CATALOG_SNAPSHOT_MAX_AGE`` seconds.
+
+    Returns:
+        Build statistics: version, whether it was (re)published, artifact size.
+    """
+    directory = _snapshot_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    state = _read_state(directory)
+    catalog_version = get_catalog_version()
+    max_age = getattr(settings, "CATALOG_SNAPSHOT_MAX_AGE", 300)
+
+    fresh = state.get("catalog_version") == catalog_version and time.time() - state.get("built_at", 0) < max_age
+    if not force and fresh and (directory / CURRENT_FILE).exists():
+        return {"version": state.get("version"), "published": False, "bytes": 0}
+
+    artifacts = render_catalog()
+    version = hashlib.sha256(artifacts["catalog"]).hexdigest()[:32]
+    version_dir = directory / version
+    published = not version_dir.exists()
+
+    if published:
+        staging = directory / f".{version}.tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir()
+        for name, body in artifacts.items():
+            (staging / f"{name}.json").write_bytes(body)
+            (staging / f"{name}.json.gz").write_bytes(gzip.compress(body, compresslevel=9, mtime=0))
+            if brotli is not None:
+                (staging / f"{name}.json.br").write_bytes(brotli.compress(body))
+        staging.rename(version_dir)
+
+    atomic_write(directory / CURRENT_FILE, version.encode())
+    atomic_write(
+        directory / STATE_FILE,
+        json.dumps({"version": version, "catalog_version": catalog_version, "built_at": time.time()}).encode(),
+    )
+
+    # Keep the previous version for workers that have not reloaded yet.
+    versions = sorted(
+        (p for p in directory.iterdir() if p.is_dir() and not p.name.startswith(".") and p.name != version),
+        key=lambda p: p.stat().st_mtime,
+    )
+    for stale in versions[:-(KEEP_VERSIONS - 1)]:
+        shutil.rmtree(stale, ignore_errors=True)
+
+    return {"version": version, "published": published, "bytes": len(artifacts["catalog"])}
+
+
+# ---------------------------------------------------------------------------
+# Serve
+# ---------------------------------------------------------------------------
+
+_snapshot_lock = threading.Lock()
+_snapshot: Optional[Snapshot] = None
+_checked_at = 0.0
+
+
+def _load_snapshot(directory: Path, version: str) -> Optional[Snapshot]:
+    version_dir = directory / version
+    if not (version_dir / "catalog.json").exists():
+        return None
+    encodings = frozenset(
+        encoding for encoding, suffix in ENCODINGS if (version_dir / f"catalog.json{suffix}").exists()
+    )
+    return Snapshot(version_dir, version, encodings)
+
+
+def get_snapshot(version: Optional[str] = None) -> Optional[Snapshot]:
+    """
+    Return the current snapshot, or a specific ``version`` if it still exists.
+
+    The ``CURRENT`` pointer is re-read at most every
+    ``CATALOG_SNAPSHOT_RELOAD_INTERVAL`` seconds per process.
+    """
+    global _snapshot, _checked_at
+
+    directory = _snapshot_dir()
+    if version is not None:
+        if not version.isalnum():
+            return None
+        return _load_snapshot(directory, version)
+
+    interval = getattr(settings, "CATALOG_SNAPSHOT_RELOAD_INTERVAL", 5)
+    now = time.monotonic()
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.directory.parent == directory and now - _checked_at < interval:
+        return snapshot
+
+    with _snapshot_lock:
+        _checked_at = now
+        try:
+            current = (directory / CURRENT_FILE).read_text().strip()
+        except FileNotFoundError:
+            _snapshot = None
+            return None
+        if _snapshot is None or _snapshot.directory.parent != directory or _snapshot.version != current:
+            _snapshot = _load_snapshot(directory, current)
+        return _snapshot
@@ -0,0 +1,191 @@
+"""
+Cache warming after deploys.
+
+A freshly started worker has cold caches: product detail payloads, facet
+counts, the catalog version, the snapshot and recommendation pointers, the
+similarity model and its database connections. ``warm_caches`` requests the
+hottest read endpoints in-process, through the same URL resolution and views
+as real traffic, so every cache they use is filled the way a request would
+fill it:
+
+- the detail pages of the top ``WARM_TOP_PRODUCTS`` products by units ordered
+  in the last ``WARM_ORDER_WINDOW_DAYS`` days;
+- the category list;
+- the first product list page for each of ``WARM_PRODUCT_LIST_QUERIES`` and
+  for the ``WARM_TOP_CATEGORIES`` largest categories.
+
+Requests run on ``concurrency`` threads, each with its own database
+connection. Shared caches (Redis, Memcached) are warmed for every worker by
+``manage.py warm_caches``; per-process caches (LocMem, memory-mapped indexes)
+only by the process that warms, which is what ``WARM_CACHES_ON_STARTUP`` does
+in each WSGI/ASGI worker.
+"""
+import io
+import logging
+import queue
+import threading
+import time
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connections
+from django.core.handlers.wsgi import WSGIRequest
+from django.db.models import Count, Sum
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from apps.core.models import Category, OrderItem
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PRODUCT_LIST_QUERIES = ("", "ordering=price", "ordering=-price", "in_stock=true", "facets=true")
+
+
+def top_ordered_products(limit: int) -> Tuple[List[int], float]:
+    """
+    Ids of the most ordered products within ``WARM_ORDER_WINDOW_DAYS``.
+
+    Returns:
+        (product ids, most ordered first; share of ordered units they account for).
+    """
+    days = getattr(settings, "WARM_ORDER_WINDOW_DAYS", 30)
+    items = OrderItem.objects.filter(order__created_at__gte=timezone.now() - timedelta(days=days))
+    rows = list(
+        items.values("product_id").annotate(units=Sum("quantity")).order_by("-units", "product_id")
+        .values_list("product_id", "units")[:limit]
+    )
+    total = items.aggregate(units=Sum("quantity"))["units"] or 0
+    share = sum(units for _, units in rows) / total if total else 0.0
+    return [product_id for product_id, _ in rows], share
+
+
+def warm_targets(product_ids: List[int]) -> Dict[str, List[str]]:
+    """Paths to request, by group."""
+    list_url = reverse("product-list")
+    queries = list(getattr(settings, "WARM_PRODUCT_LIST_QUERIES", DEFAULT_PRODUCT_LIST_QUERIES))
+    top_categories = (
+        Category.objects.annotate(size=Count("products")).order_by("-size", "id")
+        .values_list("id", flat=True)[:getattr(settings, "WARM_TOP_CATEGORIES", 10)]
+    )
+    queries += [f"category={category_id}" for category_id in top_categories]
+    return {
+        "product details": [reverse("product-detail", kwargs={"pk": product_id}) for product_id in product_ids],
+        "category list": [reverse("category-list")],
+        "product list pages": [f"{list_url}?{query}" if query else list_url for query in queries],
+    }
+
+
+def _request(path: str) -> WSGIRequest:
+    path_info, _, query = path.partition("?")
+    # Views that build absolute URLs (pagination links) validate the host.
+    host = next((host.lstrip(".") for host in settings.ALLOWED_HOSTS if host != "*"), "localhost")
+    return WSGIRequest({
+        "REQUEST_METHOD": "GET",
+        "SCRIPT_NAME": "",
+        "PATH_INFO": path_info,
+        "QUERY_STRING": query,
+        "HTTP_HOST": host,
+        "SERVER_NAME": host,
+        "SERVER_PORT": "80",
+        "wsgi.url_scheme": "http",
+        "wsgi.input": io.BytesIO(),
+    })
+
+
+def warm_path(path: str) -> bool:
+    """Request ``path`` in-process, as an anonymous client. Returns whether it succeeded."""
+    request = _request(path)
+    try:
+        match = resolve(request.path_info)
+        response = match.func(request, *match.args, **match.kwargs)
+        if hasattr(response, "render"):
+            response.render()
+        response.close()
+    except Exception:
+        logger.warning("Warming %s failed", path, exc_info=True)
+        return False
+    if response.status_code != 200:
+        logger.warning("Warming %s returned %d", path, response.status_code)
+    return response.status_code == 200
+
+
+def _worker(paths: "queue.SimpleQueue[str]", results: Dict[str, bool]) -> None:
+    try:
+        while True:
+            try:
+                path = paths.get_nowait()
+            except queue.Empty:
+                return
+            results[path] = warm_path(path)
+    finally:
+        connections.close_all()
+
+
+def warm_caches(top_products: Optional[int] = None, concurrency: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Request the hottest read endpoints so their caches are filled.
+
+    With ``concurrency`` 1 everything runs in the calling thread.
+
+    Returns:
+        {"groups": {group: {"warmed", "total"}}, "order_share", "failed", "seconds"},
+        where order_share is the share of recently ordered units that the
+        warmed product detail pages account for.
+    """
+    top_products = getattr(settings, "WARM_TOP_PRODUCTS", 200) if top_products is None else top_products
+    concurrency = max(1, concurrency or getattr(settings, "WARM_CONCURRENCY", 4))
+
+    started = time.perf_counter()
+    product_ids, order_share = top_ordered_products(top_products)
+    targets = warm_targets(product_ids)
+
+    paths: "queue.SimpleQueue[str]" = queue.SimpleQueue()
+    for group_paths in targets.values():
+        for path in group_paths:
+            paths.put(path)
+    results: Dict[str, bool] = {}
+    if concurrency == 1:
+        while not paths.empty():
+            path = paths.get()
+            results[path] = warm_path(path)
+    else:
+        threads = [
+            threading.Thread(target=_worker, args=(paths, results), name=f"warm-caches-{i}")
+            for i in range(concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    return {
+        "groups": {
+            group: {"warmed": sum(results.get(path, False) for path in group_paths), "total": len(group_paths)}
+            for group, group_paths in targets.items()
+        },
+        "order_share": order_share,
+        "failed": sorted(path for path, ok in results.items() if not ok),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def _warm_on_startup() -> None:
+    try:
+        stats = warm_caches()
+    except Exception:
+        logger.exception("Cache warming failed")
+        return
+    finally:
+        connections.close_all()
+    logger.info(
+        "Caches warmed in %.1fs: %s",
+        stats["seconds"],
+        ", ".join(f"{group} {counts['warmed']}/{counts['total']}" for group, counts in stats["groups"].items()),
+    )
+
+
+def warm_caches_in_background() -> None:
+    """Startup hook: warm this process's caches in a daemon thread if ``WARM_CACHES_ON_STARTUP``."""
+    if getattr(settings, "WARM_CACHES_ON_STARTUP", False):
+        threading.Thread(target=_warm_on_startup, name="warm-caches", daemon=True).start()
@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from apps.core.models import CartItem, CatalogChange, Category, Product
+from apps.core.services.cart_service import release_hold
+from apps.core.services.catalog_service import bump_catalog_version
+
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs) -> None:
+    """
+    Apply SQLITE_PRAGMAS to every new SQLite connection.
+
+    WAL lets readers run alongside the single writer, and busy_timeout makes
+    writers queue for the lock instead of failing with "database is locked".
+    """
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in getattr(settings, "SQLITE_PRAGMAS", {}).items():
+            cursor.execute(f"PRAGMA {pragma} = {value}")
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Category)
+def catalog_changed(sender, **kwargs) -> None:
+    """Invalidate catalog-derived caches (similarity model, facets, ...)."""
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Category)
+def record_catalog_save(sender, instance, using, **kwargs) -> None:
+    """Append saved products and categories to the catalog change log."""
+    CatalogChange.record(sender, [instance.pk], using=using)
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Category)
+def record_catalog_delete(sender, instance, using, **kwargs) -> None:
+    """Append a tombstone for deleted products and categories."""
+    CatalogChange.record(sender, [instance.pk], deleted=True, using=using)
+
+
+@receiver(pre_delete, sender=CartItem)
+def cart_item_deleted(sender, instance: CartItem, **kwargs) -> None:
+    """Return stock held by a cart item about to be deleted, whatever deletes it."""
+    release_hold(instance)
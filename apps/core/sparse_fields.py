@@ -0,0 +1,111 @@
+"""
+Sparse fieldsets: ``?fields=`` / ``?exclude=`` for read endpoints.
+
+Field lists are comma separated; dotted paths reach into nested serializers:
+
+    ?fields=id,total_price,items.quantity,items.product.title
+    ?exclude=items.product.description
+
+The same field tree trims the serializer and decides which columns each
+queryset level may defer, so unrequested columns (such as the unbounded
+``Product.description``) are never read from the database.
+"""
+from typing import Dict, List, Optional, Type
+
+from django.db.models import Model
+from rest_framework import serializers
+
+FieldTree = Dict[str, "FieldTree"]
+
+# Relation path ("" is the root queryset, "items__product" a prefetch) -> fields to defer.
+ProjectionPlan = Dict[str, List[str]]
+
+
+def parse_field_tree(raw: Optional[str]) -> Optional[FieldTree]:
+    """
+    Parse "id,items.product.title" into {"id": {}, "items": {"product": {"title": {}}}}.
+
+    A missing or empty list (``?fields=``) is None: no selection, not an empty one.
+    """
+    if raw is None:
+        return None
+    tree: FieldTree = {}
+    for path in raw.split(","):
+        node = tree
+        for part in filter(None, (p.strip() for p in path.split("."))):
+            node = node.setdefault(part, {})
+    return tree or None
+
+
+def _nested(field: serializers.Field) -> Optional[serializers.BaseSerializer]:
+    if isinstance(field, serializers.ListSerializer):
+        return field.child
+    if isinstance(field, serializers.BaseSerializer):
+        return field
+    return None
+
+
+def prune_serializer(
+    serializer: serializers.BaseSerializer,
+    include: Optional[FieldTree],
+    exclude: Optional[FieldTree],
+) -> None:
+    """
+    Drop fields from ``serializer`` (and its nested serializers) in place.
+
+    An empty subtree selects or excludes a whole field; unknown names are ignored.
+    """
+    serializer = _nested(serializer) if isinstance(serializer, serializers.ListSerializer) else serializer
+    fields = serializer.fields
+    for name in list(fields):
+        if include is not None and name not in include:
+            fields.pop(name)
+            continue
+        if exclude is not None and name in exclude and not exclude[name]:
+            fields.pop(name)
+            continue
+
+        nested = _nested(fields[name])
+        sub_include = (include.get(name) or None) if include is not None else None
+        sub_exclude = (exclude.get(name) or None) if exclude is not None else None
+        if nested is not None and (sub_include or sub_exclude):
+            prune_serializer(nested, sub_include, sub_exclude)
+
+
+def deferrable_fields(model: Type[Model], used: set) -> List[str]:
+    """Concrete non-key columns of ``model`` that no serializer field reads."""
+    return [
+        field.name
+        for field in model._meta.concrete_fields
+        if not field.primary_key and not field.is_relation and field.name not in used
+    ]
+
+
+def projection_plan(serializer: serializers.BaseSerializer, path: str = "") -> ProjectionPlan:
+    """
+    Work out which columns every queryset level may defer for ``serializer``.
+
+    Relations whose nested serializer was pruned away are absent from the plan,
+    so callers can skip their prefetch entirely.
+    """
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+
+    plan: ProjectionPlan = {}
+    used = set()
+    reads_whole_instance = False
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if field.source == "*":
+            reads_whole_instance = True
+            continue
+        attr = field.source.split(".")[0]
+        used.add(attr)
+        nested = _nested(field)
+        if isinstance(nested, serializers.ModelSerializer):
+            plan.update(projection_plan(nested, f"{path}__{attr}" if path else attr))
+
+    model = serializer.Meta.model
+    plan[path] = [] if reads_whole_instance else deferrable_fields(model, used)
+    return plan
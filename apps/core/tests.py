@@ -1,15 +1,87 @@
+import gzip
+import importlib
+import io
+import json
+import multiprocessing
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+
 import pytest
 from rest_framework.test import APIClient
 from rest_framework import status
 from decimal import Decimal
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
-from apps.core.models import User, Category, Product, Cart, CartItem, Order, Payment
+from apps.core.checks import check_cart_storage
+from apps.core.db_router import (
+    ReplicaHealth,
+    ReplicaRouter,
+    is_pinned_to_primary,
+    replica_health,
+    replica_reads,
+    reset_write_tracking,
+)
+from apps.core.models import User, Category, Product, Cart, CartItem, Order, OrderItem, Payment, IdempotencyKey, Job, CatalogChange
+from apps.core.services import (
+    build_catalog_snapshot,
+    build_recommendations,
+    build_similarity_model,
+    bulk_update_inventory,
+    compact_catalog_changes,
+    enqueue,
+    evict_expired_idempotency_keys,
+    flush_carts,
+    get_frequently_bought_together,
+    reconcile_settlement,
+    release_expired_reservations,
+    run_jobs,
+    warm_caches,
+)
+from apps.core.services.analytics_service import compute_daily_buckets
+from apps.core.services.catalog_service import get_catalog_version
+from apps.core.services.cart_cache_service import CART_KEY, LOCK_KEY, _mark_clean
+from apps.core.services.idempotency_service import request_fingerprint
+from apps.core.services import analytics_service, openapi_service
+from apps.core.services.job_service import HANDLERS, _fail
+from apps.core.services.product_detail_service import product_detail_cache_key
+from apps.core.services.single_flight import get_or_compute
+from apps.core import signals, throttling
+from apps.core.workers import worker_process
 
 
 # ============================================================
 # FIXTURES
 # ============================================================
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Start every test with an empty cache (and no rate limit state)."""
+    cache.clear()
+    throttling.reset_throttle_state()
+    yield
+    cache.clear()
+    throttling.reset_throttle_state()
+
+
+@pytest.fixture(autouse=True)
+def catalog_snapshot_dir(settings, tmp_path):
+    """Keep catalog snapshots per test, so a locally built one never answers API tests."""
+    settings.CATALOG_SNAPSHOT_DIR = tmp_path / "catalog"
+    settings.CATALOG_SNAPSHOT_RELOAD_INTERVAL = 0
+    return settings.CATALOG_SNAPSHOT_DIR
+
+
 @pytest.fixture
 def api_client():
     """API client fixture."""
@@ -437,3 +509,1903 @@ class TestPayments:
         """BAD — payment not found"""
         response = api_client.get("/api/payments/99999/")
         assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+# ============================================================
+# ANALYTICS TESTS
+# ============================================================
+
+@pytest.fixture
+def sales(db, user, product):
+    """Two paid orders on 2025-01-10 and one unpaid order on 2025-01-11."""
+    def place(day, quantity, method=None):
+        order = Order.objects.create(user=user, total_price=product.price * quantity)
+        Order.objects.filter(pk=order.pk).update(created_at=datetime(2025, 1, day, 12, tzinfo=dt_timezone.utc))
+        OrderItem.objects.create(order=order, product=product, quantity=quantity, price=product.price)
+        if method:
+            Payment.objects.create(order=order, amount=order.total_price, method=method, status='completed')
+        return order
+
+    return [place(10, 1, 'card'), place(10, 2, 'paypal'), place(11, 3)]
+
+
+@pytest.mark.django_db
+class TestSalesAnalytics:
+    """Tests for the sales analytics endpoint."""
+
+    url = "/api/analytics/sales/?start=2025-01-10&end=2025-01-12"
+
+    def test_sales_analytics_success(self, admin_client, sales, category) -> None:
+        """GOOD — buckets are grouped by day, category and payment method"""
+        response = admin_client.get(self.url)
+        assert response.status_code == status.HTTP_200_OK
+
+        days = response.data["days"]
+        assert [d["date"] for d in days] == ["2025-01-10", "2025-01-11", "2025-01-12"]
+        assert days[0]["revenue"] == 3000.0
+        assert days[0]["orders"] == 2
+        assert days[0]["by_payment_method"]["paypal"] == {"revenue": 2000.0, "orders": 1}
+        assert days[0]["order_value_percentiles"]["p50"] == 1500.0
+        assert days[1]["by_payment_method"]["none"]["orders"] == 1
+        assert days[2]["orders"] == 0
+        assert response.data["totals"]["by_category"][str(category.id)] == {"revenue": 6000.0, "items": 6}
+
+    def test_sales_analytics_closed_days_cached(self, admin_client, sales, product) -> None:
+        """GOOD — closed days are served from cache, not recomputed"""
+        admin_client.get(self.url)
+        OrderItem.objects.filter(order=sales[0]).update(quantity=10)
+
+        response = admin_client.get(self.url)
+        assert response.data["days"][0]["revenue"] == 3000.0
+
+    def test_sales_analytics_computes_only_missing_ranges(self, admin_client, sales, monkeypatch) -> None:
+        """GOOD — cached days between missing ones are not rescanned"""
+        admin_client.get("/api/analytics/sales/?start=2025-01-11&end=2025-01-11")
+        scanned = []
+        compute = analytics_service.compute_daily_buckets
+
+        def spy(start, end, *args, **kwargs):
+            scanned.append((start, end))
+            return compute(start, end, *args, **kwargs)
+
+        monkeypatch.setattr(analytics_service, "compute_daily_buckets", spy)
+        response = admin_client.get(self.url)
+        assert scanned == [(date(2025, 1, 10), date(2025, 1, 10)), (date(2025, 1, 12), date(2025, 1, 12))]
+        assert [d["orders"] for d in response.data["days"]] == [2, 1, 0]
+
+    def test_sales_buckets_independent_of_chunk_size(self, sales) -> None:
+        """GOOD — chunked reduction gives the same result as a single pass"""
+        start, end = date(2025, 1, 10), date(2025, 1, 11)
+        assert compute_daily_buckets(start, end, chunk_size=1) == compute_daily_buckets(start, end)
+
+    def test_sales_analytics_forbidden_for_regular_user(self, authenticated_client) -> None:
+        """BAD — staff only"""
+        response = authenticated_client.get(self.url)
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_sales_analytics_invalid_range(self, admin_client) -> None:
+        """BAD — start after end and malformed dates"""
+        assert admin_client.get("/api/analytics/sales/?start=2025-02-01&end=2025-01-01").status_code == 400
+        assert admin_client.get("/api/analytics/sales/?start=yesterday").status_code == 400
+
+
+# ============================================================
+# RECOMMENDATION TESTS
+# ============================================================
+
+@pytest.fixture
+def recommendation_settings(settings, tmp_path):
+    """Point the recommendation index at a temporary directory."""
+    settings.RECOMMENDATIONS_DIR = tmp_path / "recommendations"
+    settings.RECOMMENDATIONS_RELOAD_INTERVAL = 0
+    return settings
+
+
+@pytest.fixture
+def catalog(db, category):
+    """Four products in one category."""
+    return [
+        Product.objects.create(category=category, title=f'P{i}', description='', price=Decimal('10.00'), stock=5)
+        for i in range(4)
+    ]
+
+
+def place_order(user, products):
+    """Create an order containing one line per product."""
+    order = Order.objects.create(user=user, total_price=Decimal('0.00'))
+    for p in products:
+        OrderItem.objects.create(order=order, product=p, quantity=1, price=p.price)
+    return order
+
+
+@pytest.mark.django_db
+class TestRecommendations:
+    """Tests for frequently-bought-together recommendations."""
+
+    def test_product_detail_includes_recommendations(self, api_client, user, catalog, recommendation_settings) -> None:
+        """GOOD — neighbours ranked by normalised co-occurrence"""
+        a, b, c, d = catalog
+        place_order(user, [a, b])
+        place_order(user, [a, b])
+        place_order(user, [a, c, d])
+        place_order(user, [d])
+        build_recommendations()
+
+        response = api_client.get(f"/api/products/{a.id}/")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["frequently_bought_together"] == [b.id, c.id, d.id]
+
+    def test_incremental_build_folds_in_new_orders(self, user, catalog, recommendation_settings) -> None:
+        """GOOD — a rebuild only processes new orders and matches a full rebuild"""
+        a, b, c, _ = catalog
+        place_order(user, [a, b])
+        build_recommendations()
+        place_order(user, [a, c])
+        place_order(user, [a, c])
+
+        assert build_recommendations()["pairs"] == 4
+        incremental = get_frequently_bought_together(a.id)
+        build_recommendations(full=True)
+        assert get_frequently_bought_together(a.id) == incremental == [c.id, b.id]
+
+    def test_product_without_index(self, api_client, product, recommendation_settings) -> None:
+        """BAD — no published index yields an empty list"""
+        response = api_client.get(f"/api/products/{product.id}/")
+        assert response.data["frequently_bought_together"] == []
+
+
+# ============================================================
+# SIMILAR PRODUCTS TESTS
+# ============================================================
+
+@pytest.fixture
+def similarity_settings(settings, tmp_path):
+    """Publish the similarity model into a temp dir and pick up every rebuild."""
+    settings.SIMILARITY_DIR = tmp_path / "similarity"
+    settings.SIMILARITY_RELOAD_INTERVAL = 0
+    return settings
+
+
+@pytest.mark.django_db
+class TestSimilarProducts:
+    """Tests for the TF-IDF similar products endpoint."""
+
+    def test_similar_products_success(self, api_client, category, similarity_settings) -> None:
+        """GOOD — products sharing description terms rank first"""
+        phone = Product.objects.create(category=category, title='Smartphone', description='android phone oled screen', price=1, stock=1)
+        other = Product.objects.create(category=category, title='Phone case', description='silicone case for android phone', price=1, stock=1)
+        Product.objects.create(category=category, title='Yoga mat', description='non-slip exercise mat', price=1, stock=1)
+        build_similarity_model()
+
+        response = api_client.get(f"/api/products/{phone.id}/similar/")
+        assert response.status_code == status.HTTP_200_OK
+        assert [p["id"] for p in response.data] == [other.id]
+
+    def test_similar_products_sees_new_products(self, api_client, category, similarity_settings) -> None:
+        """GOOD — new products are queried on the fly and ranked after the next build"""
+        a = Product.objects.create(category=category, title='Espresso machine', description='coffee maker', price=1, stock=1)
+        build_similarity_model()
+        assert api_client.get(f"/api/products/{a.id}/similar/").data == []
+
+        b = Product.objects.create(category=category, title='Coffee grinder', description='burr grinder for coffee', price=1, stock=1)
+        response = api_client.get(f"/api/products/{b.id}/similar/")
+        assert [p["id"] for p in response.data] == [a.id]
+
+        assert build_similarity_model(force=False)["published"]
+        response = api_client.get(f"/api/products/{a.id}/similar/")
+        assert [p["id"] for p in response.data] == [b.id]
+
+    def test_requests_never_fit(self, api_client, category, similarity_settings) -> None:
+        """BAD — without a published model the endpoint answers empty instead of fitting"""
+        a = Product.objects.create(category=category, title='Coffee grinder', description='coffee', price=1, stock=1)
+        Product.objects.create(category=category, title='Coffee beans', description='coffee', price=1, stock=1)
+        assert api_client.get(f"/api/products/{a.id}/similar/").data == []
+        assert not (similarity_settings.SIMILARITY_DIR / "CURRENT").exists()
+
+    def test_command_if_stale(self, category, similarity_settings) -> None:
+        """GOOD — --if-stale only refits after a catalog change"""
+        Product.objects.create(category=category, title='Coffee grinder', description='coffee', price=1, stock=1)
+        out = io.StringIO()
+        call_command('build_similarity_model', stdout=out)
+        assert "1 products" in out.getvalue()
+        call_command('build_similarity_model', '--if-stale', stdout=out)
+        assert "is up to date" in out.getvalue()
+        assert len([p for p in similarity_settings.SIMILARITY_DIR.iterdir() if p.is_dir()]) == 1
+
+    def test_similar_products_not_found(self, api_client, similarity_settings) -> None:
+        """BAD — unknown product"""
+        response = api_client.get("/api/products/99999/similar/")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+# ============================================================
+# STOCK RESERVATION TESTS
+# ============================================================
+
+@pytest.mark.django_db
+class TestStockReservations:
+    """Tests for cart stock holds."""
+
+    def add(self, client, product, quantity):
+        return client.post("/api/cart/add_item/", {"product_id": product.id, "quantity": quantity})
+
+    def test_add_and_update_hold_stock(self, authenticated_client, product) -> None:
+        """GOOD — adding holds stock, lowering the quantity releases it"""
+        assert self.add(authenticated_client, product, 3).status_code == status.HTTP_200_OK
+        assert self.add(authenticated_client, product, 2).status_code == status.HTTP_200_OK
+        product.refresh_from_db()
+        assert product.stock == 5
+
+        authenticated_client.patch("/api/cart/update_item/", {"product_id": product.id, "quantity": 1}, format='json')
+        product.refresh_from_db()
+        assert product.stock == 9
+
+    def test_remove_releases_stock(self, authenticated_client, product) -> None:
+        """GOOD — removing the item returns its hold"""
+        self.add(authenticated_client, product, 4)
+        authenticated_client.delete("/api/cart/remove_item/", {"product_id": product.id}, format='json')
+        product.refresh_from_db()
+        assert product.stock == 10
+
+    def test_sweeper_releases_expired_holds(self, authenticated_client, product, user) -> None:
+        """GOOD — expired holds are released once, fresh ones are kept"""
+        self.add(authenticated_client, product, 4)
+        CartItem.objects.filter(cart__user=user).update(reserved_until=datetime(2000, 1, 1, tzinfo=dt_timezone.utc))
+
+        assert release_expired_reservations(batch_size=1) == 1
+        assert release_expired_reservations() == 0
+        product.refresh_from_db()
+        assert product.stock == 10
+
+        # The item is kept; updating it re-reserves the full quantity.
+        authenticated_client.patch("/api/cart/update_item/", {"product_id": product.id, "quantity": 4}, format='json')
+        product.refresh_from_db()
+        assert product.stock == 6
+
+    def test_remove_racing_sweeper_releases_once(self, authenticated_client, product, user, monkeypatch) -> None:
+        """BAD — a sweep between reading and deleting the item must not credit stock twice"""
+        self.add(authenticated_client, product, 4)
+        CartItem.objects.filter(cart__user=user).update(reserved_until=datetime(2000, 1, 1, tzinfo=dt_timezone.utc))
+
+        release_hold = signals.release_hold
+
+        def sweep_first(item):
+            assert release_expired_reservations() == 1
+            release_hold(item)
+
+        monkeypatch.setattr(signals, "release_hold", sweep_first)
+        authenticated_client.delete("/api/cart/remove_item/", {"product_id": product.id}, format='json')
+        assert not CartItem.objects.filter(cart__user=user).exists()
+        product.refresh_from_db()
+        assert product.stock == 10
+
+    def test_deleting_released_item_credits_nothing(self, authenticated_client, product, user) -> None:
+        """BAD — deleting an item (here by cascade) whose hold was already released adds no stock"""
+        self.add(authenticated_client, product, 4)
+        item = CartItem.objects.get(cart__user=user)  # loaded while the hold is live
+        CartItem.objects.filter(id=item.id).update(reserved_until=datetime(2000, 1, 1, tzinfo=dt_timezone.utc))
+        release_expired_reservations()
+
+        item.delete()
+        self.add(authenticated_client, product, 2)
+        Cart.objects.filter(user=user).delete()
+        product.refresh_from_db()
+        assert product.stock == 10
+
+    def test_checkout_consumes_holds(self, authenticated_client, product, user) -> None:
+        """GOOD — ordering turns held units into sales; a later sweep returns nothing"""
+        self.add(authenticated_client, product, 4)
+        response = authenticated_client.post("/api/orders/", {"total_price": "4000.00"}, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        assert [(i.product_id, i.quantity) for i in OrderItem.objects.filter(order_id=response.data["id"])] == [(product.id, 4)]
+        assert not CartItem.objects.filter(cart__user=user).exists()
+
+        CartItem.objects.update(reserved_until=datetime(2000, 1, 1, tzinfo=dt_timezone.utc))
+        assert release_expired_reservations() == 0
+        product.refresh_from_db()
+        assert product.stock == 6
+
+    def test_checkout_after_hold_expired(self, authenticated_client, product, user) -> None:
+        """BAD — a released hold is taken again at checkout, or the order is refused"""
+        self.add(authenticated_client, product, 4)
+        CartItem.objects.update(reserved_until=datetime(2000, 1, 1, tzinfo=dt_timezone.utc))
+        release_expired_reservations()
+        Product.objects.filter(id=product.id).update(stock=3)
+
+        response = authenticated_client.post("/api/orders/", {"total_price": "4000.00"}, format='json')
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert not Order.objects.exists()
+        assert CartItem.objects.filter(cart__user=user).exists()
+        product.refresh_from_db()
+        assert product.stock == 3
+
+    def test_admin_out_of_stock_drops_holds(self, client, admin_user, authenticated_client, product) -> None:
+        """BAD — a product staff marked out of stock does not come back when holds expire"""
+        self.add(authenticated_client, product, 3)
+        client.force_login(admin_user)
+        client.post("/admin/core/product/", {"action": "mark_as_out_of_stock", "_selected_action": [product.id]})
+        assert not CartItem.objects.filter(reserved_until__isnull=False).exists()
+        CartItem.objects.filter(reserved_until__isnull=False).update(reserved_until=datetime(2000, 1, 1, tzinfo=dt_timezone.utc))
+        release_expired_reservations()
+        product.refresh_from_db()
+        assert product.stock == 0
+
+        client.post("/admin/core/product/", {"action": "mark_as_in_stock", "_selected_action": [product.id]})
+        product.refresh_from_db()
+        assert product.stock == 100
+
+    def test_admin_form_does_not_write_stock(self, client, admin_user, authenticated_client, product) -> None:
+        """BAD — saving a product form loaded before a hold does not overwrite the held stock"""
+        client.force_login(admin_user)
+        assert b'name="stock"' not in client.get(f"/admin/core/product/{product.id}/change/").content
+        self.add(authenticated_client, product, 3)
+        client.post(f"/admin/core/product/{product.id}/change/", {
+            "title": "iPhone 2", "description": product.description, "category": product.category_id,
+            "price": product.price, "stock": 10,
+        })
+        CartItem.objects.update(reserved_until=datetime(2000, 1, 1, tzinfo=dt_timezone.utc))
+        release_expired_reservations()
+        product.refresh_from_db()
+        assert (product.title, product.stock) == ("iPhone 2", 10)
+
+    def test_add_more_than_stock(self, authenticated_client, product, user) -> None:
+        """BAD — overselling is rejected and nothing is held"""
+        response = self.add(authenticated_client, product, 11)
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert not CartItem.objects.filter(cart__user=user).exists()
+        product.refresh_from_db()
+        assert product.stock == 10
+
+    def test_update_more_than_stock(self, authenticated_client, product) -> None:
+        """BAD — raising the quantity beyond stock is rejected"""
+        self.add(authenticated_client, product, 5)
+        response = authenticated_client.patch("/api/cart/update_item/", {"product_id": product.id, "quantity": 20}, format='json')
+        assert response.status_code == status.HTTP_409_CONFLICT
+        product.refresh_from_db()
+        assert product.stock == 5
+
+    def test_add_invalid_quantity(self, authenticated_client, product) -> None:
+        """BAD — non-positive quantity"""
+        assert self.add(authenticated_client, product, 0).status_code == status.HTTP_400_BAD_REQUEST
+        assert self.add(authenticated_client, product, "abc").status_code == status.HTTP_400_BAD_REQUEST
+
+
+# ============================================================
+# IDEMPOTENCY KEY TESTS
+# ============================================================
+
+@pytest.mark.django_db
+class TestIdempotencyKeys:
+    """Tests for Idempotency-Key handling on cart and order POSTs."""
+
+    def add(self, client, product, quantity=1, key='key-1'):
+        return client.post(
+            "/api/cart/add_item/",
+            {"product_id": product.id, "quantity": quantity},
+            HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def test_retry_is_replayed(self, authenticated_client, product, user) -> None:
+        """GOOD — a retried add is served from storage and not re-applied"""
+        first = self.add(authenticated_client, product, 2)
+        retry = self.add(authenticated_client, product, 2)
+
+        assert retry.status_code == first.status_code == status.HTTP_200_OK
+        assert retry.data == first.data
+        assert retry['Idempotent-Replayed'] == 'true'
+        assert CartItem.objects.get(cart__user=user).quantity == 2
+
+    def test_order_create_retry(self, authenticated_client, user) -> None:
+        """GOOD — retried order creation creates one order"""
+        for _ in range(2):
+            response = authenticated_client.post("/api/orders/", {"total_price": "10.00"}, HTTP_IDEMPOTENCY_KEY='order-1')
+            assert response.status_code == status.HTTP_201_CREATED
+        assert Order.objects.filter(user=user).count() == 1
+
+    def test_expired_keys_evicted(self, authenticated_client, product) -> None:
+        """GOOD — keys past their TTL are deleted in bulk"""
+        self.add(authenticated_client, product, key='a')
+        self.add(authenticated_client, product, key='b')
+        IdempotencyKey.objects.filter(key='a').update(expires_at=datetime(2000, 1, 1, tzinfo=dt_timezone.utc))
+
+        assert evict_expired_idempotency_keys(batch_size=1) == 1
+        assert list(IdempotencyKey.objects.values_list('key', flat=True)) == ['b']
+
+    def test_expired_key_is_free_before_eviction(self, authenticated_client, product, user) -> None:
+        """GOOD — a key past its TTL runs the request again, whatever its body"""
+        self.add(authenticated_client, product, 1)
+        IdempotencyKey.objects.update(expires_at=datetime(2000, 1, 1, tzinfo=dt_timezone.utc))
+
+        response = self.add(authenticated_client, product, 3)
+        assert response.status_code == status.HTTP_200_OK
+        assert 'Idempotent-Replayed' not in response
+        assert CartItem.objects.get(cart__user=user).quantity == 4
+        assert IdempotencyKey.objects.get().expires_at > timezone.now()
+
+    def test_key_reused_with_different_body(self, authenticated_client, product) -> None:
+        """BAD — same key, different request"""
+        self.add(authenticated_client, product, 1)
+        response = self.add(authenticated_client, product, 3)
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    def test_concurrent_duplicate_rejected(self, authenticated_client, product, user) -> None:
+        """BAD — a duplicate arriving while the first still runs gets 409"""
+        IdempotencyKey.objects.create(
+            user=user,
+            key='key-1',
+            request_hash=request_fingerprint('POST', '/api/cart/add_item/', {"product_id": [str(product.id)], "quantity": ["1"]}),
+            locked_at=timezone.now(),
+            expires_at=timezone.now() + timedelta(hours=1),
+        )
+        response = self.add(authenticated_client, product, 1)
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert not CartItem.objects.filter(cart__user=user).exists()
+
+
+# ============================================================
+# READ REPLICA ROUTING TESTS
+# ============================================================
+
+@pytest.fixture
+def replica_router(monkeypatch):
+    """Router with one pretend healthy replica and a clean write flag."""
+    monkeypatch.setattr(replica_health, 'healthy_replicas', lambda: ['replica'])
+    reset_write_tracking()
+    yield ReplicaRouter()
+    reset_write_tracking()
+
+
+@pytest.mark.django_db
+class TestReplicaRouting:
+    """Tests for the read-replica database router (reads inside transactions always use the primary)."""
+
+    @pytest.mark.django_db(transaction=True)
+    def test_reads_go_to_replica_only_when_opted_in(self, replica_router) -> None:
+        """GOOD — opted-in reads use the replica, others the primary"""
+        assert replica_router.db_for_read(Product) == 'default'
+        with replica_reads():
+            assert replica_router.db_for_read(Product) == 'replica'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_reads_after_write_stay_on_primary(self, replica_router) -> None:
+        """GOOD — read-your-writes within a request"""
+        with replica_reads():
+            assert replica_router.db_for_write(Product) == 'default'
+            assert replica_router.db_for_read(Product) == 'default'
+
+    def test_user_pinned_after_write(self, authenticated_client, product, user) -> None:
+        """GOOD — a write pins the user to the primary for a short window"""
+        assert not is_pinned_to_primary(user.pk)
+        authenticated_client.post("/api/cart/add_item/", {"product_id": product.id, "quantity": 1})
+        assert is_pinned_to_primary(user.pk)
+
+    def test_lagging_replica_is_skipped(self, settings, monkeypatch) -> None:
+        """BAD — replicas over the lag limit are unhealthy"""
+        settings.REPLICA_MAX_LAG = 5
+        assert replica_health.check('default')
+        monkeypatch.setattr(ReplicaHealth, 'lag_seconds', staticmethod(lambda alias: 30.0))
+        assert not replica_health.check('default')
+
+    def test_no_healthy_replica_falls_back_to_primary(self, settings) -> None:
+        """BAD — without replicas every read uses the primary"""
+        settings.REPLICA_DATABASES = []
+        replica_health.reset()
+        reset_write_tracking()
+        with replica_reads():
+            assert ReplicaRouter().db_for_read(Product) == 'default'
+
+
+# ============================================================
+# PRODUCTION DATABASE SETTINGS TESTS
+# ============================================================
+
+@pytest.fixture
+def production_settings(monkeypatch):
+    """Import settings.production with a minimal environment."""
+    monkeypatch.setenv("SECRET_KEY", "test")
+    return importlib.import_module("settings.production")
+
+
+class TestProductionDatabaseConfig:
+    """Tests for the environment-driven database profile."""
+
+    def test_postgres_persistent_connections(self, production_settings, monkeypatch) -> None:
+        """GOOD — persistent, health-checked connections with a statement timeout"""
+        monkeypatch.setenv("DATABASE_CONN_MAX_AGE", "300")
+        config = production_settings.database_config("postgres://u:p@db:5432/shop", 5000)
+
+        assert config["CONN_MAX_AGE"] == 300
+        assert config["CONN_HEALTH_CHECKS"] is True
+        assert config["OPTIONS"]["options"] == "-c statement_timeout=5000"
+        assert config["DISABLE_SERVER_SIDE_CURSORS"] is False
+
+    def test_postgres_pool(self, production_settings, monkeypatch) -> None:
+        """GOOD — pooling replaces persistent connections"""
+        pytest.importorskip("psycopg_pool")
+        monkeypatch.setenv("DATABASE_POOL", "1")
+        config = production_settings.database_config("postgres://u:p@db:5432/shop", 5000)
+
+        assert config["CONN_MAX_AGE"] == 0
+        assert config["OPTIONS"]["pool"]["max_size"] == 10
+
+    def test_pgbouncer_disables_server_side_cursors(self, production_settings, monkeypatch) -> None:
+        """BAD — transaction pooling cannot keep server-side cursors open"""
+        monkeypatch.setenv("DATABASE_PGBOUNCER_TRANSACTION_POOLING", "1")
+        config = production_settings.database_config("postgres://u:p@db:5432/shop", 5000)
+        assert config["DISABLE_SERVER_SIDE_CURSORS"] is True
+
+    def test_pool_without_psycopg3(self, production_settings, monkeypatch) -> None:
+        """BAD — pooling without psycopg 3 fails at settings import, not on the first query"""
+        monkeypatch.setenv("DATABASE_POOL", "1")
+        monkeypatch.setitem(sys.modules, "psycopg_pool", None)
+        with pytest.raises(ImproperlyConfigured, match="psycopg"):
+            production_settings.database_config("postgres://u:p@db:5432/shop", 5000)
+
+    def test_shared_cache_from_url(self, production_settings) -> None:
+        """GOOD — CACHE_URL configures a Redis cache shared by all processes"""
+        config = production_settings.cache_config("redis://cache:6379/1")
+        assert config["BACKEND"] == "django.core.cache.backends.redis.RedisCache"
+        assert config["LOCATION"] == "redis://cache:6379/1"
+        with pytest.raises(ImproperlyConfigured):
+            production_settings.cache_config("memcached://cache:11211")
+
+
+# ============================================================
+# SQLITE TUNING TESTS
+# ============================================================
+
+@pytest.mark.django_db
+class TestSqliteTuning:
+    """Tests for the SQLite connection-initialization layer."""
+
+    def test_pragmas_applied_to_new_connections(self) -> None:
+        """GOOD — busy timeout and cache size come from SQLITE_PRAGMAS"""
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA busy_timeout")
+            assert cursor.fetchone()[0] == 5000
+            cursor.execute("PRAGMA cache_size")
+            assert cursor.fetchone()[0] == -64000
+
+    def test_write_transactions_begin_immediate(self) -> None:
+        """GOOD — transactions take the write lock up front"""
+        assert connection.transaction_mode == "IMMEDIATE"
+
+
+# ============================================================
+# PRODUCT FILTER & FACET TESTS
+# ============================================================
+
+@pytest.fixture
+def storefront(db):
+    """Two categories with products across price ranges and stock levels."""
+    phones = Category.objects.create(name='Phones')
+    books = Category.objects.create(name='Books')
+    Product.objects.create(category=phones, title='iPhone', description='', price=Decimal('999.00'), stock=3)
+    Product.objects.create(category=phones, title='iPad', description='', price=Decimal('499.00'), stock=0)
+    Product.objects.create(category=books, title='Clean Code', description='', price=Decimal('35.00'), stock=9)
+    Product.objects.create(category=books, title='Refactoring', description='', price=Decimal('45.00'), stock=1)
+    return phones, books
+
+
+@pytest.mark.django_db
+class TestProductFacets:
+    """Tests for extended product filters and facet counts."""
+
+    def test_combined_filters(self, api_client, storefront) -> None:
+        """GOOD — categories, price range, stock and title prefix combine"""
+        phones, books = storefront
+        response = api_client.get(f"/api/products/?category={phones.id},{books.id}&min_price=40&in_stock=true")
+        assert sorted(p["title"] for p in response.data) == ["Refactoring", "iPhone"]
+
+        response = api_client.get("/api/products/?title_prefix=ip&max_price=500")
+        assert [p["title"] for p in response.data] == ["iPad"]
+
+    def test_facets_block(self, api_client, storefront) -> None:
+        """GOOD — facets describe the filtered result set"""
+        phones, books = storefront
+        response = api_client.get("/api/products/?facets=true&min_price=40")
+        assert response.status_code == status.HTTP_200_OK
+
+        facets = response.data["facets"]
+        assert len(response.data["results"]) == facets["total"] == 3
+        assert facets["in_stock"] == 2
+        assert facets["categories"] == {str(phones.id): 2, str(books.id): 1}
+        assert {b["min"]: b["count"] for b in facets["price"]}[250] == 1
+        assert {b["min"]: b["count"] for b in facets["price"]}[25] == 1
+
+    def test_facets_cached_per_normalised_filters(self, api_client, storefront, django_assert_num_queries) -> None:
+        """GOOD — reordered filter values reuse the cached facets"""
+        phones, books = storefront
+        api_client.get(f"/api/products/?facets=true&category={phones.id},{books.id}")
+        with django_assert_num_queries(1):  # the product list only
+            api_client.get(f"/api/products/?category={books.id},{phones.id}&facets=1")
+
+    def test_facet_queries_do_not_grow_with_categories(self, api_client, storefront, django_assert_num_queries) -> None:
+        """GOOD — category counts come from one GROUP BY, whatever the number of categories"""
+        for i in range(5):
+            Category.objects.create(name=f'Extra {i}')
+        with django_assert_num_queries(3):  # product list, category GROUP BY, other facets
+            response = api_client.get("/api/products/?facets=true")
+        assert sum(response.data["facets"]["categories"].values()) == 4
+
+    def test_facets_invalidated_on_catalog_change(self, api_client, storefront) -> None:
+        """GOOD — saving a product invalidates cached facets"""
+        phones, _ = storefront
+        api_client.get("/api/products/?facets=true")
+        Product.objects.create(category=phones, title='Pixel', description='', price=Decimal('599.00'), stock=2)
+        assert api_client.get("/api/products/?facets=true").data["facets"]["total"] == 5
+
+    def test_invalid_price_filter(self, api_client, storefront) -> None:
+        """BAD — non-numeric price"""
+        response = api_client.get("/api/products/?min_price=cheap")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+# ============================================================
+# SPARSE FIELDSET TESTS
+# ============================================================
+
+def selected_sql(queries) -> str:
+    """The SELECT statements of captured queries, joined."""
+    return "\n".join(q["sql"] for q in queries if q["sql"].startswith("SELECT"))
+
+
+@pytest.mark.django_db
+class TestSparseFieldsets:
+    """Tests for ?fields= / ?exclude= with column projection."""
+
+    def test_product_fields_narrow_sql(self, api_client, product) -> None:
+        """GOOD — only requested fields are serialized and selected"""
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.get("/api/products/?fields=id,title")
+        assert response.data == [{"id": product.id, "title": "iPhone"}]
+        assert '"description"' not in selected_sql(queries)
+
+    def test_order_nested_fields(self, authenticated_client, user, product) -> None:
+        """GOOD — dotted paths trim nested items and products"""
+        order = place_order(user, [product])
+        with CaptureQueriesContext(connection) as queries:
+            response = authenticated_client.get("/api/orders/?fields=id,items.quantity,items.product.title")
+        assert response.data == [{"id": order.id, "items": [{"quantity": 1, "product": {"title": "iPhone"}}]}]
+        assert '"description"' not in selected_sql(queries)
+
+    def test_cart_exclude_description(self, authenticated_client, product) -> None:
+        """GOOD — excluded nested columns are deferred"""
+        authenticated_client.post("/api/cart/add_item/", {"product_id": product.id, "quantity": 1})
+        with CaptureQueriesContext(connection) as queries:
+            response = authenticated_client.get("/api/cart/current/?exclude=items.product.description")
+        assert "description" not in response.data["items"][0]["product"]
+        assert response.data["items"][0]["product"]["title"] == "iPhone"
+        assert '"description"' not in selected_sql(queries)
+
+    def test_excluded_relation_not_prefetched(self, authenticated_client, user, product, django_assert_num_queries) -> None:
+        """GOOD — excluding items skips their prefetch queries"""
+        place_order(user, [product])
+        with django_assert_num_queries(2):  # user lookup for JWT + orders
+            response = authenticated_client.get("/api/orders/?exclude=items")
+        assert "items" not in response.data[0]
+
+    def test_product_detail_without_id(self, api_client, product) -> None:
+        """GOOD — the detail view does not need "id" in the trimmed payload"""
+        response = api_client.get(f"/api/products/{product.id}/?fields=title")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {"title": "iPhone"}
+
+        response = api_client.get(f"/api/products/{product.id}/?exclude=id")
+        assert response.status_code == status.HTTP_200_OK
+        assert "id" not in response.data and response.data["title"] == "iPhone"
+
+    def test_product_detail_recommendations_field(self, api_client, product) -> None:
+        """GOOD — frequently_bought_together is selected and excluded like a serializer field"""
+        response = api_client.get(f"/api/products/{product.id}/?fields=title,frequently_bought_together")
+        assert response.data == {"title": "iPhone", "frequently_bought_together": []}
+
+        response = api_client.get(f"/api/products/{product.id}/?exclude=frequently_bought_together")
+        assert "frequently_bought_together" not in response.data
+        assert response.data["title"] == "iPhone"
+
+    def test_empty_fields_ignored(self, api_client, product) -> None:
+        """BAD — an empty ?fields= selects everything, not nothing"""
+        assert api_client.get("/api/products/?fields=").data == api_client.get("/api/products/").data
+        assert api_client.get(f"/api/products/{product.id}/?fields=,").data["title"] == "iPhone"
+
+    def test_unknown_fields_ignored(self, api_client, product) -> None:
+        """BAD — unknown field names select nothing extra"""
+        response = api_client.get("/api/products/?fields=id,nonexistent")
+        assert response.data == [{"id": product.id}]
+
+
+# ============================================================
+# CATALOG SNAPSHOT TESTS
+# ============================================================
+
+@pytest.mark.django_db
+class TestCatalogSnapshot:
+    """Tests for the prebuilt catalog snapshot files."""
+
+    def test_unfiltered_list_served_without_queries(self, api_client, storefront, django_assert_num_queries) -> None:
+        """GOOD — unfiltered listings come from the snapshot and match the API output"""
+        build_catalog_snapshot()
+        with django_assert_num_queries(0):
+            products = api_client.get("/api/products/")
+            categories = api_client.get("/api/categories/")
+
+        assert json.loads(products.getvalue()) == api_client.get("/api/products/?ordering=-id").json()
+        assert json.loads(categories.getvalue()) == api_client.get("/api/categories/?page=1").json()
+        assert products["Cache-Control"] == "public, max-age=60"
+
+    def test_filtered_list_uses_database(self, api_client, storefront) -> None:
+        """GOOD — any query parameter falls back to the database"""
+        build_catalog_snapshot()
+        response = api_client.get("/api/products/?title_prefix=ip")
+        assert sorted(p["title"] for p in response.data) == ["iPad", "iPhone"]
+
+    def test_gzip_and_etag(self, api_client, storefront) -> None:
+        """GOOD — precompressed variant is negotiated and revalidates with 304"""
+        build_catalog_snapshot()
+        response = api_client.get("/api/catalog/", HTTP_ACCEPT_ENCODING="gzip, deflate")
+        assert response["Content-Encoding"] == "gzip"
+        assert response["Vary"] == "Accept-Encoding"
+        document = json.loads(gzip.decompress(response.getvalue()))
+        assert {p["title"] for p in document["products"]} == {"iPhone", "iPad", "Clean Code", "Refactoring"}
+
+        cached = api_client.get("/api/catalog/", HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=response["ETag"])
+        assert cached.status_code == 304
+
+        plain = api_client.get("/api/catalog/", HTTP_IF_NONE_MATCH=response["ETag"])
+        assert plain.status_code == 200
+        assert "Content-Encoding" not in plain
+
+    def test_versioned_url_is_immutable(self, api_client, storefront) -> None:
+        """GOOD — content-addressed versions are cached forever; unchanged content keeps its version"""
+        first = build_catalog_snapshot()
+        assert build_catalog_snapshot() == {**first, "published": False}
+
+        response = api_client.get(f"/api/catalog/{first['version']}/")
+        assert response.status_code == 200
+        assert "immutable" in response["Cache-Control"]
+
+    def test_rebuild_only_when_stale(self, storefront) -> None:
+        """GOOD — scheduled rebuilds skip rendering until the catalog changes"""
+        first = build_catalog_snapshot()
+        assert build_catalog_snapshot(force=False)["bytes"] == 0
+
+        Product.objects.filter(title="iPad").first().save()  # bumps the catalog version
+        second = build_catalog_snapshot(force=False)
+        assert second["bytes"] > 0
+        assert second["version"] == first["version"]
+
+    def test_missing_snapshot(self, api_client, storefront) -> None:
+        """BAD — without a snapshot the catalog endpoint is unavailable and listings use the database"""
+        assert api_client.get("/api/catalog/").status_code == 503
+        assert api_client.get("/api/catalog/deadbeef/").status_code == 404
+        assert len(api_client.get("/api/products/").data) == 4
+
+
+# ============================================================
+# SIDELOADED PRODUCTS TESTS
+# ============================================================
+
+@pytest.mark.django_db
+class TestSideloadedProducts:
+    """Tests for the ?sideload=products normalized format."""
+
+    def test_orders_share_product_map(self, authenticated_client, user, catalog, django_assert_num_queries) -> None:
+        """GOOD — repeated products are serialized once and loaded with one query"""
+        place_order(user, catalog[:2])
+        place_order(user, catalog[:2])
+        with django_assert_num_queries(4):  # user lookup for JWT + orders + items + products
+            response = authenticated_client.get("/api/orders/?sideload=products")
+
+        assert len(response.data["results"]) == 2
+        assert {item["product"] for order in response.data["results"] for item in order["items"]} == {
+            catalog[0].id, catalog[1].id,
+        }
+        assert set(response.data["products"]) == {str(catalog[0].id), str(catalog[1].id)}
+        assert response.data["products"][str(catalog[0].id)]["title"] == "P0"
+
+    def test_cart_sideload_with_sparse_products(self, authenticated_client, product) -> None:
+        """GOOD — products.* paths trim the sideloaded map"""
+        authenticated_client.post("/api/cart/add_item/", {"product_id": product.id, "quantity": 2})
+        response = authenticated_client.get("/api/cart/current/?sideload=products&fields=items,products.title")
+        assert response.data["items"][0]["product"] == product.id
+        assert response.data["products"] == {str(product.id): {"title": "iPhone"}}
+
+    def test_default_format_unchanged(self, authenticated_client, user, product) -> None:
+        """BAD — without the opt-in, items still embed full products"""
+        place_order(user, [product])
+        response = authenticated_client.get("/api/orders/")
+        assert response.data[0]["items"][0]["product"]["title"] == "iPhone"
+
+        empty = authenticated_client.get("/api/cart/current/?sideload=products")
+        assert empty.data["products"] == {}
+
+
+# ============================================================
+# ORDER SUMMARY & DETAIL TESTS
+# ============================================================
+
+def follow_pages(client, url) -> list:
+    """Collect result ids across every keyset page starting at ``url``."""
+    ids = []
+    while url:
+        response = client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        ids += [order["id"] for order in response.data["results"]]
+        url = response.data["next"]
+    return ids
+
+
+@pytest.mark.django_db
+class TestOrderSummary:
+    """Tests for the compact order list and the order detail endpoint."""
+
+    def test_summary_fields(self, authenticated_client, user, catalog, django_assert_num_queries) -> None:
+        """GOOD — counts and payment status come from annotations, without items"""
+        order = place_order(user, catalog[:3])
+        Payment.objects.create(order=order, amount=Decimal('30.00'), method='card', status='completed')
+        place_order(user, [])
+        with django_assert_num_queries(2):  # user lookup for JWT + orders
+            response = authenticated_client.get("/api/orders/?summary=true")
+        assert response.data["next"] is None
+        assert response.data["results"][1] == {
+            "id": order.id,
+            "created_at": response.data["results"][1]["created_at"],
+            "total_price": "0.00",
+            "item_count": 3,
+            "payment_status": "completed",
+        }
+        assert response.data["results"][0]["item_count"] == 0
+        assert response.data["results"][0]["payment_status"] is None
+
+    def test_keyset_pages_with_ties(self, authenticated_client, user) -> None:
+        """GOOD — pages neither skip nor repeat orders sharing a created_at"""
+        orders = [place_order(user, []) for _ in range(5)]
+        Order.objects.filter(pk__in=[o.pk for o in orders[1:4]]).update(created_at=orders[0].created_at)
+        for price, order in zip([5, 1, 3, 3, 2], orders):
+            Order.objects.filter(pk=order.pk).update(total_price=price)
+
+        newest_first = follow_pages(authenticated_client, "/api/orders/?summary=true&page_size=2")
+        expected = list(Order.objects.order_by("-created_at", "-id").values_list("id", flat=True))
+        assert newest_first == expected
+
+        by_price = follow_pages(authenticated_client, "/api/orders/?summary=true&page_size=2&ordering=total_price")
+        assert by_price == [orders[1].id, orders[4].id, orders[2].id, orders[3].id, orders[0].id]
+
+    def test_detail_loads_items(self, authenticated_client, user, catalog) -> None:
+        """GOOD — the detail endpoint returns the order with its items"""
+        order = place_order(user, catalog[:2])
+        response = authenticated_client.get(f"/api/orders/{order.id}/")
+        assert [item["product"]["title"] for item in response.json()["items"]] == ["P0", "P1"]
+
+    def test_invalid_cursor_and_foreign_order(self, authenticated_client, admin_user) -> None:
+        """BAD — tampered cursors and other users' orders are not found"""
+        response = authenticated_client.get("/api/orders/?summary=true&cursor=bm9wZQ")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+        foreign = place_order(admin_user, [])
+        response = authenticated_client.get(f"/api/orders/{foreign.id}/")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+# ============================================================
+# CACHED ORDER DETAIL TESTS
+# ============================================================
+
+@pytest.mark.django_db
+class TestOrderDetailCache:
+    """Tests for the cached, revalidatable order detail payload."""
+
+    def test_cached_payload(self, authenticated_client, user, catalog, django_assert_num_queries) -> None:
+        """GOOD — repeat views cost only the ownership query"""
+        order = place_order(user, catalog[:2])
+        first = authenticated_client.get(f"/api/orders/{order.id}/")
+        assert first["Cache-Control"] == "private, max-age=60"
+        assert first.json()["payment_status"] is None
+
+        with django_assert_num_queries(2):  # user lookup for JWT + ownership/version
+            second = authenticated_client.get(f"/api/orders/{order.id}/")
+        assert second.content == first.content
+        assert second["ETag"] == first["ETag"]
+
+    def test_not_modified(self, authenticated_client, user, product) -> None:
+        """GOOD — a matching If-None-Match returns 304 without a body"""
+        order = place_order(user, [product])
+        etag = authenticated_client.get(f"/api/orders/{order.id}/")["ETag"]
+        response = authenticated_client.get(f"/api/orders/{order.id}/", HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+        assert response.content == b""
+
+    def test_payment_status_changes_version(self, authenticated_client, user, product) -> None:
+        """GOOD — a payment status update yields a new ETag and payload"""
+        order = place_order(user, [product])
+        before = authenticated_client.get(f"/api/orders/{order.id}/")
+        Payment.objects.create(order=order, amount=Decimal('1000.00'), method='card', status='completed')
+        after = authenticated_client.get(f"/api/orders/{order.id}/", HTTP_IF_NONE_MATCH=before["ETag"])
+        assert after.status_code == 200
+        assert after["ETag"] != before["ETag"]
+        assert after.json()["payment_status"] == "completed"
+
+    def test_product_changes_version(self, authenticated_client, user, product) -> None:
+        """GOOD — the embedded product is not served stale after a catalog write"""
+        order = place_order(user, [product])
+        before = authenticated_client.get(f"/api/orders/{order.id}/")
+        product.title = "iPhone 2"
+        product.save()
+        after = authenticated_client.get(f"/api/orders/{order.id}/", HTTP_IF_NONE_MATCH=before["ETag"])
+        assert after.status_code == 200
+        assert after.json()["items"][0]["product"]["title"] == "iPhone 2"
+
+    def test_entries_expire(self, authenticated_client, user, product, settings, monkeypatch) -> None:
+        """BAD — no variant, however arbitrary, is cached without expiry"""
+        settings.ORDER_DETAIL_CACHE_TTL = 60
+        timeouts = []
+        monkeypatch.setattr(cache, "set", lambda key, value, timeout: timeouts.append(timeout))
+        order = place_order(user, [product])
+        authenticated_client.get(f"/api/orders/{order.id}/?fields=id&exclude=items")
+        assert timeouts == [60]
+
+    def test_representations_cached_separately(self, authenticated_client, user, product) -> None:
+        """GOOD — sparse and sideloaded variants have their own cache entries and ETags"""
+        order = place_order(user, [product])
+        full = authenticated_client.get(f"/api/orders/{order.id}/")
+        sparse = authenticated_client.get(f"/api/orders/{order.id}/?fields=id,payment_status")
+        assert sparse.json() == {"id": order.id, "payment_status": None}
+        assert sparse["ETag"] != full["ETag"]
+
+        sideloaded = authenticated_client.get(f"/api/orders/{order.id}/?sideload=products").json()
+        assert sideloaded["items"][0]["product"] == product.id
+        assert sideloaded["products"][str(product.id)]["title"] == "iPhone"
+
+
+# ============================================================
+# PAYMENT RECONCILIATION TESTS
+# ============================================================
+
+@pytest.fixture
+def payments(user):
+    """Three orders: two with pending payments, one unpaid."""
+    orders = [Order.objects.create(user=user, total_price=Decimal('10.00')) for _ in range(3)]
+    for order in orders[:2]:
+        Payment.objects.create(order=order, amount=Decimal('10.00'), method='card', status='pending')
+    return orders
+
+
+@pytest.mark.django_db
+class TestPaymentReconciliation:
+    """Tests for settlement file reconciliation."""
+
+    def test_csv_reconciliation(self, payments) -> None:
+        """GOOD — matching lines update statuses; the rest are reported, not applied"""
+        paid, mismatched, unpaid = payments
+        settlement = io.StringIO(
+            "order_id,amount,status\n"
+            f"{paid.id},10.0,completed\n"
+            f"{mismatched.id},9.99,completed\n"
+            f"{unpaid.id},10.00,completed\n"
+            "999999,10.00,failed\n"
+            f"{paid.id},10.00,failed\n"
+            "oops,1,completed\n"
+        )
+        reported = []
+        stats = reconcile_settlement(settlement, "csv", on_mismatch=reported.append, chunk_size=10)
+
+        assert Payment.objects.get(order=paid).status == "completed"
+        assert Payment.objects.get(order=mismatched).status == "pending"
+        assert {k: stats[k] for k in ("lines", "updated", "amount_mismatch", "no_payment", "unknown_order")} == {
+            "lines": 6, "updated": 1, "amount_mismatch": 1, "no_payment": 1, "unknown_order": 1,
+        }
+        assert stats["duplicate"] == stats["invalid"] == 1
+        assert {"kind": "amount_mismatch", "line": 3, "order_id": mismatched.id,
+                "expected_amount": Decimal("10.00"), "settled_amount": Decimal("9.99")} in reported
+
+    def test_ndjson_in_chunks(self, payments, django_assert_num_queries) -> None:
+        """GOOD — one join query per chunk and one batched update per chunk with changes"""
+        lines = [json.dumps({"order_id": order.id, "amount": "10.00", "status": "failed"}) for order in payments[:2]]
+        # Highest order id + 2 chunks x (join + SAVEPOINT + UPDATE + RELEASE)
+        with django_assert_num_queries(1 + 2 * 4):
+            stats = reconcile_settlement(iter(line + "\n" for line in lines), "ndjson", chunk_size=1)
+        assert stats["updated"] == 2
+        assert set(Payment.objects.values_list("status", flat=True)) == {"failed"}
+
+    def test_duplicates_across_chunks(self, payments) -> None:
+        """BAD — a later line for an order seen in an earlier chunk is not applied"""
+        paid = payments[0]
+        settlement = io.StringIO(f"order_id,amount,status\n{paid.id},10.00,completed\n{paid.id},10.00,failed\n")
+        stats = reconcile_settlement(settlement, "csv", chunk_size=1)
+        assert (stats["updated"], stats["duplicate"]) == (1, 1)
+        assert Payment.objects.get(order=paid).status == "completed"
+
+    def test_duplicates_tracked_in_a_bitmap(self, payments) -> None:
+        """BAD — duplicates are caught without keeping every id; ids of no order stay unknown"""
+        paid = payments[0]
+        settlement = io.StringIO(
+            "order_id,amount,status\n"
+            + "".join(f"{order.id},10.00,completed\n" for order in payments)
+            + f"{paid.id},10.00,failed\n"
+            + "999999,10.00,failed\n999999,10.00,failed\n-1,10.00,failed\n"
+        )
+        stats = reconcile_settlement(settlement, "csv", chunk_size=2)
+        assert (stats["duplicate"], stats["unknown_order"]) == (1, 3)
+        assert Payment.objects.get(order=paid).status == "completed"
+
+    def test_concurrent_status_change_kept(self, payments, monkeypatch) -> None:
+        """BAD — a status changed after the chunk was read is not overwritten"""
+        paid = payments[0]
+        atomic = transaction.atomic
+
+        def webhook_first(*args, **kwargs):
+            Payment.objects.filter(order=paid).update(status="failed")
+            return atomic(*args, **kwargs)
+
+        monkeypatch.setattr(transaction, "atomic", webhook_first)
+        reported = []
+        stats = reconcile_settlement(
+            io.StringIO(f"order_id,amount,status\n{paid.id},10.00,completed\n"), "csv", on_mismatch=reported.append
+        )
+        assert (stats["updated"], stats["status_changed"]) == (0, 1)
+        assert reported == [{"kind": "status_changed", "line": 2, "order_id": paid.id}]
+        assert Payment.objects.get(order=paid).status == "failed"
+
+    def test_dry_run_and_command(self, payments, tmp_path) -> None:
+        """GOOD — the command writes a mismatch report; dry runs change nothing"""
+        path = tmp_path / "settlement.csv"
+        path.write_text(f"order_id,amount,status\n{payments[0].id},10.00,completed\n{payments[1].id},1.00,failed\n")
+        report = tmp_path / "report.csv"
+
+        call_command("reconcile_payments", str(path), "--dry-run", "--report", str(report), stdout=io.StringIO())
+        assert set(Payment.objects.values_list("status", flat=True)) == {"pending"}
+        assert "amount_mismatch" in report.read_text()
+
+        call_command("reconcile_payments", str(path), stdout=io.StringIO())
+        assert Payment.objects.get(order=payments[0]).status == "completed"
+
+    def test_admin_upload(self, client, admin_user, payments) -> None:
+        """GOOD — staff can upload a settlement file from the payment changelist"""
+        client.force_login(admin_user)
+        upload = SimpleUploadedFile("settlement.csv", f"order_id,amount,status\n{payments[0].id},10,completed\n".encode())
+        assert client.get("/admin/core/payment/reconcile/").status_code == 200
+        response = client.post("/admin/core/payment/reconcile/", {"settlement_file": upload})
+        assert response.status_code == 302
+        assert Payment.objects.get(order=payments[0]).status == "completed"
+
+    def test_admin_upload_not_utf8(self, client, admin_user, payments) -> None:
+        """BAD — a file that is not UTF-8 is rejected on the form before anything is applied"""
+        client.force_login(admin_user)
+        body = f"order_id,amount,status\n{payments[0].id},10,completed\n{payments[1].id},10,caf\xe9\n".encode("latin-1")
+        response = client.post("/admin/core/payment/reconcile/", {"settlement_file": SimpleUploadedFile("s.csv", body)})
+        assert response.status_code == 200
+        assert b"not valid UTF-8" in response.content
+        assert Payment.objects.get(order=payments[0]).status == "pending"
+
+    def test_command_report_errors(self, payments, tmp_path) -> None:
+        """BAD — an unwritable report or a non-UTF-8 file is a command error"""
+        path = tmp_path / "settlement.csv"
+        path.write_bytes(b"order_id,amount,status\n1,10,caf\xe9\n")
+        with pytest.raises(CommandError, match="No such file"):
+            call_command("reconcile_payments", str(path), "--report", str(tmp_path / "missing" / "r.csv"))
+        with pytest.raises(CommandError, match="not valid UTF-8"):
+            call_command("reconcile_payments", str(path), "--report", str(tmp_path / "r.csv"))
+
+    def test_unsupported_file_type(self, client, admin_user) -> None:
+        """BAD — files that are neither CSV nor NDJSON are rejected"""
+        client.force_login(admin_user)
+        response = client.post("/admin/core/payment/reconcile/", {"settlement_file": SimpleUploadedFile("a.xlsx", b"x")})
+        assert response.status_code == 200
+        assert b"Unsupported settlement file type" in response.content
+
+
+# ============================================================
+# WRITE-BEHIND CART TESTS
+# ============================================================
+
+@pytest.fixture
+def write_behind(settings):
+    settings.CART_STORAGE = "cache"
+    settings.CART_WRITE_BEHIND_WINDOW = 60
+
+
+def write_statements(queries) -> list:
+    return [q["sql"] for q in queries.captured_queries if q["sql"].split()[0] in ("INSERT", "UPDATE", "DELETE")]
+
+
+@pytest.mark.django_db
+class TestWriteBehindCart:
+    """Tests for CART_STORAGE = "cache"."""
+
+    def add(self, client, product, quantity):
+        return client.post("/api/cart/add_item/", {"product_id": product.id, "quantity": quantity})
+
+    def test_changes_stay_in_cache_until_flushed(self, write_behind, authenticated_client, user, product) -> None:
+        """GOOD — cart changes write nothing; the flush writes them in one go"""
+        self.add(authenticated_client, product, 1)
+        with CaptureQueriesContext(connection) as queries:
+            self.add(authenticated_client, product, 2)
+            authenticated_client.patch("/api/cart/update_item/", {"product_id": product.id, "quantity": 4}, format='json')
+        assert write_statements(queries) == []
+        assert not CartItem.objects.filter(cart__user=user).exists()
+
+        cart = authenticated_client.get("/api/cart/current/").json()
+        assert [(item["product"]["id"], item["quantity"]) for item in cart["items"]] == [(product.id, 4)]
+
+        assert flush_carts() == 1
+        assert CartItem.objects.get(cart__user=user).quantity == 4
+        assert flush_carts() == 0
+        product.refresh_from_db()
+        assert product.stock == 6  # reserved when written back
+
+    def test_flush_reserves_what_is_left(self, write_behind, authenticated_client, user, product) -> None:
+        """BAD — an item whose stock ran out before the flush is written without a hold"""
+        self.add(authenticated_client, product, 4)
+        Product.objects.filter(id=product.id).update(stock=3)
+        flush_carts()
+        item = CartItem.objects.get(cart__user=user)
+        assert (item.quantity, item.reserved_until) == (4, None)
+        product.refresh_from_db()
+        assert product.stock == 3
+
+        authenticated_client.patch("/api/cart/update_item/", {"product_id": product.id, "quantity": 2}, format='json')
+        flush_carts()
+        assert CartItem.objects.get(cart__user=user).reserved_until is not None
+        product.refresh_from_db()
+        assert product.stock == 1
+
+    def test_locked_cart_is_not_flushed(self, write_behind, authenticated_client, user, product) -> None:
+        """BAD — the scheduler skips a cart a checkout is writing and flushes it on the next run"""
+        self.add(authenticated_client, product, 2)
+        cache.add(LOCK_KEY.format(user_id=user.id), "checkout", timeout=5)
+        assert flush_carts() == 0
+        assert not CartItem.objects.filter(cart__user=user).exists()
+
+        cache.delete(LOCK_KEY.format(user_id=user.id))
+        assert flush_carts() == 1
+        assert CartItem.objects.get(cart__user=user).quantity == 2
+
+    def test_checkout_waits_for_cart_lock(self, write_behind, authenticated_client, user, product) -> None:
+        """BAD — checkout answers 409 while the cart stays locked"""
+        self.add(authenticated_client, product, 2)
+        cache.add(LOCK_KEY.format(user_id=user.id), "flush", timeout=5)
+        response = authenticated_client.post("/api/orders/", {"total_price": "2000.00"}, format='json')
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert not Order.objects.exists()
+
+    def test_remove_is_written_back(self, write_behind, authenticated_client, user, product) -> None:
+        """GOOD — removed items are deleted by the flush"""
+        self.add(authenticated_client, product, 2)
+        flush_carts()
+        response = authenticated_client.delete("/api/cart/remove_item/", {"product_id": product.id}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        flush_carts()
+        assert not CartItem.objects.filter(cart__user=user).exists()
+
+    def test_changes_during_flush_stay_dirty(self, write_behind, authenticated_client, user, product) -> None:
+        """GOOD — a change made while a flush was writing is queued again"""
+        self.add(authenticated_client, product, 1)
+        written = dict(cache.get(CART_KEY.format(user_id=user.id)))
+        self.add(authenticated_client, product, 2)
+        _mark_clean(user.id, written, {})
+        assert cache.get(CART_KEY.format(user_id=user.id))["dirty_at"] is not None
+
+        flush_carts()
+        assert CartItem.objects.get(cart__user=user).quantity == 3
+
+    def test_checkout_flushes(self, write_behind, authenticated_client, user, product, django_capture_on_commit_callbacks) -> None:
+        """GOOD — creating an order writes the cart back first and orders it"""
+        self.add(authenticated_client, product, 2)
+        with django_capture_on_commit_callbacks(execute=True):
+            response = authenticated_client.post("/api/orders/", {"total_price": "2000.00"}, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        assert OrderItem.objects.get(order_id=response.data["id"]).quantity == 2
+        assert not CartItem.objects.filter(cart__user=user).exists()
+        assert authenticated_client.get("/api/cart/current/").json()["items"] == []
+        product.refresh_from_db()
+        assert product.stock == 8
+
+    def test_stale_cart_flushes_inline(self, write_behind, settings, authenticated_client, user, product) -> None:
+        """GOOD — a cart dirty for longer than the window is flushed by the next change"""
+        settings.CART_WRITE_BEHIND_WINDOW = 0
+        self.add(authenticated_client, product, 1)
+        self.add(authenticated_client, product, 1)
+        assert CartItem.objects.get(cart__user=user).quantity == 2
+
+    def test_insufficient_stock(self, write_behind, authenticated_client, product) -> None:
+        """BAD — quantities beyond stock are rejected"""
+        assert self.add(authenticated_client, product, 11).status_code == status.HTTP_409_CONFLICT
+        response = authenticated_client.patch("/api/cart/update_item/", {"product_id": product.id, "quantity": 20}, format='json')
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_process_local_cache_rejected(self, write_behind, settings, tmp_path) -> None:
+        """BAD — write-behind carts on LocMem fail the system checks"""
+        settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+        assert [error.id for error in check_cart_storage(None)] == ["core.E001"]
+
+        settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": str(tmp_path)}}
+        assert check_cart_storage(None) == []
+
+
+# ============================================================
+# ANONYMOUS CART TESTS
+# ============================================================
+
+@pytest.mark.django_db
+class TestAnonymousCart:
+    """Tests for signed-token carts of shoppers who are not logged in."""
+
+    def add(self, client, product, quantity=1):
+        return client.post("/api/cart/anonymous/add_item/", {"product_id": product.id, "quantity": quantity})
+
+    def test_cart_lives_in_token(self, api_client, catalog, django_assert_num_queries) -> None:
+        """GOOD — no rows are written; the cart is priced with one query"""
+        self.add(api_client, catalog[0], 2)
+        self.add(api_client, catalog[1])
+        assert not CartItem.objects.exists() and not Cart.objects.exists()
+
+        with django_assert_num_queries(1):
+            response = api_client.get("/api/cart/anonymous/")
+        data = response.json()
+        assert [(item["product"]["id"], item["quantity"]) for item in data["items"]] == [
+            (catalog[0].id, 2), (catalog[1].id, 1),
+        ]
+        assert Decimal(data["total"]) == catalog[0].price * 2 + catalog[1].price
+
+        # The token also works as a header, without cookies.
+        header_client = APIClient()
+        items = header_client.get("/api/cart/anonymous/", HTTP_X_CART_TOKEN=data["token"]).json()["items"]
+        assert len(items) == 2
+
+    def test_update_and_remove(self, api_client, product) -> None:
+        """GOOD — quantities can be changed and items removed"""
+        self.add(api_client, product)
+        response = api_client.patch("/api/cart/anonymous/update_item/", {"product_id": product.id, "quantity": 5}, format='json')
+        assert response.json()["items"][0]["quantity"] == 5
+        response = api_client.delete("/api/cart/anonymous/remove_item/", {"product_id": product.id}, format='json')
+        assert response.json()["items"] == []
+
+    def test_login_merges_cart(self, api_client, user, catalog) -> None:
+        """GOOD — logging in merges the anonymous cart into the user's cart"""
+        cart = Cart.objects.create(user=user)
+        CartItem.objects.create(cart=cart, product=catalog[0], quantity=1)
+        self.add(api_client, catalog[0], 2)
+        self.add(api_client, catalog[1], 3)
+
+        response = api_client.post("/api/auth/login/", {"email": "test@example.com", "password": "testpass123"})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.cookies["cart"].value == ""
+        assert dict(CartItem.objects.filter(cart=cart).values_list("product_id", "quantity")) == {
+            catalog[0].id: 3, catalog[1].id: 3,
+        }
+
+    def test_tampered_token(self, api_client, product) -> None:
+        """BAD — a token that was modified is treated as an empty cart"""
+        token = self.add(api_client, product).json()["token"]
+        api_client.cookies["cart"] = token[:-2] + "xx"
+        assert api_client.get("/api/cart/anonymous/").json()["items"] == []
+
+    def test_insufficient_stock(self, api_client, product) -> None:
+        """BAD — quantities beyond stock are rejected"""
+        assert self.add(api_client, product, 11).status_code == status.HTTP_409_CONFLICT
+
+    def test_unknown_product(self, api_client) -> None:
+        """BAD — product not found"""
+        response = api_client.post("/api/cart/anonymous/add_item/", {"product_id": 99999})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+# ============================================================
+# BACKGROUND JOB TESTS
+# ============================================================
+
+@pytest.fixture
+def handlers(monkeypatch):
+    """Register test job handlers: "collect" (batched) records payloads, "boom" raises."""
+    calls = []
+
+    def boom(payload):
+        raise RuntimeError("boom")
+
+    monkeypatch.setitem(HANDLERS, "collect", (calls.append, True))
+    monkeypatch.setitem(HANDLERS, "boom", (boom, False))
+    return calls
+
+
+@pytest.mark.django_db
+class TestBackgroundJobs:
+    """Tests for the database-backed job queue."""
+
+    def test_order_creation_queues_post_order_work(self, authenticated_client, user, product, caplog) -> None:
+        """GOOD — creating an order queues order_placed; a worker runs and deletes it"""
+        response = authenticated_client.post("/api/orders/", {"total_price": "1000.00"}, format='json')
+        job = Job.objects.get()
+        assert (job.name, job.payload) == ("order_placed", {"order_id": response.data["id"]})
+
+        OrderItem.objects.create(order_id=job.payload["order_id"], product=product, quantity=1, price=product.price)
+        Product.objects.filter(id=product.id).update(stock=2)
+        assert run_jobs()["succeeded"] == 1
+        assert not Job.objects.exists()
+        assert "Low stock: product" in caplog.text
+
+    def test_similar_jobs_are_batched(self, handlers) -> None:
+        """GOOD — jobs of a batched handler run in one call"""
+        for i in range(3):
+            enqueue("collect", {"i": i})
+        assert run_jobs(batch_size=10) == {"claimed": 3, "succeeded": 3, "failed": 0}
+        assert handlers == [[{"i": 0}, {"i": 1}, {"i": 2}]]
+
+    def test_retry_with_backoff(self, handlers) -> None:
+        """GOOD — a failing job is retried later, then kept as failed"""
+        job = enqueue("boom", max_attempts=2)
+        assert run_jobs()["failed"] == 1
+        job.refresh_from_db()
+        assert (job.status, job.attempts) == (Job.QUEUED, 1)
+        assert job.run_at > timezone.now()
+        assert "RuntimeError: boom" in job.last_error
+        assert run_jobs()["claimed"] == 0  # not due yet
+
+        Job.objects.update(run_at=timezone.now())
+        run_jobs()
+        job.refresh_from_db()
+        assert (job.status, job.attempts) == (Job.FAILED, 2)
+
+    def test_stale_running_job_is_reclaimed(self, handlers) -> None:
+        """GOOD — a job whose worker died is claimed again once its lock expires"""
+        job = enqueue("collect", {"i": 1})
+        Job.objects.filter(id=job.id).update(
+            status=Job.RUNNING, attempts=1, locked_by="dead", locked_until=datetime(2000, 1, 1, tzinfo=dt_timezone.utc)
+        )
+        assert run_jobs()["succeeded"] == 1
+        assert handlers == [[{"i": 1}]]
+
+    def test_stale_last_attempt_fails(self, handlers) -> None:
+        """BAD — a job whose worker died on its last attempt is failed, not left running"""
+        job = enqueue("collect", {"i": 1}, max_attempts=1)
+        Job.objects.filter(id=job.id).update(
+            status=Job.RUNNING, attempts=1, locked_by="dead", locked_until=datetime(2000, 1, 1, tzinfo=dt_timezone.utc)
+        )
+        assert run_jobs()["claimed"] == 0
+        job.refresh_from_db()
+        assert (job.status, job.locked_until) == (Job.FAILED, None)
+        assert handlers == []
+
+    def test_failure_after_reclaim_is_ignored(self, handlers) -> None:
+        """BAD — a worker whose lock expired cannot overwrite the job's new claim"""
+        job = enqueue("boom")
+        assert run_jobs()["failed"] == 1  # first attempt, queued for a retry
+        Job.objects.filter(id=job.id).update(status=Job.RUNNING, locked_by="new-owner")
+        job.refresh_from_db()
+        job.locked_by = "old-owner"
+        _fail([job], "late failure")
+        job.refresh_from_db()
+        assert (job.status, job.locked_by) == (Job.RUNNING, "new-owner")
+        assert "late failure" not in job.last_error
+
+    def test_run_workers_once(self, handlers) -> None:
+        """GOOD — the command drains the queue"""
+        for i in range(5):
+            enqueue("collect", {"i": i})
+        out = io.StringIO()
+        call_command("run_workers", "--once", "--batch-size", "2", stdout=out)
+        assert "Ran 5 jobs: 5 succeeded" in out.getvalue()
+        assert len(handlers) == 3
+
+    def test_worker_starts_under_spawn(self) -> None:
+        """GOOD — a spawned worker imports its entry point by name and sets Django up itself"""
+        context = multiprocessing.get_context("spawn")
+        stop = context.Event()
+        stop.set()
+        process = context.Process(target=worker_process, args=(stop, 1, 0.1))
+        process.start()
+        process.join(timeout=60)
+        assert process.exitcode == 0
+
+    def test_unknown_job(self, db) -> None:
+        """BAD — jobs without a handler fail without retries"""
+        enqueue("missing")
+        assert run_jobs()["failed"] == 1
+        assert Job.objects.get().status == Job.FAILED
+
+
+# ============================================================
+# CATALOG CHANGE FEED TESTS
+# ============================================================
+
+def sync(client, cursor) -> dict:
+    return client.get(f"/api/catalog/changes/?since={cursor}").json()
+
+
+@pytest.mark.django_db(transaction=True)
+class TestCatalogChangeFeed:
+    """Tests for GET /api/catalog/changes/ (entries commit with the write they log)."""
+
+    def test_incremental_sync(self, api_client, catalog) -> None:
+        """GOOD — only objects changed after the cursor are returned, once each"""
+        cursor = api_client.get("/api/catalog/changes/?since=latest").json()["cursor"]
+        assert sync(api_client, cursor)["products"] == []
+
+        catalog[0].price = Decimal("12.50")
+        catalog[0].save()
+        Product.objects.filter(id__in=[catalog[0].id, catalog[1].id]).update(stock=0)  # bulk update
+        deleted_id = catalog[2].id
+        catalog[2].delete()
+
+        changes = sync(api_client, cursor)
+        assert [(p["id"], p["price"], p["stock"]) for p in changes["products"]] == [
+            (catalog[0].id, "12.50", 0), (catalog[1].id, "10.00", 0),
+        ]
+        assert changes["deleted"] == {"products": [deleted_id], "categories": []}
+        assert sync(api_client, changes["cursor"])["products"] == []
+
+    def test_bulk_writes_and_categories(self, api_client, category) -> None:
+        """GOOD — bulk_create, bulk_update and category saves are recorded"""
+        products = Product.objects.bulk_create([
+            Product(category=category, title=f"B{i}", description="", price=Decimal("1.00"), stock=1) for i in range(3)
+        ])
+        for product in products:
+            product.stock = 7
+        Product.objects.bulk_update(products, ["stock"])
+        category.name = "Phones"
+        category.save()
+
+        changes = sync(api_client, 0)
+        assert {p["id"]: p["stock"] for p in changes["products"]} == {p.id: 7 for p in products}
+        assert changes["categories"][0]["name"] == "Phones"
+
+    def test_paging_and_compaction(self, api_client, product) -> None:
+        """GOOD — compaction keeps the newest entry per object and every cursor stays valid"""
+        for stock in range(5):
+            Product.objects.filter(id=product.id).update(stock=stock)
+        assert compact_catalog_changes() > 0
+        assert CatalogChange.objects.filter(kind="product").count() == 1
+
+        changes = sync(api_client, 0)
+        assert [(p["id"], p["stock"]) for p in changes["products"]] == [(product.id, 4)]
+        assert not changes["has_more"]
+
+    def test_entries_commit_with_the_write(self, api_client, product) -> None:
+        """GOOD — a change is logged in its own transaction, a rolled back one never"""
+        cursor = api_client.get("/api/catalog/changes/?since=latest").json()["cursor"]
+        with transaction.atomic():
+            Product.objects.filter(id=product.id).update(stock=3)
+            assert CatalogChange.objects.filter(object_id=product.id, id__gt=cursor).exists()
+        assert [p["stock"] for p in sync(api_client, cursor)["products"]] == [3]
+
+        cursor = api_client.get("/api/catalog/changes/?since=latest").json()["cursor"]
+        with pytest.raises(RuntimeError), transaction.atomic():
+            product.title = "Renamed"
+            product.save()
+            raise RuntimeError
+        assert sync(api_client, cursor)["products"] == []
+        assert not CatalogChange.objects.filter(id__gt=cursor).exists()
+
+    def test_cart_holds_are_not_logged(self, authenticated_client, api_client, product) -> None:
+        """GOOD — stock moved by cart holds and releases stays out of the feed"""
+        cursor = api_client.get("/api/catalog/changes/?since=latest").json()["cursor"]
+        authenticated_client.post("/api/cart/add_item/", {"product_id": product.id, "quantity": 2})
+        authenticated_client.delete("/api/cart/remove_item/", {"product_id": product.id}, format='json')
+        assert sync(api_client, cursor)["products"] == []
+
+    def test_invalid_cursor(self, api_client) -> None:
+        """BAD — cursors must be non-negative integers"""
+        assert api_client.get("/api/catalog/changes/?since=abc").status_code == status.HTTP_400_BAD_REQUEST
+        assert api_client.get("/api/catalog/changes/?since=-1").status_code == status.HTTP_400_BAD_REQUEST
+
+
+# ============================================================
+# BULK INVENTORY UPDATE TESTS
+# ============================================================
+
+@pytest.mark.django_db
+class TestBulkInventoryUpdate:
+    """Tests for warehouse stock and price updates."""
+
+    def test_bulk_update(
+        self, admin_client, catalog, django_assert_max_num_queries, django_capture_on_commit_callbacks
+    ) -> None:
+        """GOOD — records apply in one UPDATE per chunk; unchanged products are not written"""
+        version = get_catalog_version()
+        records = [
+            {"product_id": catalog[0].id, "stock": 40, "price": "12.50"},
+            {"product_id": catalog[1].id, "stock": 5},  # unchanged
+            {"product_id": catalog[2].id, "price": "8"},
+        ]
+        with django_capture_on_commit_callbacks(execute=True):
+            response = admin_client.post("/api/products/bulk_update/", {"records": records}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        assert (response.data["updated"], response.data["unchanged"], response.data["conflicts"]) == (2, 1, [])
+        assert Product.objects.get(id=catalog[0].id).price == Decimal("12.50")
+        assert Product.objects.get(id=catalog[2].id).price == Decimal("8.00")
+        assert get_catalog_version() != version  # dependent caches invalidated
+
+        # SAVEPOINT, products, holds, changed ids, UPDATE, change log, RELEASE
+        with django_assert_max_num_queries(7):
+            bulk_update_inventory(enumerate([{"product_id": p.id, "stock": 1} for p in catalog]))
+
+    def test_conflicts_reported_per_row(self, catalog) -> None:
+        """BAD — invalid, duplicate and unknown rows are skipped and reported"""
+        conflicts = []
+        stats = bulk_update_inventory(enumerate([
+            {"product_id": catalog[0].id, "stock": 3},
+            {"product_id": catalog[0].id, "stock": 4},
+            {"product_id": 99999, "stock": 1},
+            {"product_id": catalog[1].id, "stock": -1},
+            {"product_id": catalog[1].id, "price": "1.999"},
+            {"product_id": catalog[2].id},
+        ]), on_conflict=conflicts.append, chunk_size=2)
+        assert [(c["kind"], c["row"]) for c in conflicts] == [
+            ("duplicate", 1), ("unknown_product", 2), ("invalid", 3), ("invalid", 4), ("invalid", 5),
+        ]
+        assert stats["updated"] == 1
+        assert Product.objects.get(id=catalog[0].id).stock == 3
+
+    def test_cart_holds_are_subtracted(self, authenticated_client, product) -> None:
+        """GOOD — stock is the physical count; holds beyond it are dropped"""
+        authenticated_client.post("/api/cart/add_item/", {"product_id": product.id, "quantity": 3})
+        conflicts = []
+        bulk_update_inventory(enumerate([{"product_id": product.id, "stock": 20}]), on_conflict=conflicts.append)
+        product.refresh_from_db()
+        assert product.stock == 17
+
+        bulk_update_inventory(enumerate([{"product_id": product.id, "stock": 2}]), on_conflict=conflicts.append)
+        product.refresh_from_db()
+        assert product.stock == 2
+        assert not CartItem.objects.filter(product=product, reserved_until__isnull=False).exists()
+        assert conflicts == [{"kind": "over_reserved", "row": 0, "product_id": product.id, "stock": 2, "reserved": 3}]
+
+    def test_command_and_dry_run(self, catalog, tmp_path) -> None:
+        """GOOD — the command applies a CSV file; dry runs change nothing"""
+        path = tmp_path / "stock.csv"
+        path.write_text(f"product_id,stock,price\n{catalog[0].id},9,\n{catalog[1].id},,11.00\n")
+        call_command("update_inventory", str(path), "--dry-run", stdout=io.StringIO())
+        assert Product.objects.get(id=catalog[0].id).stock == 5
+
+        out = io.StringIO()
+        call_command("update_inventory", str(path), stdout=out)
+        assert "2 products updated" in out.getvalue()
+        assert Product.objects.get(id=catalog[1].id).price == Decimal("11.00")
+
+    def test_staff_only(self, authenticated_client, product) -> None:
+        """BAD — regular users cannot update inventory"""
+        response = authenticated_client.post(
+            "/api/products/bulk_update/", {"records": [{"product_id": product.id, "stock": 1}]}, format='json'
+        )
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_invalid_body(self, admin_client) -> None:
+        """BAD — records must be a non-empty list"""
+        response = admin_client.post("/api/products/bulk_update/", {"records": {}}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+# ============================================================
+# RATE LIMITING TESTS
+# ============================================================
+
+@pytest.fixture
+def rate_limits(settings):
+    settings.RATE_LIMITS = {"login": "3/min", "login_account": "5/min", "register": "3/min", "cart": "2/s"}
+
+
+def login(client, password="wrong"):
+    return client.post("/api/auth/login/", {"email": "test@example.com", "password": password})
+
+
+@pytest.mark.django_db
+class TestRateLimiting:
+    """Tests for token-bucket throttling."""
+
+    def test_burst_then_429(self, rate_limits, api_client, user) -> None:
+        """BAD — requests beyond the bucket are rejected with Retry-After"""
+        for _ in range(3):
+            assert login(api_client).status_code == status.HTTP_400_BAD_REQUEST
+        response = login(api_client, "testpass123")
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert 1 <= int(response["Retry-After"]) <= 20  # one token per 20 seconds
+
+    def test_flood_rejected_without_cache(self, rate_limits, api_client, user, monkeypatch) -> None:
+        """GOOD — once rejected, a client is answered from the in-process deny list"""
+        for _ in range(4):
+            login(api_client)
+        calls = []
+        monkeypatch.setattr(throttling, "_take_local", lambda *args: calls.append(args))
+        assert login(api_client).status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert calls == []
+
+    def test_buckets_per_route_and_client(self, rate_limits, api_client, user) -> None:
+        """GOOD — each route and each client has its own bucket"""
+        for _ in range(4):
+            login(api_client)
+        response = api_client.post("/api/auth/register/", {
+            "email": "new@example.com", "username": "new", "password": "newpass123",
+        })
+        assert response.status_code != status.HTTP_429_TOO_MANY_REQUESTS
+        other = APIClient(REMOTE_ADDR="10.0.0.2")
+        assert login(other).status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_account_bucket_across_clients(self, rate_limits, user) -> None:
+        """BAD — one account guessed from many IPs is rejected once its own bucket is empty"""
+        for i in range(5):
+            assert login(APIClient(REMOTE_ADDR=f"10.0.1.{i}")).status_code == status.HTTP_400_BAD_REQUEST
+        response = APIClient(REMOTE_ADDR="10.0.1.9").post(
+            "/api/auth/login/", {"email": " Test@Example.com", "password": "testpass123"},
+        )
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        other = APIClient(REMOTE_ADDR="10.0.1.9").post(
+            "/api/auth/login/", {"email": "other@example.com", "password": "wrong"},
+        )
+        assert other.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_tokens_refill(self, rate_limits, authenticated_client) -> None:
+        """GOOD — a rejected client is let through again once a token is due"""
+        codes = [authenticated_client.get("/api/cart/current/").status_code for _ in range(3)]
+        assert codes == [200, 200, 429]
+        time.sleep(0.55)
+        assert authenticated_client.get("/api/cart/current/").status_code == status.HTTP_200_OK
+
+    def test_unscoped_views_unlimited(self, rate_limits, api_client, category) -> None:
+        """GOOD — views without a configured scope are not throttled"""
+        assert all(api_client.get("/api/categories/").status_code == 200 for _ in range(10))
+
+
+# ============================================================
+# PRODUCT DETAIL CACHE TESTS
+# ============================================================
+
+def run_concurrently(func, count):
+    """Call ``func`` from ``count`` threads at once; return their results."""
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def call(i):
+        barrier.wait()
+        try:
+            results[i] = func()
+        except Exception as exc:
+            results[i] = exc
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+@pytest.mark.django_db
+class TestProductDetailCache:
+    """Tests for cached product details with single-flight reloads."""
+
+    def test_hit_costs_no_queries(self, api_client, product, django_assert_num_queries) -> None:
+        """GOOD — a repeated product request is served from the cache"""
+        first = api_client.get(f"/api/products/{product.id}/")
+        with django_assert_num_queries(0):
+            second = api_client.get(f"/api/products/{product.id}/")
+        assert second.data == first.data
+        assert second.data["frequently_bought_together"] == []
+
+    def test_writes_invalidate(self, api_client, product) -> None:
+        """GOOD — a product write makes the cached payload outdated"""
+        api_client.get(f"/api/products/{product.id}/")
+        product.price = Decimal("5.00")
+        product.save()
+        assert api_client.get(f"/api/products/{product.id}/").data["price"] == "5.00"
+
+    def test_fieldsets_cached_separately(self, api_client, product) -> None:
+        """GOOD — each sparse fieldset has its own entry"""
+        api_client.get(f"/api/products/{product.id}/")
+        response = api_client.get(f"/api/products/{product.id}/?fields=title")
+        assert set(response.data) == {"title"}
+
+    def test_missing_product_not_cached(self, api_client) -> None:
+        """BAD — unknown products are 404 every time"""
+        assert api_client.get("/api/products/999/").status_code == status.HTTP_404_NOT_FOUND
+        assert api_client.get("/api/products/999/").status_code == status.HTTP_404_NOT_FOUND
+
+    def test_concurrent_misses_compute_once(self) -> None:
+        """GOOD — concurrent misses on one key share a single computation"""
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            return {"value": 1}
+
+        results = run_concurrently(lambda: get_or_compute("sf:test", compute, timeout=30), 8)
+        assert len(calls) == 1
+        assert results == [{"value": 1}] * 8
+
+    def test_leader_error_reaches_waiters(self) -> None:
+        """BAD — a failed computation fails its waiters and is not cached"""
+        def compute():
+            time.sleep(0.1)
+            raise ValueError("boom")
+
+        results = run_concurrently(lambda: get_or_compute("sf:test", compute, timeout=30), 4)
+        assert all(isinstance(result, ValueError) for result in results)
+        assert get_or_compute("sf:test", lambda: "ok", timeout=30) == "ok"
+
+    def test_stale_served_while_refreshing(self) -> None:
+        """GOOD — while one caller refreshes an expired entry, others get the stale value"""
+        get_or_compute("sf:test", lambda: "old", timeout=30, stale=60, version="v1")
+        started = threading.Event()
+
+        def refresh():
+            started.set()
+            time.sleep(0.2)
+            return "new"
+
+        leader = threading.Thread(target=get_or_compute, args=("sf:test", refresh, 30, 60, "v2"))
+        leader.start()
+        started.wait()
+        assert get_or_compute("sf:test", lambda: "other", timeout=30, stale=60, version="v2") == "old"
+        leader.join()
+        assert get_or_compute("sf:test", lambda: "other", timeout=30, stale=60, version="v2") == "new"
+
+    def test_waits_for_other_process(self) -> None:
+        """GOOD — a cold miss reuses the value another process is computing"""
+        cache.add("sf:test:lock", "other-process", timeout=5)
+
+        def other_process():
+            time.sleep(0.1)
+            cache.set("sf:test", ("theirs", time.time() + 30, None), timeout=30)
+            cache.delete("sf:test:lock")
+
+        threading.Thread(target=other_process).start()
+        assert get_or_compute("sf:test", lambda: "ours", timeout=30) == "theirs"
+
+
+# ============================================================
+# CACHE WARMING TESTS
+# ============================================================
+
+@pytest.mark.django_db
+class TestCacheWarming:
+    """Tests for warm_caches."""
+
+    def test_warms_most_ordered_products(self, user, catalog) -> None:
+        """GOOD — detail payloads of the most ordered products are cached"""
+        a, b, c, d = catalog
+        place_order(user, [a, b])
+        place_order(user, [a, c])
+        stats = warm_caches(top_products=2, concurrency=1)
+        assert stats["groups"]["product details"] == {"warmed": 2, "total": 2}
+        assert stats["order_share"] == 0.75
+        cached = {p.id for p in catalog if cache.get(product_detail_cache_key(p.id)) is not None}
+        assert cached == {a.id, b.id}
+
+    def test_warms_category_and_list_pages(self, settings, catalog) -> None:
+        """GOOD — the category list and every configured list page are requested"""
+        settings.WARM_PRODUCT_LIST_QUERIES = ("", "facets=true")
+        stats = warm_caches(concurrency=1)
+        assert stats["groups"]["category list"] == {"warmed": 1, "total": 1}
+        assert stats["groups"]["product list pages"] == {"warmed": 3, "total": 3}  # + its one category
+        assert stats["failed"] == []
+
+    def test_reports_failures(self, settings, catalog) -> None:
+        """BAD — pages that do not return 200 are reported"""
+        settings.WARM_PRODUCT_LIST_QUERIES = ("category=abc",)
+        settings.WARM_TOP_CATEGORIES = 0
+        stats = warm_caches(concurrency=1)
+        assert stats["groups"]["product list pages"] == {"warmed": 0, "total": 1}
+        assert stats["failed"] == ["/api/products/?category=abc"]
+
+    def test_command_reports_coverage(self, user, catalog) -> None:
+        """GOOD — the command prints coverage per group"""
+        place_order(user, catalog)
+        out = io.StringIO()
+        call_command("warm_caches", "--products", "10", "--concurrency", "1", stdout=out)
+        assert "✓ Warmed 4/4 product details (100.0% of recently ordered units)" in out.getvalue()
+
+
+# ============================================================
+# LEAN API PROFILE TESTS
+# ============================================================
+
+class TestLeanApiProfile:
+    """Tests for the settings.api profile."""
+
+    def test_boots_without_admin_and_docs(self, tmp_path) -> None:
+        """GOOD — the API profile passes checks without loading the admin site, docs or sessions"""
+        code = (
+            "import sys, django; django.setup();"
+            "from django.core.management import call_command; call_command('check');"
+            "from django.urls import resolve; resolve('/api/products/');"
+            # DRF's views import django.contrib.admin modules themselves; the admin site is never loaded.
+            "full = ('unfold', 'drf_spectacular', 'apps.core.admin', 'django.contrib.sessions');"
+            "print(sorted(name for name in sys.modules if name.startswith(full)))"
+        )
+        env = {
+            **os.environ,
+            "DJANGO_SETTINGS_MODULE": "settings.api",
+            "SECRET_KEY": "test",
+            "DATABASE_URL": f"sqlite:///{tmp_path / 'db.sqlite3'}",
+        }
+        result = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True)
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.splitlines()[-1] == "[]"
+
+
+# ============================================================
+# PRECOMPUTED OPENAPI SCHEMA TESTS
+# ============================================================
+
+@pytest.fixture
+def openapi_dir(settings, tmp_path):
+    settings.OPENAPI_SCHEMA_DIR = tmp_path / "openapi"
+    return settings.OPENAPI_SCHEMA_DIR
+
+
+@pytest.mark.django_db
+class TestOpenApiSchema:
+    """Tests for the precomputed schema and docs views."""
+
+    def test_published_schema_served(self, api_client, openapi_dir) -> None:
+        """GOOD — the build publishes versioned files that requests serve as is"""
+        call_command("build_openapi_schema", stdout=io.StringIO())
+        response = api_client.get("/api/schema/")
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"].startswith("application/vnd.oai.openapi")
+        version = (openapi_dir / "CURRENT").read_text()
+        assert response["ETag"] == f'"{version}-yaml"'
+        assert response.content == (openapi_dir / f"{version}.yaml").read_bytes()
+
+    def test_unpublished_schema_generated_in_memory(self, api_client, openapi_dir, caplog) -> None:
+        """BAD — with nothing published, requests generate the schema but never write files"""
+        response = api_client.get("/api/schema/")
+        assert response.status_code == status.HTTP_200_OK
+        assert not openapi_dir.exists()
+        assert "No OpenAPI schema published" in caplog.text
+
+    def test_stale_schema_replaced(self, openapi_dir, caplog) -> None:
+        """BAD — a schema left over from an earlier release is reported and replaced in memory"""
+        openapi_service.build_openapi_schema({"yaml": b"old", "json": b"{}"})
+        published = openapi_service.get_openapi_schema()
+        assert published.content["yaml"] == b"old"
+
+        openapi_service._verify(published)
+        assert "is stale" in caplog.text
+        assert openapi_service.get_openapi_schema().content["yaml"] != b"old"
+
+    def test_served_from_disk(self, api_client, openapi_dir, monkeypatch) -> None:
+        """GOOD — a published schema is served without introspecting the views"""
+        call_command("build_openapi_schema", stdout=io.StringIO())
+        monkeypatch.setattr(openapi_service, "generate_openapi_schema", lambda: pytest.fail("regenerated"))
+        response = api_client.get("/api/schema/?format=json")
+        assert response.status_code == status.HTTP_200_OK
+        assert "/api/products/" in json.loads(response.content)["paths"]
+
+    def test_etag_revalidation(self, api_client, openapi_dir) -> None:
+        """GOOD — schema and docs pages answer a matching If-None-Match with 304"""
+        for url in ("/api/schema/", "/api/docs/", "/api/redoc/"):
+            first = api_client.get(url)
+            assert first.status_code == status.HTTP_200_OK
+            again = api_client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+            assert again.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_docs_page_points_to_schema(self, api_client, openapi_dir) -> None:
+        """GOOD — Swagger UI is rendered once and loads the precomputed schema"""
+        first = api_client.get("/api/docs/")
+        assert b"/api/docs/?script=" in first.content
+        assert api_client.get("/api/docs/").content == first.content
+        assert b"/api/schema/" in api_client.get("/api/docs/?script=").content
+
+    def test_csrf_token_per_visitor(self, openapi_dir) -> None:
+        """BAD — a prerendered page must never hand one visitor's CSRF token to another"""
+        tokens = []
+        for client in (APIClient(), APIClient()):
+            assert b"csrf" not in client.get("/api/docs/").content.lower()
+            script = client.get("/api/docs/?script=")
+            assert "csrftoken" in script.cookies
+            tokens.append(re.search(rb'request\.headers\["X-CSRFTOKEN"\] = "([^"]+)"', script.content).group(1))
+        assert tokens[0] != tokens[1]
+
+    def test_check_fails_when_stale(self, openapi_dir, monkeypatch) -> None:
+        """BAD — --check fails when nothing is published or the code generates something else"""
+        with pytest.raises(CommandError):
+            call_command("build_openapi_schema", "--check", stdout=io.StringIO())
+        call_command("build_openapi_schema", stdout=io.StringIO())
+        out = io.StringIO()
+        call_command("build_openapi_schema", "--check", stdout=out)
+        assert "is up to date" in out.getvalue()
+
+        monkeypatch.setattr(openapi_service, "generate_openapi_schema", lambda: {"yaml": b"changed", "json": b"{}"})
+        with pytest.raises(CommandError, match="stale"):
+            call_command("build_openapi_schema", "--check", stdout=io.StringIO())
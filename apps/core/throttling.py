@@ -0,0 +1,169 @@
+"""
+Token-bucket rate limiting.
+
+Every (route scope, client) pair has a bucket of ``capacity`` tokens, refilled
+continuously so that it is full again after ``period`` seconds. A request
+takes one token or is rejected with 429 and ``Retry-After`` (the time until
+the next token). Scopes are configured per route in ``RATE_LIMITS``
+({"login": "10/min", ...}, DRF rate syntax), and views opt in with
+``throttle_scope``. The client is the user when authenticated, else the IP.
+
+Views that take credentials also name the submitted account field in
+``throttle_account_field``; each attempt then takes a second token from a
+bucket per (scope, account), configured as ``"<scope>_account"``, so
+guessing one account's password from many IPs is limited as well.
+
+Bucket state is kept in the shared cache as (tokens, updated at). On Redis
+(``django.core.cache.backends.redis.RedisCache``) refill-and-take is one Lua
+script: atomic across processes and one round trip. Other backends update it
+under a process-local lock, which is atomic for per-process caches (LocMem)
+and best effort across processes.
+
+In front of the cache, each process remembers the clients it has rejected
+until their next token is due, so a flood from one client is answered
+without any cache round trip.
+"""
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache
+from django.core.cache.backends.redis import RedisCache
+from rest_framework.throttling import BaseThrottle
+
+THROTTLE_KEY = "throttle:v1:{scope}:{ident}"
+DENY_LIST_MAX_SIZE = 10_000
+
+# Refill and take one token; returns {allowed, tokens left}. Redis TIME keeps
+# every app server on the same clock.
+TAKE_TOKEN_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 't', 'u')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 't', tostring(tokens), 'u', tostring(now))
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[3]))
+return {allowed, tostring(tokens)}
+"""
+
+_lock = threading.Lock()
+_script = None  # redis-py Script, registered on first use
+
+# bucket key -> wall-clock time its next token is due, for rejected clients
+_denied: Dict[str, float] = {}
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate: str) -> Tuple[int, int]:
+    """Parse a DRF rate string, e.g. "10/min" -> (capacity 10, period 60 seconds)."""
+    num, period = rate.split("/")
+    return int(num), {"s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60}[period[0]]
+
+
+def reset_throttle_state() -> None:
+    """Forget this process's deny list (buckets in the cache are kept)."""
+    _denied.clear()
+
+
+def _take_redis(client, key: str, capacity: int, rate: float, ttl: int) -> Tuple[bool, float]:
+    global _script
+    if _script is None:
+        _script = client.register_script(TAKE_TOKEN_LUA)
+    # EVALSHA, falling back to EVAL once per server that has not seen the script.
+    allowed, tokens = _script(keys=[key], args=[capacity, rate, ttl], client=client)
+    return bool(allowed), float(tokens)
+
+
+def _take_local(cache: BaseCache, key: str, capacity: int, rate: float, ttl: int) -> Tuple[bool, float]:
+    with _lock:
+        now = time.time()
+        tokens, updated = cache.get(key) or (capacity, now)
+        tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        cache.set(key, (tokens, now), ttl)
+    return allowed, tokens
+
+
+def take_token(scope: str, ident: str, capacity: int, period: int) -> Tuple[bool, float]:
+    """
+    Take a token from the bucket of ``ident`` on ``scope``.
+
+    Returns:
+        (allowed, seconds until the next token if rejected, else 0).
+    """
+    key = THROTTLE_KEY.format(scope=scope, ident=ident)
+    due = _denied.get(key)
+    if due is not None:
+        wait = due - time.time()
+        if wait > 0:
+            return False, wait
+        del _denied[key]
+
+    rate = capacity / period
+    ttl = period + 1  # a bucket idle this long is full again, so it can expire
+    cache = caches["default"]
+    if isinstance(cache, RedisCache):
+        cache_key = cache.make_and_validate_key(key)
+        allowed, tokens = _take_redis(cache._cache.get_client(cache_key, write=True), cache_key, capacity, rate, ttl)
+    else:
+        allowed, tokens = _take_local(cache, key, capacity, rate, ttl)
+    if allowed:
+        return True, 0.0
+
+    wait = (1 - tokens) / rate
+    if len(_denied) >= DENY_LIST_MAX_SIZE:
+        _denied.clear()
+    _denied[key] = time.time() + wait
+    return False, wait
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Rate limit views that set ``throttle_scope`` to a scope in ``RATE_LIMITS``."""
+
+    def __init__(self) -> None:
+        self.wait_seconds: Optional[float] = None
+
+    def allow_request(self, request, view) -> bool:
+        scope = getattr(view, "throttle_scope", None)
+        limits = getattr(settings, "RATE_LIMITS", {})
+        rate = limits.get(scope) if scope else None
+        if rate is not None:
+            user = request.user
+            ident = f"user:{user.pk}" if user is not None and user.is_authenticated else f"ip:{self.get_ident(request)}"
+            allowed, self.wait_seconds = take_token(scope, ident, *parse_rate(rate))
+            if not allowed:
+                return False
+
+        account = self.get_account(request, view)
+        rate = limits.get(f"{scope}_account") if account else None
+        if rate is None:
+            return True
+        allowed, self.wait_seconds = take_token(f"{scope}_account", f"account:{account}", *parse_rate(rate))
+        return allowed
+
+    def get_account(self, request, view) -> Optional[str]:
+        """The normalised account named in the request body, if the view throttles per account."""
+        field = getattr(view, "throttle_account_field", None)
+        if field is None or not hasattr(request.data, "get"):
+            return None
+        value = request.data.get(field)
+        if not isinstance(value, str):
+            return None
+        return value.strip().lower() or None
+
+    def wait(self) -> Optional[float]:
+        return self.wait_seconds
@@ -6,12 +6,23 @@ from apps.core.views import (
     CategoryListView,
     ProductListView,
     ProductDetailView,
+    ProductSimilarView,
+    ProductBulkUpdateView,
     CartView,
     CartAddItemView,
     CartRemoveItemView,
     CartUpdateItemView,
+    AnonymousCartView,
+    AnonymousCartAddItemView,
+    AnonymousCartRemoveItemView,
+    AnonymousCartUpdateItemView,
     OrderListCreateView,
-    PaymentListView
+    OrderDetailView,
+    PaymentListView,
+    SalesAnalyticsView,
+    CatalogSnapshotView,
+    CatalogSnapshotVersionView,
+    CatalogChangesView,
 )
 
 urlpatterns = [
@@ -19,22 +30,37 @@ urlpatterns = [
     path("auth/register/", RegisterView.as_view(), name="register"),
     path("auth/login/", LoginView.as_view(), name="login"),
     
+    # CATALOG SNAPSHOT
+    path("catalog/", CatalogSnapshotView.as_view(), name="catalog-snapshot"),
+    path("catalog/changes/", CatalogChangesView.as_view(), name="catalog-changes"),  # before catalog/<version>/
+    path("catalog/<str:version>/", CatalogSnapshotVersionView.as_view(), name="catalog-snapshot-version"),
+
     # CATEGORIES
     path("categories/", CategoryListView.as_view(), name="category-list"),
     
     # PRODUCTS
     path("products/", ProductListView.as_view(), name="product-list"),
     path("products/<int:pk>/", ProductDetailView.as_view(), name="product-detail"),
+    path("products/<int:pk>/similar/", ProductSimilarView.as_view(), name="product-similar"),
+    path("products/bulk_update/", ProductBulkUpdateView.as_view(), name="product-bulk-update"),
     
     # CART
     path("cart/current/", CartView.as_view(), name="cart-detail"),
     path("cart/add_item/", CartAddItemView.as_view(), name="cart-add"),
     path("cart/remove_item/", CartRemoveItemView.as_view(), name="cart-remove"),
     path("cart/update_item/", CartUpdateItemView.as_view(), name="cart-update"),
+    path("cart/anonymous/", AnonymousCartView.as_view(), name="anonymous-cart-detail"),
+    path("cart/anonymous/add_item/", AnonymousCartAddItemView.as_view(), name="anonymous-cart-add"),
+    path("cart/anonymous/remove_item/", AnonymousCartRemoveItemView.as_view(), name="anonymous-cart-remove"),
+    path("cart/anonymous/update_item/", AnonymousCartUpdateItemView.as_view(), name="anonymous-cart-update"),
     
     # ORDERS
     path("orders/", OrderListCreateView.as_view(), name="orders"),
+    path("orders/<int:pk>/", OrderDetailView.as_view(), name="order-detail"),
     
     # PAYMENTS
     path("payments/", PaymentListView.as_view(), name="payments"),
+
+    # ANALYTICS
+    path("analytics/sales/", SalesAnalyticsView.as_view(), name="sales-analytics"),
 ]
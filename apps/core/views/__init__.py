@@ -1,7 +1,24 @@
 from .auth_views import RegisterView, LoginView
-from .product_views import CategoryListView, ProductListView, ProductDetailView
-from .cart_views import CartView, CartAddItemView, CartRemoveItemView, CartUpdateItemView
-from .order_views import OrderListCreateView, PaymentListView
+from .product_views import (
+    CategoryListView,
+    ProductListView,
+    ProductDetailView,
+    ProductSimilarView,
+    ProductBulkUpdateView,
+)
+from .cart_views import (
+    CartView,
+    CartAddItemView,
+    CartRemoveItemView,
+    CartUpdateItemView,
+    AnonymousCartView,
+    AnonymousCartAddItemView,
+    AnonymousCartRemoveItemView,
+    AnonymousCartUpdateItemView,
+)
+from .order_views import OrderListCreateView, OrderDetailView, PaymentListView
+from .analytics_views import SalesAnalyticsView
+from .catalog_views import CatalogSnapshotView, CatalogSnapshotVersionView, CatalogChangesView
 
 __all__ = [
     'RegisterView',
@@ -9,10 +26,21 @@ __all__ = [
     'CategoryListView',
     'ProductListView',
     'ProductDetailView',
+    'ProductSimilarView',
+    'ProductBulkUpdateView',
     'CartView',
     'CartAddItemView',
     'CartRemoveItemView',
     'CartUpdateItemView',
+    'AnonymousCartView',
+    'AnonymousCartAddItemView',
+    'AnonymousCartRemoveItemView',
+    'AnonymousCartUpdateItemView',
     'OrderListCreateView',
+    'OrderDetailView',
     'PaymentListView',
+    'SalesAnalyticsView',
+    'CatalogSnapshotView',
+    'CatalogSnapshotVersionView',
+    'CatalogChangesView',
 ]
@@ -0,0 +1,53 @@
+from datetime import date, timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework import permissions, status
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from apps.core.services import get_sales_report
+
+
+def _parse_date_param(request: Request, name: str) -> Optional[date]:
+    """Parse an optional YYYY-MM-DD query parameter, raising ValueError when malformed."""
+    raw = request.query_params.get(name)
+    if not raw:
+        return None
+    parsed = parse_date(raw)
+    if parsed is None:
+        raise ValueError(name)
+    return parsed
+
+
+class SalesAnalyticsView(APIView):
+    """
+    Revenue analytics for staff users, bucketed per day.
+
+    Supports:
+    - Date range (inclusive): ?start=2025-01-01&end=2025-01-31 (default: last 30 days)
+    - Breakdowns by category and payment method, plus order value percentiles
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request: Request) -> Response:
+        try:
+            end = _parse_date_param(request, "end") or timezone.now().date()
+            start = _parse_date_param(request, "start") or end - timedelta(days=29)
+        except ValueError:
+            return Response({"error": "Dates must be in YYYY-MM-DD format"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if start > end:
+            return Response({"error": "start must not be after end"}, status=status.HTTP_400_BAD_REQUEST)
+
+        max_days = getattr(settings, "ANALYTICS_MAX_DAYS", 366)
+        if (end - start).days + 1 > max_days:
+            return Response(
+                {"error": f"Date range must not exceed {max_days} days"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(get_sales_report(start, end), status=status.HTTP_200_OK)
@@ -3,19 +3,30 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.request import Request
 from rest_framework_simplejwt.tokens import RefreshToken
+from django.conf import settings
 from django.contrib.auth import authenticate
 
 from apps.core.serializers import RegisterSerializer, LoginSerializer
+from apps.core.services import load_anonymous_cart, merge_anonymous_cart
+from apps.core.views.cart_views import anonymous_cart_token
 
 
 class RegisterView(generics.CreateAPIView):
     """Endpoint for user registration."""
     serializer_class = RegisterSerializer
+    throttle_scope = "register"
 
 
 class LoginView(APIView):
-    """Endpoint for user login and JWT token retrieval."""
+    """
+    Endpoint for user login and JWT token retrieval.
+
+    An anonymous cart sent along (cookie or X-Cart-Token header) is merged
+    into the user's cart, and the cookie is cleared.
+    """
     serializer_class = LoginSerializer
+    throttle_scope = "login"
+    throttle_account_field = "email"
 
     def post(self, request: Request) -> Response:
         """Authenticate user and return access and refresh tokens."""
@@ -32,9 +43,16 @@ class LoginView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        items = load_anonymous_cart(anonymous_cart_token(request))
+        if items:
+            merge_anonymous_cart(user, items)
+
         # Generate JWT tokens
         refresh = RefreshToken.for_user(user)
-        return Response({
+        response = Response({
             "access": str(refresh.access_token),
             "refresh": str(refresh)
         }, status=status.HTTP_200_OK)
+        if items:
+            response.delete_cookie(getattr(settings, "ANONYMOUS_CART_COOKIE", "cart"))
+        return response
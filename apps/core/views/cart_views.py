@@ -1,56 +1,137 @@
+from typing import Dict
+
+from django.conf import settings
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.request import Request
 
-from apps.core.models import Cart, Product
-from apps.core.serializers import CartSerializer
-from apps.core.services import add_item_to_cart, remove_item_from_cart, update_item_quantity
+from apps.core.idempotency import idempotent
+from apps.core.models import Cart, CartItem, Product
+from apps.core.serializers import CartSerializer, ProductSerializer, SideloadedCartSerializer
+from apps.core.services import (
+    CartBusy,
+    InsufficientStock,
+    add_item_to_cart,
+    add_live_item,
+    anonymous_cart_max_items,
+    dump_anonymous_cart,
+    get_cart_products,
+    get_live_cart,
+    load_anonymous_cart,
+    remove_item_from_cart,
+    remove_live_item,
+    update_item_quantity,
+    update_live_item,
+    write_behind_enabled,
+)
+from apps.core.views.mixins import SideloadProductsMixin, SparseFieldsetMixin
+
 
+class CartView(SideloadProductsMixin, SparseFieldsetMixin, generics.RetrieveAPIView):
+    """
+    Retrieve the current user's shopping cart or create one if it doesn't exist.
 
-class CartView(generics.RetrieveAPIView):
-    """Retrieve the current user's shopping cart or create one if it doesn't exist."""
+    Supports:
+    - Sparse fieldsets: ?fields=items.quantity,items.product.title,items.product.price
+    - Normalized format: ?sideload=products adds a "products" map {id: product}
+      and items reference products by id
+
+    With CART_STORAGE = "cache" the cart is served from the write-behind cache.
+    """
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = "cart"
     serializer_class = CartSerializer
+    sideload_serializer_class = SideloadedCartSerializer
 
     def get_object(self) -> Cart:
+        if write_behind_enabled():
+            return get_live_cart(self.request.user)
         cart, created = Cart.objects.get_or_create(user=self.request.user)
-        
+
+        products = [] if self.sideloading else self.projected_prefetch('items__product', Product.objects.all())
         return Cart.objects.select_related('user').prefetch_related(
-            'items__product'
+            *self.projected_prefetch('items', CartItem.objects.all()),
+            *products,
         ).get(id=cart.id)
 
+    def retrieve(self, request: Request, *args, **kwargs) -> Response:
+        response = super().retrieve(request, *args, **kwargs)
+        if self.sideloading:
+            response.data["products"] = self.sideloaded_products(response.data.get("items", ()))
+        return response
+
+
+def _cart_busy() -> Response:
+    return Response(
+        {"error": "Cart is being updated, retry shortly"},
+        status=status.HTTP_409_CONFLICT,
+        headers={"Retry-After": "1"},
+    )
+
+
+def _parse_quantity(value) -> int:
+    """Return ``value`` as a positive int, or 0 if it is not one."""
+    try:
+        quantity = int(value)
+    except (TypeError, ValueError):
+        return 0
+    return max(quantity, 0)
+
 
 class CartAddItemView(APIView):
-    """Endpoint to add a product to the shopping cart."""
+    """
+    Endpoint to add a product to the shopping cart.
+
+    The added quantity is reserved from stock for CART_RESERVATION_TTL seconds
+    (with CART_STORAGE = "cache", checked against stock but not reserved).
+    Retries carrying the same Idempotency-Key header are replayed, not re-applied.
+    """
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = "cart"
 
+    @idempotent
     def post(self, request: Request) -> Response:
         product_id = request.data.get("product_id")
-        quantity = int(request.data.get("quantity", 1))
+        quantity = _parse_quantity(request.data.get("quantity", 1))
 
         if not product_id:
             return Response({"error": "product_id is required"}, status=status.HTTP_400_BAD_REQUEST)
 
+        if not quantity:
+            return Response({"error": "quantity must be a positive integer"}, status=status.HTTP_400_BAD_REQUEST)
+
         try:
             product = Product.objects.get(id=product_id)
         except Product.DoesNotExist:
             return Response({"error": "Product not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        add_item_to_cart(request.user, product, quantity)
+        add = add_live_item if write_behind_enabled() else add_item_to_cart
+        try:
+            add(request.user, product, quantity)
+        except InsufficientStock:
+            return Response({"error": "Insufficient stock"}, status=status.HTTP_409_CONFLICT)
+        except CartBusy:
+            return _cart_busy()
+
         return Response({"message": "Item added successfully"}, status=status.HTTP_200_OK)
 
 
 class CartRemoveItemView(APIView):
     """Endpoint to remove a product from the shopping cart."""
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = "cart"
 
     def delete(self, request: Request) -> Response:
         product_id = request.data.get("product_id")
         if not product_id:
             return Response({"error": "product_id is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-        removed = remove_item_from_cart(request.user, product_id)
+        remove = remove_live_item if write_behind_enabled() else remove_item_from_cart
+        try:
+            removed = remove(request.user, product_id)
+        except CartBusy:
+            return _cart_busy()
         if not removed:
             return Response({"error": "Item not found"}, status=status.HTTP_404_NOT_FOUND)
 
@@ -58,8 +139,13 @@ class CartRemoveItemView(APIView):
 
 
 class CartUpdateItemView(APIView):
-    """Endpoint to update the quantity of a product in the shopping cart."""
+    """
+    Endpoint to update the quantity of a product in the shopping cart.
+
+    The stock reservation is adjusted to the new quantity and its TTL refreshed.
+    """
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = "cart"
 
     def patch(self, request: Request) -> Response:
         product_id = request.data.get("product_id")
@@ -71,8 +157,145 @@ class CartUpdateItemView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        updated = update_item_quantity(request.user, product_id, int(quantity))
+        quantity = _parse_quantity(quantity)
+        if not quantity:
+            return Response({"error": "quantity must be a positive integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        update = update_live_item if write_behind_enabled() else update_item_quantity
+        try:
+            updated = update(request.user, product_id, quantity)
+        except InsufficientStock:
+            return Response({"error": "Insufficient stock"}, status=status.HTTP_409_CONFLICT)
+        except CartBusy:
+            return _cart_busy()
+
         if not updated:
             return Response({"error": "Item not found"}, status=status.HTTP_404_NOT_FOUND)
 
         return Response({"message": "Quantity updated successfully"}, status=status.HTTP_200_OK)
+
+
+# ------------------------------------------------------------
+# Anonymous carts: a signed token in a cookie or the X-Cart-Token header
+# ------------------------------------------------------------
+
+def anonymous_cart_token(request: Request) -> str:
+    """The anonymous cart token sent with ``request``; the header wins over the cookie."""
+    return request.META.get("HTTP_X_CART_TOKEN") or request.COOKIES.get(
+        getattr(settings, "ANONYMOUS_CART_COOKIE", "cart"), ""
+    )
+
+
+class AnonymousCartMixin:
+    """
+    Shared handling of anonymous carts, which live only in a signed token.
+
+    Every response re-issues the token in the body and as a cookie. Products
+    are priced with one query, and items whose product was deleted are dropped.
+
+    Response: {"token", "items": [{"product", "quantity", "subtotal"}], "total"}
+    """
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+    throttle_scope = "cart"
+
+    def cart_response(self, request: Request, items: Dict[int, int], products=None) -> Response:
+        if products is None:
+            products = get_cart_products(items)
+        items = {product_id: quantity for product_id, quantity in items.items() if product_id in products}
+        token = dump_anonymous_cart(items)
+        lines = []
+        for product_id, quantity in sorted(items.items()):
+            product = products[product_id]
+            lines.append({
+                "product": ProductSerializer(product).data,
+                "quantity": quantity,
+                "subtotal": str(product.price * quantity),
+            })
+        total = sum((products[product_id].price * quantity for product_id, quantity in items.items()), 0)
+        response = Response({"token": token, "items": lines, "total": str(total)}, status=status.HTTP_200_OK)
+        response.set_cookie(
+            getattr(settings, "ANONYMOUS_CART_COOKIE", "cart"),
+            token,
+            max_age=getattr(settings, "ANONYMOUS_CART_MAX_AGE", 30 * 24 * 60 * 60),
+            secure=request.is_secure(),
+            httponly=True,
+            samesite="Lax",
+        )
+        return response
+
+    def change(self, request: Request, product_id, quantity: int, add: bool) -> Response:
+        """Apply a quantity change after checking it against stock, with one product query."""
+        items = load_anonymous_cart(anonymous_cart_token(request))
+        try:
+            product_id = int(product_id)
+        except (TypeError, ValueError):
+            return Response({"error": "Product not found"}, status=status.HTTP_404_NOT_FOUND)
+        if not add and product_id not in items:
+            return Response({"error": "Item not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        products = get_cart_products({**items, product_id: quantity})
+        product = products.get(product_id)
+        if product is None:
+            return Response({"error": "Product not found"}, status=status.HTTP_404_NOT_FOUND)
+        new_quantity = items.get(product_id, 0) + quantity if add else quantity
+        if product.stock < new_quantity:
+            return Response({"error": "Insufficient stock"}, status=status.HTTP_409_CONFLICT)
+        if product_id not in items and len(items) >= anonymous_cart_max_items():
+            return Response({"error": "Cart is full"}, status=status.HTTP_400_BAD_REQUEST)
+        items[product_id] = new_quantity
+        return self.cart_response(request, items, products)
+
+
+class AnonymousCartView(AnonymousCartMixin, APIView):
+    """Retrieve the cart of a shopper who is not logged in."""
+
+    def get(self, request: Request) -> Response:
+        return self.cart_response(request, load_anonymous_cart(anonymous_cart_token(request)))
+
+
+class AnonymousCartAddItemView(AnonymousCartMixin, APIView):
+    """Add a product to the anonymous cart. Stock is checked, not reserved."""
+
+    def post(self, request: Request) -> Response:
+        product_id = request.data.get("product_id")
+        quantity = _parse_quantity(request.data.get("quantity", 1))
+        if not product_id:
+            return Response({"error": "product_id is required"}, status=status.HTTP_400_BAD_REQUEST)
+        if not quantity:
+            return Response({"error": "quantity must be a positive integer"}, status=status.HTTP_400_BAD_REQUEST)
+        return self.change(request, product_id, quantity, add=True)
+
+
+class AnonymousCartUpdateItemView(AnonymousCartMixin, APIView):
+    """Set the quantity of a product in the anonymous cart."""
+
+    def patch(self, request: Request) -> Response:
+        product_id = request.data.get("product_id")
+        quantity = request.data.get("quantity")
+        if not product_id or quantity is None:
+            return Response(
+                {"error": "product_id and quantity are required"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        quantity = _parse_quantity(quantity)
+        if not quantity:
+            return Response({"error": "quantity must be a positive integer"}, status=status.HTTP_400_BAD_REQUEST)
+        return self.change(request, product_id, quantity, add=False)
+
+
+class AnonymousCartRemoveItemView(AnonymousCartMixin, APIView):
+    """Remove a product from the anonymous cart."""
+
+    def delete(self, request: Request) -> Response:
+        product_id = request.data.get("product_id")
+        if not product_id:
+            return Response({"error": "product_id is required"}, status=status.HTTP_400_BAD_REQUEST)
+        items = load_anonymous_cart(anonymous_cart_token(request))
+        try:
+            removed = items.pop(int(product_id), None)
+        except (TypeError, ValueError):
+            removed = None
+        if removed is None:
+            return Response({"error": "Item not found"}, status=status.HTTP_404_NOT_FOUND)
+        return self.cart_response(request, items)
@@ -0,0 +1,69 @@
+from django.http import HttpResponseBase
+from rest_framework import views
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from apps.core.services import get_catalog_changes, latest_catalog_cursor
+from apps.core.services.snapshot_service import get_snapshot
+from apps.core.views.mixins import snapshot_response
+
+
+class CatalogSnapshotView(views.APIView):
+    """
+    Full catalog as one document: {"categories": [...], "products": [...]}.
+
+    Served from the prebuilt snapshot file (precompressed, strong ETag).
+    Returns 503 until ``manage.py build_catalog_snapshot`` has run.
+    """
+    authentication_classes = []
+
+    def get(self, request: Request) -> HttpResponseBase:
+        snapshot = get_snapshot()
+        if snapshot is None:
+            return Response({"error": "Catalog snapshot is not available"}, status=503)
+        response = snapshot_response(request, snapshot, "catalog")
+        response["Content-Location"] = f"{request.path}{snapshot.version}/"
+        return response
+
+
+class CatalogSnapshotVersionView(views.APIView):
+    """
+    One specific catalog snapshot version.
+
+    Versions are content hashes and never change, so they are cached as immutable.
+    Only the current and the previous version are kept.
+    """
+    authentication_classes = []
+
+    def get(self, request: Request, version: str) -> HttpResponseBase:
+        snapshot = get_snapshot(version)
+        if snapshot is None:
+            return Response({"error": "Catalog snapshot version not found"}, status=404)
+        return snapshot_response(request, snapshot, "catalog", immutable=True)
+
+
+class CatalogChangesView(views.APIView):
+    """
+    Catalog changes after a cursor, for incremental sync.
+
+    GET /api/catalog/changes/?since=<cursor> returns the current state of every
+    product and category changed since then, ids of deleted ones and the next
+    cursor: {"cursor", "has_more", "products", "categories", "deleted"}.
+    Repeat with the returned cursor while "has_more" is true.
+
+    To start, take the cursor of ?since=latest, then load the full catalog;
+    anything changed in between is delivered again by the next poll.
+    """
+    authentication_classes = []
+
+    def get(self, request: Request) -> Response:
+        since = request.query_params.get("since", "0")
+        if since == "latest":
+            return Response({"cursor": latest_catalog_cursor(), "has_more": False})
+        try:
+            since = int(since)
+        except ValueError:
+            return Response({"error": "Invalid cursor"}, status=400)
+        if since < 0:
+            return Response({"error": "Invalid cursor"}, status=400)
+        return Response(get_catalog_changes(since))
@@ -0,0 +1,201 @@
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db.models import Prefetch, QuerySet
+from django.http import FileResponse, HttpResponse, HttpResponseBase
+from django.utils.functional import cached_property
+from rest_framework import permissions
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from apps.core.db_router import is_pinned_to_primary, replica_reads
+from apps.core.models import Product
+from apps.core.serializers import ProductSerializer
+from apps.core.services.snapshot_service import ENCODINGS, Snapshot, get_snapshot
+from apps.core.sparse_fields import ProjectionPlan, parse_field_tree, projection_plan, prune_serializer
+
+
+class ReplicaReadMixin:
+    """
+    Serve GET requests of this view from a read replica.
+
+    Users who wrote recently are pinned to the primary (read-your-writes), and
+    other methods always use the primary.
+    """
+
+    def use_replica(self, request: Request) -> bool:
+        if request.method not in permissions.SAFE_METHODS:
+            return False
+        return not is_pinned_to_primary(request.user.pk if request.user.is_authenticated else None)
+
+    def get(self, request: Request, *args, **kwargs) -> Response:
+        if not self.use_replica(request):
+            return super().get(request, *args, **kwargs)
+        with replica_reads():
+            return super().get(request, *args, **kwargs)
+
+
+class SparseFieldsetMixin:
+    """
+    Support ``?fields=`` and ``?exclude=`` on safe-method requests.
+
+    The serializer is trimmed to the requested fields and the root queryset
+    defers every column the trimmed serializer does not read. Views with
+    nested relations build their prefetches with ``projected_prefetch`` so
+    nested levels are narrowed too.
+    """
+
+    def sparse_fieldset_active(self) -> bool:
+        return self.request.method in permissions.SAFE_METHODS and (
+            "fields" in self.request.query_params or "exclude" in self.request.query_params
+        )
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if self.sparse_fieldset_active():
+            prune_serializer(
+                serializer,
+                parse_field_tree(self.request.query_params.get("fields")),
+                parse_field_tree(self.request.query_params.get("exclude")),
+            )
+        return serializer
+
+    def field_requested(self, name: str) -> bool:
+        """Whether a top-level field added to the payload outside the serializer was selected."""
+        if not self.sparse_fieldset_active():
+            return True
+        include = parse_field_tree(self.request.query_params.get("fields"))
+        exclude = parse_field_tree(self.request.query_params.get("exclude"))
+        if include is not None and name not in include:
+            return False
+        return exclude is None or name not in exclude or bool(exclude[name])
+
+    @cached_property
+    def projection(self) -> Optional[ProjectionPlan]:
+        """Columns to defer per relation path, or None when no fieldset was requested."""
+        if not self.sparse_fieldset_active():
+            return None
+        return projection_plan(self.get_serializer())
+
+    def projected(self, queryset: QuerySet, path: str = "") -> QuerySet:
+        """Defer the columns of ``queryset`` (at relation ``path``) that will not be serialized."""
+        if self.projection is None:
+            return queryset
+        return queryset.defer(*self.projection.get(path, []))
+
+    def projected_prefetch(self, path: str, queryset: QuerySet) -> List[Prefetch]:
+        """A narrowed ``Prefetch`` for ``path``, or nothing if the relation is not serialized."""
+        if self.projection is not None and path not in self.projection:
+            return []
+        return [Prefetch(path, queryset=self.projected(queryset, path))]
+
+    def get_queryset(self) -> QuerySet:
+        return self.projected(super().get_queryset())
+
+
+class SideloadProductsMixin:
+    """
+    Opt-in normalized format for item lists: ``?sideload=products``.
+
+    Items reference their product by id and the response carries one
+    ``products`` map ({id: product}) loaded with a single ``IN`` query, instead
+    of a product copy per item. Sparse fieldsets reach the map through
+    ``products.`` paths, e.g. ``?fields=items,products.title``.
+    """
+    sideload_serializer_class = None
+
+    @cached_property
+    def sideloading(self) -> bool:
+        return self.request.method in permissions.SAFE_METHODS and self.request.query_params.get("sideload") == "products"
+
+    def get_serializer_class(self):
+        if self.sideloading:
+            return self.sideload_serializer_class
+        return super().get_serializer_class()
+
+    def sideloaded_products(self, items: Iterable[dict]) -> Dict[str, dict]:
+        """Serialized products referenced by ``items``, keyed by id."""
+        ids = {item["product"] for item in items if item.get("product") is not None}
+        if not ids:
+            return {}
+
+        serializer = ProductSerializer(many=True, context=self.get_serializer_context())
+        include = parse_field_tree(self.request.query_params.get("fields"))
+        exclude = parse_field_tree(self.request.query_params.get("exclude"))
+        include = (include.get("products") or None) if include is not None else None
+        exclude = (exclude.get("products") or None) if exclude is not None else None
+        queryset = Product.objects.filter(pk__in=ids).order_by("pk")
+        if include or exclude:
+            prune_serializer(serializer, include, exclude)
+            queryset = queryset.defer(*projection_plan(serializer)[""])
+
+        products = list(queryset)
+        serializer.instance = products
+        return {str(product.pk): data for product, data in zip(products, serializer.data)}
+
+
+def _accepted_encodings(header: str) -> set:
+    """Content-codings the client accepts (q > 0) from an Accept-Encoding header."""
+    accepted = set()
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        try:
+            q = float(params.strip()[2:]) if params.strip().startswith("q=") else 1.0
+        except ValueError:
+            q = 0.0
+        if coding and q > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def snapshot_response(
+    request: Request,
+    snapshot: Snapshot,
+    artifact: str,
+    immutable: bool = False,
+) -> HttpResponseBase:
+    """
+    Serve a snapshot file, precompressed if the client accepts it.
+
+    The file is handed to the server through ``wsgi.file_wrapper`` (sendfile
+    under gunicorn/uWSGI) instead of being read into Python. Every encoding
+    gets its own strong ETag, and a matching ``If-None-Match`` returns 304.
+    """
+    accepted = _accepted_encodings(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+    encoding = next((coding for coding, _ in ENCODINGS if coding in snapshot.encodings and coding in accepted), None)
+    etag = f'"{snapshot.version}-{artifact}{"-" + encoding if encoding else ""}"'
+
+    if immutable:
+        cache_control = "public, max-age=31536000, immutable"
+    else:
+        cache_control = f"public, max-age={getattr(settings, 'CATALOG_SNAPSHOT_CACHE_SECONDS', 60)}"
+
+    if etag in {tag.strip() for tag in request.META.get("HTTP_IF_NONE_MATCH", "").split(",")}:
+        response = HttpResponse(status=304)
+    else:
+        path = snapshot.path(artifact, encoding)
+        response = FileResponse(path.open("rb"), content_type="application/json")
+        del response["Content-Disposition"]
+        if encoding:
+            response["Content-Encoding"] = encoding
+    response["ETag"] = etag
+    response["Cache-Control"] = cache_control
+    response["Vary"] = "Accept-Encoding"
+    return response
+
+
+class CatalogSnapshotMixin:
+    """
+    Serve unfiltered GET list requests straight from the prebuilt catalog snapshot.
+
+    Requests with any query parameter, or before a snapshot has been built,
+    fall through to the regular database-backed ``list``.
+    """
+    snapshot_artifact: str
+
+    def list(self, request: Request, *args, **kwargs) -> Response:
+        if not request.query_params:
+            snapshot = get_snapshot()
+            if snapshot is not None:
+                return snapshot_response(request, snapshot, self.snapshot_artifact)
+        return super().list(request, *args, **kwargs)
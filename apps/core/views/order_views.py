@@ -1,37 +1,208 @@
-from rest_framework import generics, permissions, filters
+from contextlib import nullcontext
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.http import HttpResponse
+from django.utils.functional import cached_property
+from rest_framework import generics, permissions, filters, status
+from rest_framework.exceptions import NotFound
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 
-from apps.core.models import Order, Payment
-from apps.core.serializers import OrderSerializer, PaymentSerializer
+from apps.core.idempotency import idempotent
+from apps.core.pagination import KeysetPagination
+from apps.core.views.mixins import ReplicaReadMixin, SideloadProductsMixin, SparseFieldsetMixin
+
+from apps.core.models import Order, OrderItem, Payment, Product
+from apps.core.serializers import (
+    OrderDetailSerializer,
+    OrderSerializer,
+    OrderSummarySerializer,
+    PaymentSerializer,
+    SideloadedOrderDetailSerializer,
+    SideloadedOrderSerializer,
+)
+from apps.core.services import (
+    CartBusy,
+    InsufficientStock,
+    checkout_cart,
+    enqueue,
+    get_order_detail,
+    get_order_version,
+    live_cart_checkout,
+    order_detail_etag,
+    write_behind_enabled,
+)
+
+
+def summarized(queryset):
+    """Annotate orders with ``item_count`` and ``payment_status`` for ``OrderSummarySerializer``."""
+    item_count = (
+        OrderItem.objects.filter(order=OuterRef("pk"))
+        .order_by()
+        .values("order")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    # A correlated subquery is only evaluated for the rows of the page, unlike a GROUP BY join.
+    return queryset.annotate(
+        item_count=Coalesce(Subquery(item_count), Value(0)),
+        payment_status=F("payment__status"),
+    )
 
 
-class OrderListCreateView(generics.ListCreateAPIView):
+class OrderListCreateView(SideloadProductsMixin, SparseFieldsetMixin, generics.ListCreateAPIView):
     """
     List the current user's orders or create a new one.
 
+    ``?summary=true`` switches to the compact list: id, created_at, total_price,
+    item_count and payment_status per order (no items), paginated by keyset on
+    (ordering field, id): {"next": "<url>", "results": [...]}. ``?page_size=``
+    sets the page length (max 100). Items are loaded by the order detail endpoint.
+
     Supports:
     - Ordering by creation date or total price: ?ordering=-created_at or ?ordering=total_price
+    - Safe retries of order creation with an Idempotency-Key header
+    - Sparse fieldsets: ?fields=id,total_price,items.quantity,items.product.title
+      or ?exclude=items.product.description
+    - Normalized format: ?sideload=products returns {"results": [...], "products": {id: product}}
+      with items referencing products by id
     """
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = OrderSerializer
+    sideload_serializer_class = SideloadedOrderSerializer
 
     # Enable ordering
     filter_backends = [filters.OrderingFilter]
     ordering_fields = ["created_at", "total_price"]
     ordering = ["-created_at"]  # Default ordering: newest first
 
+    @cached_property
+    def summary(self) -> bool:
+        return self.request.method in permissions.SAFE_METHODS and (
+            self.request.query_params.get("summary", "").lower() in ("1", "true", "yes")
+        )
+
+    @cached_property
+    def paginator(self):
+        """Keyset pagination for the summary list; the full list stays unpaginated."""
+        return KeysetPagination() if self.summary else None
+
+    def get_serializer_class(self):
+        if self.summary:
+            return OrderSummarySerializer
+        return super().get_serializer_class()
+
     def get_queryset(self):
         """Return orders belonging to the current user, including related products."""
-        return Order.objects.filter(user=self.request.user).prefetch_related("items__product")
+        if self.summary:
+            return summarized(self.projected(Order.objects.filter(user=self.request.user)))
+        products = [] if self.sideloading else self.projected_prefetch("items__product", Product.objects.all())
+        return self.projected(Order.objects.filter(user=self.request.user)).prefetch_related(
+            *self.projected_prefetch("items", OrderItem.objects.all()),
+            *products,
+        )
+
+    def list(self, request: Request, *args, **kwargs) -> Response:
+        response = super().list(request, *args, **kwargs)
+        if self.sideloading and not self.summary:
+            items = [item for order in response.data for item in order.get("items", ())]
+            response.data = {"results": response.data, "products": self.sideloaded_products(items)}
+        return response
+
+    @idempotent
+    def post(self, request: Request, *args, **kwargs) -> Response:
+        try:
+            return super().post(request, *args, **kwargs)
+        except InsufficientStock:
+            return Response({"error": "Insufficient stock"}, status=status.HTTP_409_CONFLICT)
+        except CartBusy:
+            return Response(
+                {"error": "Cart is being updated, retry shortly"},
+                status=status.HTTP_409_CONFLICT,
+                headers={"Retry-After": "1"},
+            )
 
     def perform_create(self, serializer) -> None:
-        """Save a new order for the current user."""
-        serializer.save(user=self.request.user)
+        """
+        Save a new order for the current user, writing back a cached cart first.
+
+        A cached cart stays locked until the order commits, so no flush can
+        write back the items it just ordered.
+
+        The cart's items become the order's items in the same transaction,
+        consuming their stock holds, so an expiring hold can no longer return
+        sold units to stock. Post-order work is queued in that transaction too
+        and run by the workers (``order_placed`` in apps.core.jobs).
+        """
+        user = self.request.user
+        with live_cart_checkout(user) if write_behind_enabled() else nullcontext():
+            with transaction.atomic():
+                order = serializer.save(user=user)
+                checkout_cart(user, order)
+                enqueue("order_placed", {"order_id": order.id})
+
+
+class OrderDetailView(SideloadProductsMixin, SparseFieldsetMixin, generics.RetrieveAPIView):
+    """
+    Retrieve one of the current user's orders with its items and payment status.
+
+    Orders never change after checkout, so the rendered payload is cached per
+    payment status and catalog version, for ``ORDER_DETAIL_CACHE_TTL`` seconds
+    (see ``order_service``). A request costs one ownership query on a cache
+    hit, and nothing more with a matching ``If-None-Match``.
+
+    Supports the same sparse fieldsets and ?sideload=products format as the order list.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = OrderDetailSerializer
+    sideload_serializer_class = SideloadedOrderDetailSerializer
+    variant_params = ("fields", "exclude", "sideload")
+
+    def get_queryset(self):
+        products = [] if self.sideloading else self.projected_prefetch("items__product", Product.objects.all())
+        queryset = Order.objects.filter(user=self.request.user).annotate(payment_status=F("payment__status"))
+        return self.projected(queryset).prefetch_related(
+            *self.projected_prefetch("items", OrderItem.objects.all()),
+            *products,
+        )
+
+    def render_payload(self) -> bytes:
+        data = self.get_serializer(self.get_object()).data
+        if self.sideloading:
+            data["products"] = self.sideloaded_products(data.get("items", ()))
+        return JSONRenderer().render(data)
+
+    def retrieve(self, request: Request, *args, **kwargs) -> HttpResponse:
+        order_id = kwargs["pk"]
+        version = get_order_version(order_id, request.user.pk)
+        if version is None:
+            raise NotFound()
+
+        variant = urlencode(sorted(
+            (name, value) for name in self.variant_params for value in request.query_params.getlist(name)
+        ))
+        etag = order_detail_etag(order_id, version, variant)
+        if etag in {tag.strip() for tag in request.META.get("HTTP_IF_NONE_MATCH", "").split(",")}:
+            response = HttpResponse(status=304)
+        else:
+            payload = get_order_detail(order_id, version, variant, self.render_payload)
+            response = HttpResponse(payload, content_type="application/json")
+
+        response["ETag"] = etag
+        max_age = getattr(settings, "ORDER_DETAIL_MAX_AGE", 60)
+        response["Cache-Control"] = f"private, max-age={max_age}"
+        return response
 
 
-class PaymentListView(generics.ListAPIView):
+class PaymentListView(ReplicaReadMixin, generics.ListAPIView):
     """
-    List all payments.
+    List all payments (served from a read replica).
 
     Supports:
     - Filtering by status and method: ?status=completed, ?method=card
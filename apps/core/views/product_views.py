@@ -1,29 +1,57 @@
-from rest_framework import generics, filters
+from urllib.parse import urlencode
+
+from django.conf import settings
+from rest_framework import generics, filters, permissions, status
+from rest_framework.views import APIView
+from django.shortcuts import get_object_or_404
+from rest_framework.request import Request
+from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 
 from apps.core.models import Category, Product
 from apps.core.serializers import CategorySerializer, ProductSerializer
+from apps.core.filters import ProductFilter
 from apps.core.permissions import IsAdminOrReadOnly
+from apps.core.services import (
+    bulk_update_inventory,
+    get_frequently_bought_together,
+    get_product_detail,
+    get_product_facets,
+    get_similar_products,
+)
+from apps.core.views.mixins import CatalogSnapshotMixin, ReplicaReadMixin, SparseFieldsetMixin
+
+RECOMMENDATIONS_LIMIT = 5
+SIMILAR_DEFAULT_LIMIT = 10
+SIMILAR_MAX_LIMIT = 50
 
 
-class CategoryListView(generics.ListAPIView):
-    """List all product categories."""
+class CategoryListView(ReplicaReadMixin, CatalogSnapshotMixin, generics.ListAPIView):
+    """List all product categories (from the catalog snapshot, else a read replica)."""
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    snapshot_artifact = "categories"
 
 
-class ProductListView(generics.ListCreateAPIView):
+class ProductListView(ReplicaReadMixin, CatalogSnapshotMixin, SparseFieldsetMixin, generics.ListCreateAPIView):
     """
     List all products or create a new product.
 
+    An unfiltered listing is served from the prebuilt catalog snapshot without
+    touching the database; any other listing is served from a read replica.
+    Creation goes to the primary.
+
     Features:
-    - Filter by category: ?category=1
+    - Filters (see ProductFilter): ?category=1,2&min_price=10&max_price=100&in_stock=true&title_prefix=iph
     - Search by title or description: ?search=iphone
     - Ordering: ?ordering=price or ?ordering=-price
+    - Facet counts for the filtered set: ?facets=true returns {"results": [...], "facets": {...}}
+    - Sparse fieldsets: ?fields=id,title,price or ?exclude=description (unrequested columns are not queried)
     """
     queryset = Product.objects.select_related("category").all()
     serializer_class = ProductSerializer
     permission_classes = [IsAdminOrReadOnly]
+    snapshot_artifact = "products"
 
     # Enable filtering, search, and ordering
     filter_backends = [
@@ -32,8 +60,8 @@ class ProductListView(generics.ListCreateAPIView):
         filters.OrderingFilter
     ]
 
-    # Filtering fields
-    filterset_fields = ["category"]
+    # Filtering
+    filterset_class = ProductFilter
 
     # Search fields
     search_fields = ["title", "description"]
@@ -42,8 +70,120 @@ class ProductListView(generics.ListCreateAPIView):
     ordering_fields = ["price", "title", "stock"]
     ordering = ["-id"]  # Default: newest first
 
+    def list(self, request: Request, *args, **kwargs) -> Response:
+        response = super().list(request, *args, **kwargs)
+        if request.query_params.get("facets", "").lower() not in ("1", "true", "yes"):
+            return response
+
+        queryset = self.filter_queryset(self.get_queryset())
+        facets = get_product_facets(queryset, self.get_facet_filters(request))
+        response.data = {"results": response.data, "facets": facets}
+        return response
+
+    def get_facet_filters(self, request: Request) -> dict:
+        """Normalised filter values identifying the current result set."""
+        filterset = self.filterset_class(request.query_params, queryset=self.get_queryset(), request=request)
+        filterset.is_valid()
+        filters = {
+            name: sorted(value) if isinstance(value, list) else value
+            for name, value in filterset.form.cleaned_data.items()
+            if value not in (None, "", [])
+        }
+        search = " ".join(request.query_params.get("search", "").lower().split())
+        if search:
+            filters["search"] = search
+        return filters
+
+
+class ProductDetailView(ReplicaReadMixin, SparseFieldsetMixin, generics.RetrieveAPIView):
+    """
+    Retrieve details of a specific product by its ID (served from a read replica).
 
-class ProductDetailView(generics.RetrieveAPIView):
-    """Retrieve details of a specific product by its ID."""
+    The serialized product is cached per representation with single-flight
+    reloads (see ``product_detail_service``); users pinned to the primary
+    after a write bypass the cache.
+
+    Supports sparse fieldsets: ?fields=id,title,price or ?exclude=description
+
+    The response also lists ids of products frequently bought together with it,
+    read from the prebuilt recommendation index (no extra queries); select or
+    exclude it like any other field.
+    """
     queryset = Product.objects.select_related("category").all()
     serializer_class = ProductSerializer
+    variant_params = ("fields", "exclude")
+
+    def load_payload(self) -> dict:
+        return dict(self.get_serializer(self.get_object()).data)
+
+    def retrieve(self, request: Request, *args, **kwargs) -> Response:
+        if self.use_replica(request):
+            variant = urlencode(sorted(
+                (name, value) for name in self.variant_params for value in request.query_params.getlist(name)
+            ))
+            data = get_product_detail(kwargs["pk"], variant, self.load_payload)
+        else:
+            data = self.load_payload()
+        if self.field_requested("frequently_bought_together"):
+            # Cached payloads may be shared; never mutate them.
+            data = {**data, "frequently_bought_together": get_frequently_bought_together(
+                kwargs["pk"], limit=RECOMMENDATIONS_LIMIT
+            )}
+        return Response(data)
+
+
+class ProductSimilarView(generics.ListAPIView):
+    """
+    List products with similar titles and descriptions (TF-IDF cosine similarity).
+
+    Works for new products without order history.
+
+    Supports:
+    - Result size: ?limit=10 (max 50)
+    """
+    serializer_class = ProductSerializer
+    filter_backends = []
+
+    def get_queryset(self):
+        product = get_object_or_404(Product, pk=self.kwargs["pk"])
+        try:
+            limit = int(self.request.query_params.get("limit", SIMILAR_DEFAULT_LIMIT))
+        except ValueError:
+            limit = SIMILAR_DEFAULT_LIMIT
+        limit = max(1, min(limit, SIMILAR_MAX_LIMIT))
+
+        ids = get_similar_products(product, limit=limit)
+        products = Product.objects.select_related("category").in_bulk(ids)
+        return [products[pk] for pk in ids if pk in products]
+
+
+class ProductBulkUpdateView(APIView):
+    """
+    Bulk stock and price update for warehouse systems (staff only).
+
+    Body: {"records": [{"product_id": 1, "stock": 40, "price": "9.99"}, ...], "dry_run": false}
+    ``stock`` and ``price`` are each optional; ``stock`` is the physical count,
+    units held in carts are subtracted. All records apply in one transaction;
+    rows that cannot be applied are listed in "conflicts" with their index.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request: Request) -> Response:
+        records = request.data.get("records")
+        if not isinstance(records, list) or not records:
+            return Response({"error": "records must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+
+        max_records = getattr(settings, "INVENTORY_MAX_RECORDS", 10_000)
+        if len(records) > max_records:
+            return Response(
+                {"error": f"At most {max_records} records per request"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        conflicts = []
+        stats = bulk_update_inventory(
+            ((index, record if isinstance(record, dict) else None) for index, record in enumerate(records)),
+            dry_run=bool(request.data.get("dry_run", False)),
+            on_conflict=conflicts.append,
+        )
+        return Response({**stats, "conflicts": conflicts}, status=status.HTTP_200_OK)
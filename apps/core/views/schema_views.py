@@ -0,0 +1,96 @@
+"""
+API documentation served from the precomputed OpenAPI schema.
+
+Not exported from ``apps.core.views``: only the full URLconf (``settings.urls``)
+imports these, so API-only workers never load drf-spectacular.
+"""
+from typing import Dict, Tuple
+
+from django.http import HttpResponse, HttpResponseBase
+from drf_spectacular.views import (
+    SCHEMA_KWARGS,
+    SpectacularAPIView,
+    SpectacularRedocView,
+    SpectacularSwaggerSplitView,
+)
+from drf_spectacular.utils import extend_schema
+from rest_framework.request import Request
+
+from apps.core.services.openapi_service import get_openapi_schema
+
+# (view class, schema version) -> (body, headers) of a rendered docs page
+_pages: Dict[Tuple[type, str], Tuple[bytes, Dict[str, str]]] = {}
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    return etag in {tag.strip() for tag in request.META.get("HTTP_IF_NONE_MATCH", "").split(",")}
+
+
+class OpenApiSchemaView(SpectacularAPIView):
+    """
+    The OpenAPI schema, read from the precomputed files (see ``openapi_service``).
+
+    YAML by default; JSON with ?format=json or Accept: application/vnd.oai.openapi+json.
+    Every format has a strong ETag, and a matching ``If-None-Match`` returns 304.
+    The schema is precomputed in the default language, so ?lang= has no effect.
+    """
+
+    @extend_schema(**SCHEMA_KWARGS)
+    def get(self, request: Request, *args, **kwargs) -> HttpResponseBase:
+        schema = get_openapi_schema()
+        renderer = request.accepted_renderer
+        etag = f'"{schema.version}-{renderer.format}"'
+        if _not_modified(request, etag):
+            response = HttpResponse(status=304)
+        else:
+            content_type = renderer.media_type + (f"; charset={renderer.charset}" if renderer.charset else "")
+            response = HttpResponse(schema.content[renderer.format], content_type=content_type)
+            response["Content-Disposition"] = f'inline; filename="{self._get_filename(request, None)}"'
+        response["ETag"] = etag
+        response["Cache-Control"] = "no-cache"
+        return response
+
+
+class PrerenderedDocsMixin:
+    """
+    Render a docs page once per process and schema version, then serve the bytes.
+
+    Only for pages without per-request content (no CSRF token): the page
+    embeds settings and the schema URL, and keying it on the schema version
+    (also its ETag) renews it with every deploy. Requests with query
+    parameters (?lang=, ?version=, ?script) are rendered as usual.
+    """
+
+    @extend_schema(exclude=True)
+    def get(self, request: Request, *args, **kwargs) -> HttpResponseBase:
+        if request.query_params:
+            return super().get(request, *args, **kwargs)
+
+        version = get_openapi_schema().version
+        etag = f'"{version}-{type(self).__name__}"'
+        if _not_modified(request, etag):
+            response = HttpResponse(status=304)
+        else:
+            page = _pages.get((type(self), version))
+            if page is None:
+                rendered = self.finalize_response(request, super().get(request, *args, **kwargs))
+                rendered.render()
+                page = _pages[(type(self), version)] = (rendered.content, dict(rendered.items()))
+            body, headers = page
+            response = HttpResponse(body, headers=headers)
+        response["ETag"] = etag
+        response["Cache-Control"] = "no-cache"
+        return response
+
+
+class SwaggerView(PrerenderedDocsMixin, SpectacularSwaggerSplitView):
+    """
+    Swagger UI for the precomputed schema.
+
+    The split view keeps the CSRF token out of the HTML: the page loads its
+    init script from ``?script``, which is rendered per request.
+    """
+
+
+class RedocView(PrerenderedDocsMixin, SpectacularRedocView):
+    """Redoc for the precomputed schema."""
@@ -0,0 +1,33 @@
+"""
+Job worker processes, started by ``manage.py run_workers``.
+
+A worker may be started with any multiprocessing start method. With
+``spawn`` and ``forkserver`` the child imports this module by name into a
+fresh interpreter, so it imports nothing that needs the app registry at
+module level; ``worker_process`` sets Django up before it loads the job
+service.
+"""
+import signal
+
+import django
+from django.db import close_old_connections
+
+
+def work(stop, batch_size: int, poll_interval: float) -> None:
+    """Claim and run job batches until ``stop`` is set, sleeping while the queue is empty."""
+    from apps.core.services.job_service import run_jobs, worker_name
+
+    while not stop.is_set():
+        close_old_connections()
+        stats = run_jobs(worker_name(), batch_size)
+        if not stats["claimed"]:
+            stop.wait(poll_interval)
+
+
+def worker_process(stop, batch_size: int, poll_interval: float) -> None:
+    """Entry point of a worker process (``DJANGO_SETTINGS_MODULE`` is inherited from the parent)."""
+    # Ctrl+C reaches the whole process group; the parent coordinates shutdown.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda *args: stop.set())
+    django.setup()
+    work(stop, batch_size, poll_interval)
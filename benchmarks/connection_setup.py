@@ -0,0 +1,80 @@
+"""
+Connection setup cost per request: per-request connections vs persistent ones.
+
+Pushes requests for ``--path`` through Django's WSGI handler (so the real
+request_started/request_finished connection management runs) once with
+CONN_MAX_AGE=0 and once with persistent connections, and reports latency
+and how many connections were opened.
+
+Usage:
+    SECRET_KEY=bench DATABASE_URL=postgres://... python -m benchmarks.connection_setup
+    SECRET_KEY=bench python -m benchmarks.connection_setup   # temporary SQLite file
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'settings.production')
+os.environ.setdefault('ALLOWED_HOSTS', 'testserver')
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = f"sqlite:///{tempfile.mkdtemp()}/bench.sqlite3"
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.handlers.wsgi import WSGIHandler  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.db.backends.signals import connection_created  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+
+from apps.core.models import Category  # noqa: E402
+
+
+def run(handler: WSGIHandler, path: str, requests: int, conn_max_age: int) -> None:
+    connection.close()
+    connection.settings_dict['CONN_MAX_AGE'] = conn_max_age
+    opened = []
+    connection_created.connect(lambda **kwargs: opened.append(1), weak=False, dispatch_uid='bench')
+
+    environ = RequestFactory()._base_environ(PATH_INFO=path, REQUEST_METHOD='GET')
+    timings = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = handler(dict(environ), lambda status, headers: None)
+        b''.join(response)
+        response.close()  # fires request_finished -> close_old_connections
+        timings.append(time.perf_counter() - started)
+
+    connection_created.disconnect(dispatch_uid='bench')
+    mean_ms = statistics.mean(timings) * 1000
+    p50, p99 = (statistics.quantiles(timings, n=100)[i] * 1000 for i in (49, 98))
+    print(
+        f"CONN_MAX_AGE={conn_max_age:<4} {requests} requests | "
+        f"mean {mean_ms:6.2f}ms p50 {p50:6.2f}ms p99 {p99:6.2f}ms | "
+        f"connections opened: {len(opened)}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--path', default='/api/categories/')
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"database: {connection.vendor} ({connection.settings_dict['NAME']})")
+    call_command('migrate', verbosity=0)
+    if not Category.objects.exists():
+        Category.objects.bulk_create(Category(name=f"Category {i}") for i in range(20))
+
+    handler = WSGIHandler()
+    run(handler, args.path, 50, 600)  # warm-up
+    run(handler, args.path, args.requests, 0)
+    run(handler, args.path, args.requests, 600)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Settlement reconciliation throughput and peak memory.
+
+Builds a fresh SQLite database with ``--payments`` pending payments, writes a
+settlement file covering all of them (a tenth with a wrong amount, half
+completed, the rest failed) and reconciles it, reporting lines per second.
+With ``--trace-memory`` it reports the peak traced Python allocation instead,
+which should not grow with the file size (tracing roughly halves throughput).
+
+Usage:
+    python -m benchmarks.reconciliation_throughput --payments 200000 --format csv [--trace-memory]
+"""
+import argparse
+import os
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'settings.base')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+
+from apps.core.models import Order, Payment, User  # noqa: E402
+from apps.core.services import reconcile_settlement  # noqa: E402
+
+
+def setup_database(path: Path, payments: int) -> None:
+    connection.close()
+    settings.DATABASES['default']['NAME'] = path
+    connection.settings_dict['NAME'] = path
+    call_command('migrate', verbosity=0)
+    user = User.objects.create_user(email='bench@example.com', username='bench', password='x')
+    for start in range(0, payments, 10_000):
+        orders = Order.objects.bulk_create(
+            Order(user=user, total_price=10) for _ in range(start, min(start + 10_000, payments))
+        )
+        Payment.objects.bulk_create(
+            Payment(order=order, amount=10, method='card', status='pending') for order in orders
+        )
+
+
+def write_settlement(path: Path, fmt: str) -> None:
+    with path.open('w') as out:
+        if fmt == 'csv':
+            out.write('order_id,amount,status\n')
+        for order_id in Order.objects.order_by('?').values_list('id', flat=True).iterator():
+            amount = '9.99' if order_id % 10 == 0 else '10.00'
+            status = 'completed' if order_id % 2 else 'failed'
+            if fmt == 'csv':
+                out.write(f'{order_id},{amount},{status}\n')
+            else:
+                out.write(f'{{"order_id": {order_id}, "amount": "{amount}", "status": "{status}"}}\n')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--payments', type=int, default=200_000)
+    parser.add_argument('--format', choices=['csv', 'ndjson'], default='csv')
+    parser.add_argument('--chunk-size', type=int, default=None)
+    parser.add_argument('--trace-memory', action='store_true')
+    args = parser.parse_args()
+
+    directory = Path(tempfile.mkdtemp())
+    setup_database(directory / 'bench.sqlite3', args.payments)
+    settlement = directory / f'settlement.{args.format}'
+    write_settlement(settlement, args.format)
+
+    if args.trace_memory:
+        tracemalloc.start()
+    with settlement.open(newline='') as stream:
+        stats = reconcile_settlement(stream, args.format, chunk_size=args.chunk_size)
+
+    print(f"{stats['lines']} lines in {stats['seconds']}s: {stats['lines_per_second']} lines/s")
+    print(f"updated {stats['updated']}, amount mismatches {stats['amount_mismatch']}")
+    if args.trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"peak traced memory {peak / 2**20:.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Latency benchmark for TF-IDF similar-product lookups.
+
+Fits the model on a synthetic catalog (no database needed) and reports fit
+time, model size and top-k query latency percentiles.
+
+Usage:
+    python -m benchmarks.similarity_latency --products 100000 1000000
+"""
+import argparse
+import os
+import time
+
+import django
+import numpy as np
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'settings.base')
+django.setup()
+
+from apps.core.services.similarity_service import fit_model, top_k_similar  # noqa: E402
+
+
+def synthetic_catalog(size: int, seed: int = 0):
+    """Yield (id, title, description) rows drawn from a Zipf-distributed vocabulary."""
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array([f"w{i}" for i in range(30_000)])
+    for product_id in range(1, size + 1):
+        words = vocabulary[np.minimum(rng.zipf(1.3, 40), len(vocabulary)) - 1]
+        yield product_id, " ".join(words[:4]), " ".join(words[4:])
+
+
+def run(size: int, queries: int, k: int) -> None:
+    started = time.perf_counter()
+    model = fit_model(synthetic_catalog(size))
+    fit_seconds = time.perf_counter() - started
+    matrix_mb = sum(
+        m.data.nbytes + m.indices.nbytes + m.indptr.nbytes for m in (model.matrix, model.columns)
+    ) / 2**20
+
+    rng = np.random.default_rng(1)
+    timings = []
+    for row in rng.integers(0, size, queries):
+        started = time.perf_counter()
+        top_k_similar(model, model.matrix[row], k, exclude=int(model.product_ids[row]))
+        timings.append(time.perf_counter() - started)
+
+    p50, p95, p99 = np.percentile(np.array(timings) * 1000, [50, 95, 99])
+    print(
+        f"{size:>9} products | fit {fit_seconds:7.1f}s | model {matrix_mb:7.1f} MiB | "
+        f"query p50 {p50:6.2f}ms p95 {p95:6.2f}ms p99 {p99:6.2f}ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--products', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('-k', type=int, default=10)
+    args = parser.parse_args()
+    for size in args.products:
+        run(size, args.queries, args.k)
+
+
+if __name__ == '__main__':
+    main()
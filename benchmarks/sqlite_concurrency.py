@@ -0,0 +1,104 @@
+"""
+Multi-threaded SQLite write benchmark: default connections vs the tuned layer.
+
+Each thread runs cart-style transactions against a fresh database file: read
+a product, then take stock with a conditional UPDATE - the read-then-write
+pattern that deadlocks on lock upgrade under DEFERRED transactions. The
+"default" run disables SQLITE_PRAGMAS and uses DEFERRED transactions; the
+"tuned" run uses the settings from settings/base.py.
+
+Usage:
+    python -m benchmarks.sqlite_concurrency --threads 8 --transactions 200
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'settings.base')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import OperationalError, connection, transaction  # noqa: E402
+
+from apps.core.models import Category, Product  # noqa: E402
+from apps.core.services.cart_service import hold_stock, release_stock  # noqa: E402
+
+TUNED_PRAGMAS = dict(settings.SQLITE_PRAGMAS)
+TUNED_OPTIONS = dict(settings.DATABASES['default']['OPTIONS'])
+
+
+def configure(path: Path, tuned: bool) -> None:
+    connection.close()
+    db = settings.DATABASES['default']
+    db['NAME'] = path
+    db['OPTIONS'] = dict(TUNED_OPTIONS) if tuned else {'timeout': TUNED_OPTIONS.get('timeout', 5)}
+    settings.SQLITE_PRAGMAS = TUNED_PRAGMAS if tuned else {}
+    connection.settings_dict.update(db)
+
+
+def worker(product_ids, transactions: int, results: dict, lock: threading.Lock) -> None:
+    ok = failed = 0
+    for i in range(transactions):
+        product_id = product_ids[i % len(product_ids)]
+        try:
+            with transaction.atomic():
+                Product.objects.get(pk=product_id)
+                hold_stock(product_id, 1)
+                release_stock(product_id, 1)
+            ok += 1
+        except OperationalError:
+            failed += 1
+    connection.close()
+    with lock:
+        results['ok'] += ok
+        results['failed'] += failed
+
+
+def run(label: str, tuned: bool, threads: int, transactions: int) -> None:
+    path = Path(tempfile.mkdtemp()) / f'{label}.sqlite3'
+    configure(path, tuned)
+    call_command('migrate', verbosity=0)
+    category = Category.objects.create(name='Bench')
+    product_ids = [
+        p.id for p in Product.objects.bulk_create(
+            Product(category=category, title=f'P{i}', description='', price=1, stock=10**6) for i in range(10)
+        )
+    ]
+    connection.close()
+
+    results = {'ok': 0, 'failed': 0}
+    lock = threading.Lock()
+    pool = [threading.Thread(target=worker, args=(product_ids, transactions, results, lock)) for _ in range(threads)]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    print(
+        f"{label:<8} {threads} threads x {transactions} tx | {elapsed:6.2f}s | "
+        f"{results['ok'] / elapsed:8.1f} committed tx/s | "
+        f"'database is locked' failures: {results['failed']}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--transactions', type=int, default=200)
+    args = parser.parse_args()
+
+    run('default', False, args.threads, args.transactions)
+    run('tuned', True, args.threads, args.transactions)
+
+
+if __name__ == '__main__':
+    main()
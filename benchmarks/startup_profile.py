@@ -0,0 +1,138 @@
+"""
+Worker startup cost of the full (settings.production) and lean (settings.api) profiles.
+
+Each profile starts in a fresh interpreter under ``python -X importtime``,
+loads the WSGI application and pushes one request for ``--path``
+through it. The report covers:
+- import time, summed from the importtime log;
+- the packages with the most import time;
+- setup and first-request latency;
+- resident memory after the first request.
+The median of ``--runs`` starts is reported per profile.
+
+Usage:
+    python -m benchmarks.startup_profile
+    SECRET_KEY=bench DATABASE_URL=postgres://... python -m benchmarks.startup_profile --runs 5
+"""
+import argparse
+import json
+import os
+import re
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List
+
+PROFILES = {'full': 'settings.production', 'lean': 'settings.api'}
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+\d+ \| \s*(\S+)')
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def rss_kib() -> int:
+    """Current resident set size (peak where /proc is unavailable)."""
+    try:
+        for line in Path('/proc/self/status').read_text().splitlines():
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def child(path: str) -> None:
+    """Runs in the measured interpreter: start the app, serve one request, print timings."""
+    from io import BytesIO
+
+    started = time.perf_counter()
+    from django.core.wsgi import get_wsgi_application
+    application = get_wsgi_application()
+    setup_ms = (time.perf_counter() - started) * 1000
+
+    path_info, _, query = path.partition('?')
+    environ = {
+        'REQUEST_METHOD': 'GET', 'SCRIPT_NAME': '', 'PATH_INFO': path_info, 'QUERY_STRING': query,
+        'SERVER_NAME': 'testserver', 'SERVER_PORT': '80', 'HTTP_HOST': 'testserver',
+        'wsgi.url_scheme': 'http', 'wsgi.input': BytesIO(),
+    }
+    status = []
+    started = time.perf_counter()
+    body = b''.join(application(environ, lambda code, headers, exc_info=None: status.append(code)))
+    first_request_ms = (time.perf_counter() - started) * 1000
+
+    print(json.dumps({
+        'setup_ms': setup_ms,
+        'first_request_ms': first_request_ms,
+        'status': status[0],
+        'bytes': len(body),
+        'rss_kib': rss_kib(),
+        'modules': len(sys.modules),
+    }))
+
+
+def measure(settings_module: str, path: str, env: Dict[str, str]) -> Dict:
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-m', 'benchmarks.startup_profile', '--child', '--path', path],
+        env={**env, 'DJANGO_SETTINGS_MODULE': settings_module},
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    stats = json.loads(result.stdout.strip().splitlines()[-1])
+    # Self time per top-level package, wherever in the import tree it was pulled in.
+    packages: Counter = Counter()
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            packages[match.group(2).split('.')[0]] += int(match.group(1))
+    stats['import_ms'] = sum(packages.values()) / 1000
+    stats['top_imports'] = packages.most_common(6)
+    return stats
+
+
+def report(name: str, runs: List[Dict]) -> None:
+    def median(key: str) -> float:
+        return statistics.median(run[key] for run in runs)
+
+    print(
+        f"{name:<5} imports {median('import_ms'):7.1f}ms ({runs[0]['modules']} modules) | "
+        f"setup {median('setup_ms'):7.1f}ms | first request {median('first_request_ms'):6.1f}ms "
+        f"(HTTP {runs[0]['status']}) | RSS {median('rss_kib') / 1024:6.1f} MiB"
+    )
+    print(f"      to first response {median('setup_ms') + median('first_request_ms'):7.1f}ms")
+    slowest = ', '.join(f'{module} {us / 1000:.0f}ms' for module, us in runs[0]['top_imports'])
+    print(f"      most import time: {slowest}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--path', default='/api/categories/')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.path)
+        return
+
+    env = {
+        **os.environ,
+        'SECRET_KEY': os.environ.get('SECRET_KEY', 'bench'),
+        'ALLOWED_HOSTS': 'testserver',
+        'WARM_CACHES_ON_STARTUP': '0',
+    }
+    if 'DATABASE_URL' not in env:
+        env['DATABASE_URL'] = f"sqlite:///{tempfile.mkdtemp()}/bench.sqlite3"
+        subprocess.run(
+            [sys.executable, 'manage.py', 'migrate', '-v0'],
+            env={**env, 'DJANGO_SETTINGS_MODULE': PROFILES['full']}, cwd=ROOT, check=True,
+        )
+
+    for name, settings_module in PROFILES.items():
+        report(name, [measure(settings_module, args.path, env) for _ in range(args.runs)])
+
+
+if __name__ == '__main__':
+    main()
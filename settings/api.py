@@ -0,0 +1,49 @@
+"""
+Lean profile for API-only workers.
+
+    DJANGO_SETTINGS_MODULE=settings.api   (configured like settings.production)
+
+The JSON API behind JWT authentication needs none of the admin (unfold and
+django.contrib.admin), the OpenAPI docs (drf-spectacular and its sidecar),
+sessions, messages, static files or templates, nor the session, CSRF, message
+and clickjacking middleware. This profile drops them, so workers import and
+keep less and run fewer middleware per request. Serve /admin/ and /api/docs/,
+and run migrate and collectstatic, with settings.production.
+
+Compare the two profiles with ``python -m benchmarks.startup_profile``.
+"""
+from .production import *  # noqa: F401,F403
+from .production import INSTALLED_APPS, MIDDLEWARE, REST_FRAMEWORK
+
+FULL_PROFILE_APPS = {
+    "unfold",
+    "unfold.contrib.filters",
+    "unfold.contrib.forms",
+    "unfold.contrib.inlines",
+    "django.contrib.admin",
+    "django.contrib.sessions",
+    "django.contrib.messages",
+    "django.contrib.staticfiles",
+    "drf_spectacular",
+    "drf_spectacular_sidecar",
+}
+
+FULL_PROFILE_MIDDLEWARE = {
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.middleware.csrf.CsrfViewMiddleware",
+    # Session-based; DRF authenticates the JWT and sets request.user itself.
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware",
+    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+}
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in FULL_PROFILE_APPS]
+
+MIDDLEWARE = [middleware for middleware in MIDDLEWARE if middleware not in FULL_PROFILE_MIDDLEWARE]
+
+TEMPLATES = []
+
+ROOT_URLCONF = 'settings.api_urls'
+
+# DRF's own AutoSchema is only imported if a schema is generated, which this profile never does.
+REST_FRAMEWORK = {key: value for key, value in REST_FRAMEWORK.items() if key != "DEFAULT_SCHEMA_CLASS"}
@@ -0,0 +1,34 @@
+"""
+API routes only: the URLconf of the lean ``settings.api`` profile.
+
+``settings.urls`` serves these plus the admin and the API documentation.
+"""
+from django.urls import path, include
+
+from apps.core.views import (
+    RegisterView, LoginView,
+    ProductListView, ProductDetailView,
+    CategoryListView, OrderListCreateView, PaymentListView
+)
+
+urlpatterns = [
+    # Auth
+    path("api/register/", RegisterView.as_view(), name="register"),
+    path("api/login/", LoginView.as_view(), name="login"),
+
+    # Products
+    path("api/products/", ProductListView.as_view(), name="product-list"),
+    path("api/products/<int:pk>/", ProductDetailView.as_view(), name="product-detail"),
+
+    # Categories
+    path("api/categories/", CategoryListView.as_view(), name="category-list"),
+
+    # Orders (duplicate for Swagger)
+    path("api/orders/", OrderListCreateView.as_view(), name="orders"),
+
+    # Payments
+    path("api/payments/", PaymentListView.as_view(), name="payments"),
+
+    # Core application — cart + advanced logic
+    path("api/", include("apps.core.urls")),
+]
@@ -53,6 +53,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.core.middleware.ReplicaStickinessMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -91,9 +92,33 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Take the write lock at BEGIN so read-then-write transactions
+            # queue up instead of deadlocking on lock upgrade.
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 5,
+        },
     }
 }
 
+# Applied to every new SQLite connection (apps.core.signals.tune_sqlite_connection).
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',  # durable in WAL mode except on power loss
+    'busy_timeout': 5000,  # ms
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64000,  # negative = KiB
+    'temp_store': 'MEMORY',
+}
+
+# Read replicas: aliases in DATABASES that serve ReplicaReadMixin views.
+# See settings/replica.py for a local two-SQLite-file setup.
+DATABASE_ROUTERS = ['apps.core.db_router.ReplicaRouter']
+REPLICA_DATABASES = []
+REPLICA_STICKY_SECONDS = 10  # reads stay on the primary this long after a user writes
+REPLICA_MAX_LAG = 5  # seconds; lagging replicas are skipped
+REPLICA_HEALTH_CHECK_INTERVAL = 5  # seconds between health checks per process
+
 
 # -----------------------------------------
 # PASSWORD VALIDATORS
@@ -172,6 +197,11 @@ REST_FRAMEWORK = {
 
     # Swagger schema
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+
+    # Token buckets for views with a throttle_scope listed in RATE_LIMITS
+    'DEFAULT_THROTTLE_CLASSES': (
+        'apps.core.throttling.TokenBucketThrottle',
+    ),
 }
 
 
@@ -180,3 +210,171 @@ SPECTACULAR_SETTINGS = {
     "DESCRIPTION": "API documentation for Midterm + Endterm project",
     "VERSION": "1.0.0",
 }
+
+# Precomputed by manage.py build_openapi_schema; run it with --check on every
+# deploy, which fails when the published schema is stale.
+OPENAPI_SCHEMA_DIR = BASE_DIR / "var" / "openapi"
+# Development aid: each process regenerates the schema once in the background
+# and replaces a stale one. Keep it off in production; --check covers deploys.
+OPENAPI_SCHEMA_VERIFY = False
+
+
+# -----------------------------------------
+# RATE LIMITS
+# -----------------------------------------
+
+# Token bucket per throttle_scope and client (user, else IP): "N/period" allows
+# bursts of N and refills N tokens per period. Scopes not listed are unlimited.
+# "<scope>_account" adds a bucket per submitted account (throttle_account_field).
+RATE_LIMITS = {
+    "login": "10/min",  # every attempt costs a PBKDF2 hash
+    "login_account": "5/min",  # one account guessed from many IPs
+    "register": "5/min",
+    "cart": "120/min",
+}
+
+
+# -----------------------------------------
+# RECOMMENDATIONS
+# -----------------------------------------
+
+RECOMMENDATIONS_DIR = BASE_DIR / "var" / "recommendations"
+RECOMMENDATIONS_TOP_K = 10
+RECOMMENDATIONS_RELOAD_INTERVAL = 30  # seconds between CURRENT pointer checks
+
+
+# -----------------------------------------
+# SIMILAR PRODUCTS (TF-IDF)
+# -----------------------------------------
+
+SIMILARITY_DIR = BASE_DIR / "var" / "similarity"  # built by manage.py build_similarity_model
+SIMILARITY_MAX_FEATURES = 50_000
+SIMILARITY_BUILD_INTERVAL = 5 * 60  # seconds between catalog version checks (manage.py run_scheduler)
+SIMILARITY_RELOAD_INTERVAL = 30  # seconds between CURRENT pointer checks
+
+
+# -----------------------------------------
+# CART STOCK RESERVATIONS
+# -----------------------------------------
+
+CART_RESERVATION_TTL = 15 * 60  # seconds a cart item holds its stock
+RESERVATION_SWEEP_INTERVAL = 60  # seconds between sweeper runs (manage.py run_scheduler)
+RESERVATION_SWEEP_BATCH_SIZE = 1000
+
+
+# -----------------------------------------
+# CART STORAGE
+# -----------------------------------------
+
+# "cache": write-behind carts, flushed by manage.py run_scheduler. Needs a
+# shared CACHES["default"] (Redis, Memcached); LocMem fails `manage.py check`.
+CART_STORAGE = "database"
+CART_WRITE_BEHIND_WINDOW = 5  # seconds of cart changes that may be lost with the cache
+CART_FLUSH_BATCH_SIZE = 500  # carts written back per transaction
+CART_CACHE_TTL = 24 * 60 * 60  # seconds a clean cached cart is kept
+
+
+# -----------------------------------------
+# ANONYMOUS CARTS
+# -----------------------------------------
+
+ANONYMOUS_CART_COOKIE = "cart"  # also accepted as the X-Cart-Token header
+ANONYMOUS_CART_MAX_AGE = 30 * 24 * 60 * 60  # seconds a signed cart token stays valid
+ANONYMOUS_CART_MAX_ITEMS = 50  # products per anonymous cart; keeps the cookie well under 4 KB
+
+
+# -----------------------------------------
+# IDEMPOTENCY KEYS
+# -----------------------------------------
+
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60  # seconds a stored response is replayable
+IDEMPOTENCY_LOCK_TIMEOUT = 60  # seconds before an unfinished request's key can be taken over
+IDEMPOTENCY_EVICTION_INTERVAL = 60 * 60
+
+
+# -----------------------------------------
+# PRODUCT FACETS
+# -----------------------------------------
+
+PRODUCT_PRICE_BUCKETS = (0, 25, 50, 100, 250, 500, 1000)  # lower bounds; last bucket is open-ended
+PRODUCT_FACETS_CACHE_TTL = 60  # seconds; stock changes from carts do not bump the catalog version
+
+
+# -----------------------------------------
+# PRODUCT DETAIL CACHE
+# -----------------------------------------
+
+PRODUCT_DETAIL_CACHE_TTL = 30  # seconds a payload is fresh; cart holds change stock without bumping the catalog version
+PRODUCT_DETAIL_STALE_TTL = 5 * 60  # seconds an expired payload may be served while one request reloads it
+SINGLE_FLIGHT_LOCK_TIMEOUT = 5  # seconds other workers wait for the reloading one before loading themselves
+
+
+# -----------------------------------------
+# CACHE WARMING
+# -----------------------------------------
+
+WARM_CACHES_ON_STARTUP = False  # warm each WSGI/ASGI worker in a background thread; see also manage.py warm_caches
+WARM_TOP_PRODUCTS = 200  # most ordered product detail pages to warm
+WARM_ORDER_WINDOW_DAYS = 30  # order history that ranks products
+WARM_PRODUCT_LIST_QUERIES = ("", "ordering=price", "ordering=-price", "in_stock=true", "facets=true")
+WARM_TOP_CATEGORIES = 10  # largest categories whose first product list page is warmed
+WARM_CONCURRENCY = 4  # requests in flight while warming
+
+
+# -----------------------------------------
+# CATALOG SNAPSHOT
+# -----------------------------------------
+
+CATALOG_SNAPSHOT_DIR = BASE_DIR / "var" / "catalog"
+CATALOG_SNAPSHOT_INTERVAL = 30  # seconds between freshness checks (manage.py run_scheduler)
+CATALOG_SNAPSHOT_MAX_AGE = 5 * 60  # rebuild at least this often; stock changes do not bump the catalog version
+CATALOG_SNAPSHOT_RELOAD_INTERVAL = 5  # seconds between CURRENT pointer checks
+CATALOG_SNAPSHOT_CACHE_SECONDS = 60  # Cache-Control max-age of the unversioned URLs
+
+
+# -----------------------------------------
+# CATALOG CHANGE FEED
+# -----------------------------------------
+
+CATALOG_CHANGES_PAGE_SIZE = 1000  # log entries per /api/catalog/changes/ response
+CATALOG_CHANGES_SETTLE_SECONDS = 2  # backends other than PostgreSQL/SQLite: hold back entries younger than the longest catalog write transaction
+CATALOG_CHANGES_COMPACTION_INTERVAL = 10 * 60  # seconds between compactions (manage.py run_scheduler)
+
+
+# -----------------------------------------
+# ORDER DETAIL
+# -----------------------------------------
+
+ORDER_DETAIL_MAX_AGE = 60  # seconds clients may reuse an order without revalidating; payment status and products can still change
+ORDER_DETAIL_CACHE_TTL = 60  # seconds a rendered order is cached; bounds staleness of the embedded products
+
+
+# -----------------------------------------
+# PAYMENT RECONCILIATION
+# -----------------------------------------
+
+RECONCILIATION_CHUNK_SIZE = 5000  # settlement lines joined and applied per transaction
+RECONCILIATION_BATCH_SIZE = 1000  # payments per bulk UPDATE statement
+
+
+# -----------------------------------------
+# BULK INVENTORY UPDATES
+# -----------------------------------------
+
+INVENTORY_CHUNK_SIZE = 500  # products per UPDATE ... CASE statement
+INVENTORY_MAX_RECORDS = 10_000  # per /api/products/bulk_update/ request; larger feeds use manage.py update_inventory
+
+
+# -----------------------------------------
+# BACKGROUND JOBS
+# -----------------------------------------
+
+JOB_WORKER_PROCESSES = 2  # manage.py run_workers
+JOB_WORKER_START_METHOD = None  # multiprocessing start method of the workers; None is the platform default
+JOB_BATCH_SIZE = 50  # jobs claimed per round; jobs of one name go to a batched handler together
+JOB_POLL_INTERVAL = 1.0  # seconds an idle worker sleeps between claims
+JOB_LOCK_TIMEOUT = 5 * 60  # seconds before a running job of a dead worker can be claimed again
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BACKOFF = 10  # seconds before the first retry, doubled for each further one
+JOB_RETRY_BACKOFF_MAX = 60 * 60
+LOW_STOCK_THRESHOLD = 5  # order_placed job warns about products below this stock
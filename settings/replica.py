@@ -0,0 +1,21 @@
+"""
+Local read-replica profile: a second SQLite file plays the replica.
+
+    python manage.py migrate
+    cp db.sqlite3 db.replica.sqlite3   # "replicate" (repeat to refresh)
+    DJANGO_SETTINGS_MODULE=settings.replica python manage.py runserver
+
+Under tests the replica mirrors ``default``, so the whole suite runs with
+routing enabled: pytest --ds=settings.replica
+"""
+from .base import *  # noqa: F401,F403
+from .base import BASE_DIR, DATABASES
+
+DATABASES['replica'] = {
+    'ENGINE': 'django.db.backends.sqlite3',
+    'NAME': BASE_DIR / 'db.replica.sqlite3',
+    'OPTIONS': DATABASES['default']['OPTIONS'],
+    'TEST': {'MIRROR': 'default'},
+}
+
+REPLICA_DATABASES = ['replica']
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'settings.base')
 
 application = get_wsgi_application()
+
+# Fill this worker's caches in the background if WARM_CACHES_ON_STARTUP is set.
+from apps.core.services.warming_service import warm_caches_in_background  # noqa: E402
+
+warm_caches_in_background()